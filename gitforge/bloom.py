@@ -0,0 +1,74 @@
+"""
+A Bloom filter over object ids. It answers "definitely not in the set" exactly and
+"maybe in the set" with a small false positive rate, using about 1.2 bytes per oid
+at 1% instead of the few dozen a Python set of oid strings needs.
+"""
+import hashlib
+import math
+import os
+import struct
+
+# m (bits), k (probes), capacity, count
+_HEADER = struct.Struct ('>QIQQ')
+
+
+class BloomFilter:
+    def __init__ (self, capacity, error_rate=0.01):
+        capacity = max (capacity, 1)
+        # Optimal sizing: m = -n ln p / (ln 2)^2, k = m/n ln 2
+        self.m = max (8, int (math.ceil (-capacity * math.log (error_rate) / math.log (2) ** 2)))
+        self.k = max (1, int (round (self.m / capacity * math.log (2))))
+        self.capacity = capacity
+        self.count = 0
+        self.bits = bytearray ((self.m + 7) // 8)
+
+    def _positions (self, oid):
+        # Oids are already uniformly distributed hashes, so two 8 byte slices of
+        # the digest give the k probes by double hashing without hashing again
+        digest = bytes.fromhex (oid)
+        h1 = int.from_bytes (digest[:8], 'big')
+        h2 = int.from_bytes (digest[8:16], 'big') | 1
+        return ((h1 + i * h2) % self.m for i in range (self.k))
+
+    def add (self, oid):
+        for pos in self._positions (oid):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__ (self, oid):
+        return all (self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions (oid))
+
+    @property
+    def full (self):
+        return self.count > self.capacity
+
+    def save (self, path):
+        os.makedirs (os.path.dirname (path), exist_ok=True)
+        with open (f'{path}.tmp', 'wb') as f:
+            f.write (_HEADER.pack (self.m, self.k, self.capacity, self.count))
+            f.write (self.bits)
+        os.replace (f'{path}.tmp', path)
+
+    @classmethod
+    def load (cls, path):
+        """Return the filter saved at path, or None if there is none."""
+        try:
+            with open (path, 'rb') as f:
+                data = f.read ()
+        except FileNotFoundError:
+            return None
+        if len (data) < _HEADER.size:
+            # Empty or cut short before the header ended - as if never written
+            return None
+        filter_ = cls.__new__ (cls)
+        filter_.m, filter_.k, filter_.capacity, filter_.count = _HEADER.unpack_from (data)
+        filter_.bits = bytearray (data[_HEADER.size:])
+        if len (filter_.bits) != (filter_.m + 7) // 8:
+            # Truncated file - behave as if it was never written
+            return None
+        return filter_
+
+
+def key_for (oids):
+    """Name a filter by the set of commits whose history it holds."""
+    return hashlib.sha1 (' '.join (sorted (set (oids))).encode ()).hexdigest ()
@@ -1,9 +1,12 @@
 import argparse
+import contextlib
+import io
 import json
 import os
 import subprocess
 import sys
 import textwrap
+import traceback
 from datetime import datetime, timezone, timedelta
 
 from . import repository
@@ -11,13 +14,88 @@ from . import objects
 from . import diff_engine
 from . import remotes
 
-def main ():
+def main (argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv in (['--batch'], ['--batch', '-']):
+        return _run_batch (sys.stdin, sys.stdout)
     with objects.change_git_dir ('.'):
-        args = parse_args ()
+        args = _parse_fast_args (argv) or parse_args (argv)
         args.func (args)
 
-def parse_args ():
-    parser = argparse.ArgumentParser ()
+def _run_batch (lines, result_file):
+    """
+    Run many commands in one process. Each input line is a JSON list of arguments,
+    or an object with "argv" and optionally "cwd" to run that command in another
+    directory; each command's outcome is written as one JSON object per line with
+    its returncode, stdout and stderr.
+    """
+    for line in lines:
+        if not line.strip ():
+            continue
+        request = json.loads (line)
+        if isinstance (request, dict):
+            argv, cwd = request['argv'], request.get ('cwd')
+        else:
+            argv, cwd = request, None
+        old_cwd = os.getcwd () if cwd else None
+        # Byte-backed, since some commands write to sys.stdout.buffer
+        out = io.TextIOWrapper (io.BytesIO (), encoding='utf-8', newline='')
+        err = io.TextIOWrapper (io.BytesIO (), encoding='utf-8', newline='')
+        returncode = 0
+        with contextlib.redirect_stdout (out), contextlib.redirect_stderr (err):
+            try:
+                if cwd:
+                    os.chdir (cwd)
+                main (argv)
+            except SystemExit as e:
+                if e.code is None or isinstance (e.code, int):
+                    returncode = e.code or 0
+                else:
+                    print (e.code, file=sys.stderr)
+                    returncode = 1
+            except Exception:
+                # What the command would have died with on its own
+                traceback.print_exc ()
+                returncode = 1
+            finally:
+                if old_cwd:
+                    os.chdir (old_cwd)
+            out.flush ()
+            err.flush ()
+        # Output may not be UTF-8 (cat-file), so keep the raw bytes round-trippable
+        result_file.write (json.dumps ({
+            'returncode': returncode,
+            'stdout': out.buffer.getvalue ().decode ('utf-8', 'surrogateescape'),
+            'stderr': err.buffer.getvalue ().decode ('utf-8', 'surrogateescape'),
+        }) + '\n')
+        result_file.flush ()
+
+def _parse_fast_args (argv):
+    """
+    Build the arguments for common commands invoked without any options, skipping
+    the cost of constructing every subparser. Returns None for anything else.
+    """
+    if len (argv) != 1:
+        return None
+    command = argv[0]
+    if command in ('log', 'show'):
+        func = log if command == 'log' else show
+        return argparse.Namespace (command=command, func=func, oid=repository.get_oid ('@'))
+    # Each command's function and the defaults of its subparser's options,
+    # so the Namespace is the one parse_args would build
+    func, defaults = {
+        'init': (init, {}),
+        'status': (status, {'json': False}),
+        'k': (k, {}),
+        'write-tree': (write_tree, {}),
+    }.get (command, (None, None))
+    if func is None:
+        return None
+    return argparse.Namespace (command=command, func=func, **defaults)
+
+def parse_args (argv=None):
+    parser = argparse.ArgumentParser (prog='gitforge')
 
     oid = repository.get_oid
 
@@ -78,6 +156,7 @@ def parse_args ():
 
     status_parser = commands.add_parser ('status')
     status_parser.set_defaults (func=status)
+    status_parser.add_argument ('--json', action='store_true', help='Print the status as one JSON object')
 
     reset_parser = commands.add_parser ('reset')
     reset_parser.set_defaults (func=reset)
@@ -131,7 +210,7 @@ def parse_args ():
     config_parser.add_argument ('key', nargs='?')
     config_parser.add_argument ('value', nargs='?')
 
-    return parser.parse_args ()
+    return parser.parse_args (argv)
 
 
 def init (args):
@@ -148,7 +227,7 @@ def init (args):
 """
 def hash_object (args):
     with open (args.file, 'rb') as f:
-        print (objects.hash_object (f.read ()))
+        print (objects.hash_object_stream (f))
 
 def cat_file (args):
     sys.stdout.flush ()
@@ -212,6 +291,9 @@ def show (args):
         parent_tree = repository.get_commit (commit.parents[0]).tree
 
     _print_commit (args.oid, commit)
+    # Same tree oid means identical contents, so there is nothing to expand and diff
+    if parent_tree == commit.tree:
+        return
     result = diff_engine.diff_trees (
         repository.get_tree (parent_tree), repository.get_tree (commit.tree))
     sys.stdout.flush ()
@@ -224,23 +306,19 @@ operation of diff :
 3. If a specific commit was provided, diff from the commit to the index or working directory (depending on whether --cached was provided).
 """
 def _diff (args):
-    oid = args.commit and repository.get_oid (args.commit)
-
     if args.commit:
-        # If a commit was provided explicitly, diff from it
+        oid = repository.get_oid (args.commit)
+        tree_from = repository.get_tree (repository.get_commit (oid).tree)
+    elif args.cached:
+        oid = repository.get_oid ('@')
         tree_from = repository.get_tree (oid and repository.get_commit (oid).tree)
+    else:
+        tree_from = repository.get_index_tree ()
 
     if args.cached:
         tree_to = repository.get_index_tree ()
-        if not args.commit:
-            # If no commit was provided, diff from HEAD
-            oid = repository.get_oid ('@')
-            tree_from = repository.get_tree (oid and repository.get_commit (oid).tree)
     else:
         tree_to = repository.get_working_tree ()
-        if not args.commit:
-            # If no commit was provided, diff from index
-            tree_from = repository.get_index_tree ()
 
     result = diff_engine.diff_trees (tree_from, tree_to)
     sys.stdout.flush ()
@@ -268,22 +346,24 @@ def branch (args):
         print (f'Branch {args.name} created at {args.start_point[:10]}')
 
 def k (args):
-    dot = 'digraph commits {\n'
+    # Collect lines and join once; repeated += would copy the whole graph each time
+    dot = ['digraph commits {\n']
 
     oids = set ()
     for refname, ref in objects.iter_refs (deref=False):
-        dot += f'"{refname}" [shape=note]\n'
-        dot += f'"{refname}" -> "{ref.value}"\n'
+        dot.append (f'"{refname}" [shape=note]\n')
+        dot.append (f'"{refname}" -> "{ref.value}"\n')
         if not ref.symbolic:
             oids.add (ref.value)
 
     for oid in repository.iter_commits_and_parents (oids):
         commit = repository.get_commit (oid)
-        dot += f'"{oid}" [shape=box style=filled label="{oid[:10]}"]\n'
+        dot.append (f'"{oid}" [shape=box style=filled label="{oid[:10]}"]\n')
         for parent in commit.parents:
-            dot += f'"{oid}" -> "{parent}"\n'
+            dot.append (f'"{oid}" -> "{parent}"\n')
 
-    dot += '}'
+    dot.append ('}')
+    dot = ''.join (dot)
     print (dot)
 
     # Generate PNG and open it
@@ -302,6 +382,9 @@ def k (args):
 def status (args):
     HEAD = repository.get_oid ('@')
     branch = repository.get_branch_name ()
+    if args.json:
+        print (json.dumps (_status_data (HEAD, branch)))
+        return
     if branch:
         print (f'On branch {branch}')
     else:
@@ -367,6 +450,29 @@ def status (args):
         if path not in conflicted_paths:
             print (f'{action:>12}: {path}')
 
+def _status_data (HEAD, branch):
+    """The same state status prints, as plain data for scripts and tests."""
+    with objects.get_index () as index:
+        conflicts = [{'path': path, 'type': index[path].get ('type', 'unknown')}
+                     for path in sorted (objects.get_conflicted_files (index))]
+    conflicted_paths = {conflict['path'] for conflict in conflicts}
+    HEAD_tree = HEAD and repository.get_commit (HEAD).tree
+    index_tree = repository.get_index_tree ()
+    staged = diff_engine.iter_changed_files (repository.get_tree (HEAD_tree), index_tree)
+    unstaged = diff_engine.iter_changed_files (index_tree, repository.get_working_tree ())
+    return {
+        'branch': branch,
+        'HEAD': HEAD,
+        'merge_head': objects.get_ref ('MERGE_HEAD').value,
+        'cherry_pick_head': objects.get_ref ('CHERRY_PICK_HEAD').value,
+        'rebase_in_progress': bool (objects.get_rebase_state ()),
+        'conflicts': conflicts,
+        'staged': [{'path': path, 'action': action}
+                   for path, action in staged if path not in conflicted_paths],
+        'unstaged': [{'path': path, 'action': action}
+                     for path, action in unstaged if path not in conflicted_paths],
+    }
+
 
 def reset (args):
     repository.reset (args.commit, soft=args.soft, mixed=args.mixed, hard=args.hard)
@@ -417,7 +523,8 @@ def fetch (args):
     remotes.fetch (args.remote)
 
 def push (args):
-    remotes.push (args.remote, f'refs/heads/{args.branch}')
+    if not remotes.push (args.remote, f'refs/heads/{args.branch}'):
+        print ('Everything up-to-date')
 
 def add (args):
     repository.add (args.files)
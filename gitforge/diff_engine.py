@@ -1,39 +1,138 @@
+import atexit
+import functools
+import itertools
+import os
+import re
+import shutil
 import subprocess
 
-from collections import defaultdict
-from tempfile import NamedTemporaryFile as Temp
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from tempfile import NamedTemporaryFile as Temp, TemporaryDirectory
 
 from . import objects
 
+# Merge with the external diff3 program where it is installed; set
+# GITFORGE_EXTERNAL_DIFF3=0 to use the in-process merge3 instead
+EXTERNAL_DIFF3 = (os.environ.get ('GITFORGE_EXTERNAL_DIFF3', '1') == '1' and
+                  shutil.which ('diff3') is not None)
 
-def compare_trees (*trees):
-    entries = defaultdict (lambda: [None] * len (trees))
-    for i, tree in enumerate (trees):
-        for path, oid in tree.items ():
-            entries[path][i] = oid
+# Unchanged lines diff3 has diff keep around each change (--horizon-lines)
+_DIFF_HORIZON = 100
 
-    for path, oids in entries.items ():
+# Empty named temp files handed to diff/diff3, reused instead of created per call
+_TEMPFILE_POOL = []
+
+@contextmanager
+def _tempfiles (count):
+    files = []
+    for _ in range (count):
+        try:
+            files.append (_TEMPFILE_POOL.pop ())
+        except IndexError:
+            files.append (Temp ())
+    try:
+        yield files
+    finally:
+        for f in files:
+            f.seek (0)
+            f.truncate ()
+            _TEMPFILE_POOL.append (f)
+
+@atexit.register
+def _close_tempfiles ():
+    while _TEMPFILE_POOL:
+        _TEMPFILE_POOL.pop ().close ()
+
+
+def compare_trees (*trees, skip_equal=False):
+    # dict.fromkeys keeps first-seen order, so output order matches the input trees
+    paths = dict.fromkeys (itertools.chain.from_iterable (trees))
+    for path in paths:
+        oids = tuple (tree.get (path) for tree in trees)
+        if skip_equal and oids.count (oids[0]) == len (oids):
+            continue
         yield (path, *oids)
 
 def iter_changed_files (t_from, t_to):
-    for path, o_from, o_to in compare_trees (t_from, t_to):
-        if o_from != o_to:
-            action = ('new file' if not o_from else
-                      'deleted' if not o_to else
-                      'modified')
-            yield path, action
+    # Content-addressed trees: equal mappings mean nothing changed
+    if t_from == t_to:
+        return
+    for path, o_from, o_to in compare_trees (t_from, t_to, skip_equal=True):
+        action = ('new file' if not o_from else
+                  'deleted' if not o_to else
+                  'modified')
+        yield path, action
 
 def diff_trees (t_from, t_to):
-    output = b''
-    for path, o_from, o_to in compare_trees (t_from, t_to):
-        if o_from != o_to:
-            # Compute the diff between current and parent file object's content
-            output += diff_blobs (o_from, o_to, path)
+    if t_from == t_to:
+        return b''
+    changes = list (compare_trees (t_from, t_to, skip_equal=True))
+    if len (changes) == 1:
+        return diff_blobs (changes[0][1], changes[0][2], changes[0][0])
+    if not changes:
+        return b''
+
+    # Mirror the changed blobs into two directories and diff them with a single
+    # process. Files are named by zero-padded position (not path) so that diff's
+    # sorted traversal keeps tree order and nested paths need no directories.
+    width = len (str (len (changes)))
+    with TemporaryDirectory () as d_from, TemporaryDirectory () as d_to:
+        for i, (path, o_from, o_to) in enumerate (changes):
+            for oid, d in ((o_from, d_from), (o_to, d_to)):
+                if oid:
+                    with open (f'{d}/{i:0{width}}', 'wb') as f:
+                        f.write (objects.get_object (oid))
+
+        with subprocess.Popen (
+                ['diff', '--recursive', '--new-file', '--unified', '--show-c-function',
+                 d_from, d_to],
+                stdout=subprocess.PIPE) as proc:
+            output, _ = proc.communicate ()
+
+        return _relabel_batch_diff (output, d_from, d_to, [path for path, _, _ in changes])
+
+def _relabel_batch_diff (output, d_from, d_to, paths):
+    """Rewrite the headers of a recursive directory diff to a/<path> and b/<path> labels."""
+    d_from = re.escape (os.fsencode (d_from))
+    d_to = re.escape (os.fsencode (d_to))
+    label = lambda side, m: f'{side}/{paths[int (m)]}'.encode ()
+
+    # Drop the per-file "diff <options> <from> <to>" separator lines
+    output = re.sub (rb'^diff [^\n]*\n', b'', output, flags=re.MULTILINE)
+    output = re.sub (rb'^--- ' + d_from + rb'/(\d+)\t[^\n]*$',
+                     lambda m: b'--- ' + label ('a', m.group (1)),
+                     output, flags=re.MULTILINE)
+    output = re.sub (rb'^\+\+\+ ' + d_to + rb'/(\d+)\t[^\n]*$',
+                     lambda m: b'+++ ' + label ('b', m.group (1)),
+                     output, flags=re.MULTILINE)
+    output = re.sub (rb'^Binary files ' + d_from + rb'/(\d+) and ' + d_to + rb'/(\d+) differ$',
+                     lambda m: b'Binary files ' + label ('a', m.group (1)) + b' and ' + label ('b', m.group (2)) + b' differ',
+                     output, flags=re.MULTILINE)
     return output
 
 
+# Placeholder label so cached diffs can be reused for any path with the same blobs
+_PATH_LABEL = '__PATH__'
+
 def diff_blobs (o_from, o_to, path='blob'):
-    with Temp () as f_from, Temp () as f_to:
+    if o_from == o_to:
+        return b''
+    output = _diff_blobs_raw (o_from, o_to)
+    # Labels only appear in the header (or the binary notice), so replace the first occurrence of each
+    if output.startswith (b'Binary files '):
+        return output.replace (_PATH_LABEL.encode (), path.encode (), 2)
+    output = output.replace (f'--- a/{_PATH_LABEL}'.encode (), f'--- a/{path}'.encode (), 1)
+    output = output.replace (f'+++ b/{_PATH_LABEL}'.encode (), f'+++ b/{path}'.encode (), 1)
+    return output
+
+def clear_diff_cache ():
+    _diff_blobs_raw.cache_clear ()
+
+@functools.lru_cache (maxsize=512)
+def _diff_blobs_raw (o_from, o_to):
+    path = _PATH_LABEL
+    with _tempfiles (2) as (f_from, f_to):
         for oid, f in ((o_from, f_from), (o_to, f_to)):
             if oid:
                 f.write (objects.get_object (oid))
@@ -48,6 +147,33 @@ def diff_blobs (o_from, o_to, path='blob'):
 
         return output
 
+# 3-way merge decision table, keyed by
+# (base missing, HEAD missing, other missing, HEAD == base, other == base, HEAD == other).
+# Values are 'skip', 'take_HEAD', 'take_other' or the conflict type to resolve with diff3.
+_MERGE_ACTIONS = {
+    # ---------- BOTH DELETED ----------
+    (True,  True,  True,  True,  True,  True ): 'skip',
+    (False, True,  True,  False, False, True ): 'skip',
+    # ---------- ONLY ONE SIDE ADDED (no conflict) ----------
+    (True,  False, True,  False, True,  False): 'take_HEAD',
+    (True,  True,  False, True,  False, False): 'take_other',
+    # ---------- DELETE ACCEPTED (no conflict) ----------
+    (False, True,  False, False, True,  False): 'skip',     # HEAD deleted, other unchanged
+    (False, False, True,  True,  False, False): 'skip',     # Other deleted, HEAD unchanged
+    # ---------- ONLY ONE SIDE MODIFIED (no conflict) ----------
+    (False, False, False, True,  False, False): 'take_other',   # HEAD unchanged, other modified
+    (False, False, False, False, True,  False): 'take_HEAD',    # Other unchanged, HEAD modified
+    (False, False, False, False, False, True ): 'take_HEAD',    # Both made the same change
+    (False, False, False, True,  True,  True ): 'take_HEAD',    # Nothing changed
+    # ---------- ADD/ADD with identical content (no conflict) ----------
+    (True,  False, False, False, False, True ): 'take_HEAD',
+    # ---------- CONFLICTS ----------
+    (True,  False, False, False, False, False): 'add_add',
+    (False, True,  False, False, False, False): 'current_delete_target_modify',
+    (False, False, True,  False, False, False): 'current_modify_target_delete',
+    (False, False, False, False, False, False): 'content_conflict',
+}
+
 def merge_trees (t_base, t_HEAD, t_other):
     """
     Perform a 3-way merge of trees.
@@ -63,59 +189,38 @@ def merge_trees (t_base, t_HEAD, t_other):
     """
     tree = {}
     conflicts = []
+    pending = []
 
     for path, o_base, o_HEAD, o_other in compare_trees (t_base, t_HEAD, t_other):
-        # ---------- BOTH DELETED ----------
-        if o_HEAD is None and o_other is None:
-            continue
+        action = _MERGE_ACTIONS[(o_base is None, o_HEAD is None, o_other is None,
+                                 o_HEAD == o_base, o_other == o_base, o_HEAD == o_other)]
 
-        # ---------- ONLY ONE SIDE ADDED (no conflict) ----------
-        if o_base is None and ((o_HEAD is None) != (o_other is None)):
-            tree[path] = {"state": "clear", "oid": o_HEAD or o_other}
+        if action == 'skip':
             continue
-
-        # ---------- DELETE ACCEPTED (no conflict) ----------
-        if o_base and o_HEAD is None and o_other == o_base:
-            continue  # HEAD deleted, other unchanged - accept deletion
-        if o_base and o_other is None and o_HEAD == o_base:
-            continue  # Other deleted, HEAD unchanged - accept deletion
-
-        # ---------- ONLY ONE SIDE MODIFIED (no conflict) ----------
-        if o_base and o_HEAD and o_other:
-            if o_HEAD == o_base and o_other != o_base:
-                # HEAD unchanged, other modified - take other's version
-                tree[path] = {"state": "clear", "oid": o_other}
-                continue
-            elif o_other == o_base and o_HEAD != o_base:
-                # Other unchanged, HEAD modified - take HEAD's version
-                tree[path] = {"state": "clear", "oid": o_HEAD}
-                continue
-            elif o_HEAD == o_other:
-                # Both made the same change - take either (no conflict)
-                tree[path] = {"state": "clear", "oid": o_HEAD}
-                continue
-
-        # ---------- ADD/ADD with identical content (no conflict) ----------
-        if o_base is None and o_HEAD and o_other and o_HEAD == o_other:
+        if action == 'take_HEAD':
             tree[path] = {"state": "clear", "oid": o_HEAD}
             continue
+        if action == 'take_other':
+            tree[path] = {"state": "clear", "oid": o_other}
+            continue
 
-        # ---------- DETERMINE CONFLICT TYPE ----------
-        # At this point, we have a conflict that needs merge_blobs
-        if o_base is None and o_HEAD and o_other:
-            conflict_type = "add_add"
-        elif o_base and o_HEAD is None and o_other:
-            # Current (HEAD) deleted, target modified
-            conflict_type = "current_delete_target_modify"
-        elif o_base and o_HEAD and o_other is None:
-            # Current (HEAD) modified, target deleted
-            conflict_type = "current_modify_target_delete"
-        else:
-            conflict_type = "content_conflict"
+        # At this point, we have a conflict that needs merge_blobs.
+        # Reserve the slot so the merged tree keeps compare_trees order.
+        tree[path] = None
+        pending.append ((path, action, o_base, o_HEAD, o_other))
+
+    # ---------- UNIFIED MERGE (diff3) ----------
+    # This handles ALL conflict types: add_add, delete_modify_*, content_conflict.
+    # Blobs are read here so only the diff3 subprocesses run on worker threads.
+    contents = [tuple (oid and objects.get_object (oid) for oid in oids)
+                for _, _, *oids in pending]
+    if EXTERNAL_DIFF3 and len (pending) > 1:
+        with ThreadPoolExecutor (max_workers=os.cpu_count ()) as executor:
+            results = list (executor.map (lambda c: _merge_contents (*c), contents))
+    else:
+        results = [_merge_contents (*c) for c in contents]
 
-        # ---------- UNIFIED MERGE (diff3) ----------
-        # This handles ALL conflict types: add_add, delete_modify_*, content_conflict
-        merged_content, has_conflict = merge_blobs (o_base, o_HEAD, o_other)
+    for (path, conflict_type, o_base, o_HEAD, o_other), (merged_content, has_conflict) in zip (pending, results):
         merged_oid = objects.hash_object (merged_content)
 
         if has_conflict:
@@ -138,12 +243,22 @@ def merge_trees (t_base, t_HEAD, t_other):
 
 
 def merge_blobs (o_base, o_HEAD, o_other):
-    with Temp () as f_base, Temp () as f_HEAD, Temp () as f_other:
+    return _merge_contents (*(oid and objects.get_object (oid) for oid in (o_base, o_HEAD, o_other)))
+
+def _merge_contents (base, HEAD, other):
+    if EXTERNAL_DIFF3:
+        return _merge_contents_external (base, HEAD, other)
+    return merge3 (base or b'', HEAD or b'', other or b'')
+
+def _merge_contents_external (base, HEAD, other):
+    # Only shares the temp file pool, whose pop/append are atomic, so it is
+    # safe to run on worker threads
+    with _tempfiles (3) as (f_base, f_HEAD, f_other):
 
         # Write blobs to files
-        for oid, f in ((o_base, f_base), (o_HEAD, f_HEAD), (o_other, f_other)):
-            if oid:
-                f.write (objects.get_object (oid))
+        for content, f in ((base, f_base), (HEAD, f_HEAD), (other, f_other)):
+            if content is not None:
+                f.write (content)
                 f.flush ()
 
         with subprocess.Popen (
@@ -159,3 +274,363 @@ def merge_blobs (o_base, o_HEAD, o_other):
 
         return output, has_conflict
 
+
+
+def merge3 (base, HEAD, other):
+    """
+    In-process equivalent of `diff3 -m` on three byte strings.
+
+    Output matches diff3's except that a change both sides made identically
+    is applied instead of bracketed as a BASE conflict, and markers always
+    start on their own line.
+
+    Returns:
+        (merged, has_conflict): merged content, with diff3-style conflict
+        markers around regions that HEAD and other changed differently
+    """
+    base, HEAD, other = (content.splitlines (keepends=True) for content in (base, HEAD, other))
+    output = []
+    has_conflict = False
+
+    def emit (lines):
+        output.extend (lines)
+
+    def emit_marker (marker):
+        # Markers always start on their own line, even after a missing final newline
+        if output and not output[-1].endswith (b'\n'):
+            output.append (b'\n')
+        output.append (marker)
+
+    i_base = i_HEAD = i_other = 0
+    for base_start, base_end, HEAD_start, HEAD_end, other_start, other_end in _sync_regions (base, HEAD, other):
+        # Unstable region before the next block that is unchanged on both sides
+        base_lines = base[i_base:base_start]
+        HEAD_lines = HEAD[i_HEAD:HEAD_start]
+        other_lines = other[i_other:other_start]
+        if HEAD_lines == other_lines:
+            emit (HEAD_lines)
+        elif HEAD_lines == base_lines:
+            emit (other_lines)
+        elif other_lines == base_lines:
+            emit (HEAD_lines)
+        else:
+            has_conflict = True
+            emit_marker (b'<<<<<<< HEAD\n')
+            emit (HEAD_lines)
+            emit_marker (b'||||||| BASE\n')
+            emit (base_lines)
+            emit_marker (b'=======\n')
+            emit (other_lines)
+            emit_marker (b'>>>>>>> MERGE_HEAD\n')
+
+        emit (base[base_start:base_end])
+        i_base, i_HEAD, i_other = base_end, HEAD_end, other_end
+
+    return b''.join (output), has_conflict
+
+def _sync_regions (base, HEAD, other):
+    """
+    Yield (base_start, base_end, HEAD_start, HEAD_end, other_start, other_end)
+    for runs of base lines that both sides kept unchanged, ending with an empty
+    region at the end of all three inputs.
+
+    Like diff3, each side is diffed against base on its own and the two diffs
+    are synced on base line positions.
+    """
+    # diff3 runs `diff side base`, and diff breaks ties differently the other way round
+    HEAD_match = {i: j for j, i in _matching_lines (HEAD, base)}
+    other_match = {i: k for k, i in _matching_lines (other, base)}
+
+    start = None
+    for i in range (len (base) + 1):
+        j, k = HEAD_match.get (i), other_match.get (i)
+        if start is not None and (j is None or k is None or
+                                  j != HEAD_start + (i - start) or
+                                  k != other_start + (i - start)):
+            yield (start, i,
+                   HEAD_start, HEAD_start + (i - start),
+                   other_start, other_start + (i - start))
+            start = None
+        if start is None and j is not None and k is not None:
+            start, HEAD_start, other_start = i, j, k
+
+    yield len (base), len (base), len (HEAD), len (HEAD), len (other), len (other)
+
+def _matching_lines (a, b):
+    """
+    Return the (i, j) pairs of a longest common subsequence of line lists a and b,
+    picked the way GNU diff picks them, so merges sync where diff3's would.
+
+    This follows diff's own steps: set aside the common prefix and suffix
+    beyond the horizon, discard lines that can't match, run its Myers
+    middle-snake search on the rest and slide the changes with shift_boundaries.
+    """
+    prefix = 0
+    hi_a, hi_b = len (a), len (b)
+    while prefix < hi_a and prefix < hi_b and a[prefix] == b[prefix]:
+        prefix += 1
+    while hi_a > prefix and hi_b > prefix and a[hi_a - 1] == b[hi_b - 1]:
+        hi_a -= 1
+        hi_b -= 1
+    lo = max (prefix - _DIFF_HORIZON, 0)
+    hi_a = min (hi_a + _DIFF_HORIZON, len (a))
+    hi_b = min (hi_b + _DIFF_HORIZON, len (b))
+
+    # Number lines by content, so the search compares small ints
+    classes = {}
+    equivs_a = [classes.setdefault (line, len (classes)) for line in a[lo:hi_a]]
+    equivs_b = [classes.setdefault (line, len (classes)) for line in b[lo:hi_b]]
+    # One flag per line plus a False sentinel at each end
+    changed_a = [False] * (len (equivs_a) + 2)
+    changed_b = [False] * (len (equivs_b) + 2)
+    kept_a = _discard_confusing_lines (equivs_a, equivs_b, changed_a)
+    kept_b = _discard_confusing_lines (equivs_b, equivs_a, changed_b)
+    deleted, inserted = _compareseq ([equivs_a[i] for i in kept_a], [equivs_b[j] for j in kept_b])
+    for x in deleted:
+        changed_a[kept_a[x] + 1] = True
+    for y in inserted:
+        changed_b[kept_b[y] + 1] = True
+    _shift_boundaries (equivs_a, changed_a, changed_b)
+    _shift_boundaries (equivs_b, changed_b, changed_a)
+
+    unchanged_a = (lo + i for i in range (len (equivs_a)) if not changed_a[i + 1])
+    unchanged_b = (lo + j for j in range (len (equivs_b)) if not changed_b[j + 1])
+    return list (itertools.chain (zip (range (lo), range (lo)),
+                                  zip (unchanged_a, unchanged_b),
+                                  zip (range (hi_a, len (a)), range (hi_b, len (b)))))
+
+def _discard_confusing_lines (equivs, other_equivs, changed):
+    """
+    Port of GNU diff's discard_confusing_lines for one file. Lines with no
+    match in the other file are marked changed up front, as are runs of lines
+    with very many matches; returns the indexes of the lines left to compare.
+    """
+    counts = {}
+    for e in other_equivs:
+        counts[e] = counts.get (e, 0) + 1
+    end = len (equivs)
+    many = 5
+    tem = end // 64
+    while True:
+        tem >>= 2
+        if not tem:
+            break
+        many *= 2
+    # 1 to discard, 2 to discard only inside a run of discards
+    discards = [1 if not counts.get (e) else 2 if counts[e] > many else 0 for e in equivs]
+
+    i = 0
+    while i < end:
+        if discards[i] == 2:
+            discards[i] = 0
+        elif discards[i]:
+            j, provisional = i, 0
+            while j < end and discards[j]:
+                provisional += discards[j] == 2
+                j += 1
+            while j > i and discards[j - 1] == 2:
+                j -= 1
+                discards[j] = 0
+                provisional -= 1
+            length = j - i
+            if provisional * 4 > length:
+                for k in range (i, j):
+                    if discards[k] == 2:
+                        discards[k] = 0
+            else:
+                minimum = 1
+                tem = length >> 2
+                while True:
+                    tem >>= 2
+                    if not tem:
+                        break
+                    minimum <<= 1
+                minimum += 1
+                # Long subruns of provisional lines are compared after all
+                k = consec = 0
+                while k < length:
+                    if discards[i + k] != 2:
+                        consec = 0
+                    else:
+                        consec += 1
+                        if consec == minimum:
+                            k -= consec
+                        elif consec > minimum:
+                            discards[i + k] = 0
+                    k += 1
+                # So are provisional lines near either end of the run
+                for step, first in ((1, i), (-1, i + length - 1)):
+                    consec = 0
+                    for k in range (length):
+                        line = first + step * k
+                        if k >= 8 and discards[line] == 1:
+                            break
+                        if discards[line] == 2:
+                            discards[line] = consec = 0
+                        elif not discards[line]:
+                            consec = 0
+                        else:
+                            consec += 1
+                        if consec == 3:
+                            break
+                i += length - 1
+        i += 1
+
+    kept = []
+    for i in range (end):
+        if discards[i]:
+            changed[i + 1] = True
+        else:
+            kept.append (i)
+    return kept
+
+def _compareseq (xv, yv):
+    """
+    Port of GNU diff's compareseq: return the indexes of the lines of xv and
+    of yv that a shortest edit script deletes and inserts.
+    """
+    deleted, inserted = [], []
+    pending = [(0, len (xv), 0, len (yv))]
+    while pending:
+        xoff, xlim, yoff, ylim = pending.pop ()
+        while xoff < xlim and yoff < ylim and xv[xoff] == yv[yoff]:
+            xoff += 1
+            yoff += 1
+        while xoff < xlim and yoff < ylim and xv[xlim - 1] == yv[ylim - 1]:
+            xlim -= 1
+            ylim -= 1
+        if xoff == xlim:
+            inserted.extend (range (yoff, ylim))
+        elif yoff == ylim:
+            deleted.extend (range (xoff, xlim))
+        else:
+            xmid, ymid = _diag (xv, yv, xoff, xlim, yoff, ylim)
+            pending.append ((xmid, xlim, ymid, ylim))
+            pending.append ((xoff, xmid, yoff, ymid))
+    return deleted, inserted
+
+def _diag (xv, yv, xoff, xlim, yoff, ylim):
+    """
+    Port of GNU diff's diag: the middle snake of a minimal edit script, found
+    from both ends. diff's cost cap for very different inputs is left out,
+    so those can still pair up differently from diff's.
+    """
+    dmin, dmax = xoff - ylim, xlim - yoff
+    fmid, bmid = xoff - yoff, xlim - ylim
+    fmin = fmax = fmid
+    bmin = bmax = bmid
+    odd = (fmid - bmid) & 1
+    fd = {fmid: xoff}
+    bd = {bmid: xlim}
+    while True:
+        if fmin > dmin:
+            fmin -= 1
+            fd[fmin - 1] = -1
+        else:
+            fmin += 1
+        if fmax < dmax:
+            fmax += 1
+            fd[fmax + 1] = -1
+        else:
+            fmax -= 1
+        for d in range (fmax, fmin - 1, -2):
+            tlo, thi = fd[d - 1], fd[d + 1]
+            x = thi if tlo < thi else tlo + 1
+            y = x - d
+            while x < xlim and y < ylim and xv[x] == yv[y]:
+                x += 1
+                y += 1
+            fd[d] = x
+            if odd and bmin <= d <= bmax and bd[d] <= x:
+                return x, y
+
+        if bmin > dmin:
+            bmin -= 1
+            bd[bmin - 1] = float ('inf')
+        else:
+            bmin += 1
+        if bmax < dmax:
+            bmax += 1
+            bd[bmax + 1] = float ('inf')
+        else:
+            bmax -= 1
+        for d in range (bmax, bmin - 1, -2):
+            tlo, thi = bd[d - 1], bd[d + 1]
+            x = tlo if tlo < thi else thi - 1
+            y = x - d
+            while xoff < x and yoff < y and xv[x - 1] == yv[y - 1]:
+                x -= 1
+                y -= 1
+            bd[d] = x
+            if not odd and fmin <= d <= fmax and x <= fd[d]:
+                return x, y
+
+def _shift_boundaries (lines, changed, other_changed):
+    """
+    Port of GNU diff's shift_boundaries: slide each run of changed lines back
+    to merge with earlier runs, then forward as far as it goes, and finally
+    back to line up with a run of changes in the other file if there is one.
+    changed and other_changed are the flag lists built by _matching_lines.
+    """
+    # Flag lists are offset by one for the leading sentinel
+    def equal (x, y):
+        return lines[x - 1] == lines[y - 1]
+
+    i, j = 1, 1
+    i_end = len (changed) - 1
+    while True:
+        # Find the start of the next run, tracking the same point in the other file
+        while i < i_end and not changed[i]:
+            while other_changed[j]:
+                j += 1
+            j += 1
+            i += 1
+        if i == i_end:
+            break
+        start = i
+        i += 1
+        while changed[i]:
+            i += 1
+        while other_changed[j]:
+            j += 1
+
+        while True:
+            runlength = i - start
+            # Move back while the previous unchanged line matches the last changed one
+            while start > 1 and equal (start - 1, i - 1):
+                start -= 1
+                changed[start] = True
+                i -= 1
+                changed[i] = False
+                while changed[start - 1]:
+                    start -= 1
+                j -= 1
+                while other_changed[j]:
+                    j -= 1
+            # i_end means no point corresponding to changes in the other file yet
+            corresponding = i if other_changed[j - 1] else i_end
+            # Then forward while the first changed line matches the next unchanged one
+            while i != i_end and equal (start, i):
+                changed[start] = False
+                start += 1
+                changed[i] = True
+                i += 1
+                while changed[i]:
+                    i += 1
+                j += 1
+                while other_changed[j]:
+                    j += 1
+                    corresponding = i
+            if runlength == i - start:
+                break
+
+        # Move the merged run back to line up with changes in the other file
+        while corresponding < i:
+            start -= 1
+            changed[start] = True
+            i -= 1
+            changed[i] = False
+            j -= 1
+            while other_changed[j]:
+                j -= 1
+
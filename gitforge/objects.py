@@ -1,16 +1,54 @@
+import copy
 import hashlib
+import itertools
 import json
 import os
 import shutil
+import struct
 import time
 import zlib
 
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Will be initialized in cli.main()
 GIT_DIR = None
 
+# Decompressed objects keyed by oid, evicted least-recently-used first
+_OBJECT_CACHE = OrderedDict ()
+_OBJECT_CACHE_SIZE = 1024
+# Oids known to be present in GIT_DIR's object store
+_EXISTING_OIDS = set ()
+# Parsed contents of GIT_DIR's config, loaded on first use
+_CONFIG_CACHE = None
+# Resolved refs keyed by (ref, deref), dropped whenever a ref is written or deleted
+_REF_CACHE = {}
+# Object fan-out directories (objects/xx) known to exist
+_OBJECT_DIRS = set ()
+
+# zlib level for new objects. Level 1 compresses several times faster than the
+# default 6 for a few percent larger files; any level decompresses the same way.
+_COMPRESSION_LEVEL = 1
+
+# Blobs in this size range may be stored as a delta against an earlier version
+_DELTA_MIN_SIZE = 16 * 1024
+_DELTA_MAX_SIZE = 4 * 1024 * 1024
+# A delta is only kept if it is smaller than this fraction of the full blob
+_DELTA_MAX_RATIO = 0.6
+# Longest chain of deltas that must be applied to rebuild a blob
+_DELTA_MAX_DEPTH = 10
+# Base lines searched past the previous copy before the whole-file index
+_DELTA_LOOKAHEAD = 16
+
+# Worker threads used to probe many oids for existence at once
+_EXISTS_WORKERS = 16
+
 
 class ConflictException (Exception):
     """Raised when an operation cannot proceed due to merge conflicts in the index."""
@@ -33,8 +71,20 @@ def change_git_dir (new_dir):
     global GIT_DIR
     old_dir = GIT_DIR
     GIT_DIR = f'{new_dir}/.gitforge'
-    yield
-    GIT_DIR = old_dir
+    _clear_caches ()
+    try:
+        yield
+    finally:
+        GIT_DIR = old_dir
+        _clear_caches ()
+
+def _clear_caches ():
+    global _CONFIG_CACHE
+    _OBJECT_CACHE.clear ()
+    _EXISTING_OIDS.clear ()
+    _REF_CACHE.clear ()
+    _OBJECT_DIRS.clear ()
+    _CONFIG_CACHE = None
 
 def init ():
     os.makedirs (GIT_DIR)
@@ -42,8 +92,8 @@ def init ():
 
 RefValue = namedtuple ('RefValue', ['symbolic', 'value'])
 
-def update_ref (ref, value, deref=True):
-    ref = _get_ref_internal (ref, deref)[0]
+def update_ref (ref, value, deref=True, git_dir=None):
+    ref = _get_ref_internal (ref, deref, git_dir)[0]
 
     assert value.value
     if value.symbolic:
@@ -51,108 +101,315 @@ def update_ref (ref, value, deref=True):
     else:
         value = value.value
 
-    ref_path = f'{GIT_DIR}/{ref}'
+    ref_path = f'{git_dir or GIT_DIR}/{ref}'
     os.makedirs (os.path.dirname (ref_path), exist_ok=True)
     with open (ref_path, 'w') as f:
         f.write (value)
+    _REF_CACHE.clear ()
 
-def get_ref (ref, deref=True):
-    return _get_ref_internal (ref, deref)[1]
+def get_ref (ref, deref=True, git_dir=None):
+    return _get_ref_internal (ref, deref, git_dir)[1]
 
 def delete_ref (ref, deref=True):
     ref = _get_ref_internal (ref, deref)[0]
     os.remove (f'{GIT_DIR}/{ref}')
+    _REF_CACHE.clear ()
+
+def _get_ref_internal (ref, deref, git_dir=None):
+    # Only GIT_DIR's refs are cached
+    key = (ref, deref)
+    if git_dir is None and key in _REF_CACHE:
+        return _REF_CACHE[key]
 
-def _get_ref_internal (ref, deref):
-    ref_path = f'{GIT_DIR}/{ref}'
-    value = None
-    if os.path.isfile (ref_path):
-        with open (ref_path) as f:
-            value = f.read ().strip ()
     """
     1. If the file that represents a ref contains an OID, we'll assume that the ref points to an OID. 
-    2. If the file contains the content ref: <refname>, we'll assume that the ref points to <refname> and we will dereference it recursively.
+    2. If the file contains the content ref: <refname>, we'll assume that the ref points to <refname> and we will dereference it until we find the OID.
     """
-    symbolic = bool (value) and value.startswith ('ref:')
-    if symbolic:
-        value = value.split (':', 1)[1].strip ()
-        if deref:       # To make recursive to call until we find the OID ( i.e., non-symbolic reference )
-            return _get_ref_internal (value, deref=True)
-
-    return ref, RefValue (symbolic=symbolic, value=value)
-
-def iter_refs (prefix='', deref=True):
-    refs = ['HEAD', 'MERGE_HEAD', 'ORIG_HEAD', 'CHERRY_PICK_HEAD']
-    for root, _, filenames in os.walk (f'{GIT_DIR}/refs/'):
-        root = os.path.relpath (root, GIT_DIR)
-        refs.extend (f'{root}/{name}' for name in filenames)
+    while True:
+        ref_path = f'{git_dir or GIT_DIR}/{ref}'
+        value = None
+        if os.path.isfile (ref_path):
+            with open (ref_path) as f:
+                value = f.read ().strip ()
+
+        symbolic = bool (value) and value.startswith ('ref:')
+        if symbolic:
+            value = value.split (':', 1)[1].strip ()
+            if deref:       # Keep following until we find the OID ( i.e., non-symbolic reference )
+                ref = value
+                continue
+        break
+
+    result = ref, RefValue (symbolic=symbolic, value=value)
+    if git_dir is None:
+        _REF_CACHE[key] = result
+    return result
+
+def iter_refs (prefix='', deref=True, git_dir=None):
+    refs = [name for name in ('HEAD', 'MERGE_HEAD', 'ORIG_HEAD', 'CHERRY_PICK_HEAD')
+            if name.startswith (prefix)]
+    refs.extend (_iter_ref_names ('refs', prefix, git_dir or GIT_DIR))
 
     for refname in refs:
-        if not refname.startswith (prefix):
-            continue
-        ref = get_ref (refname, deref=deref)
+        ref = get_ref (refname, deref=deref, git_dir=git_dir)
         if ref.value:
             yield refname, ref
 
+def _iter_ref_names (dirname, prefix, git_dir):
+    # Only descend into directories that can contain refs matching prefix
+    if not (dirname.startswith (prefix) or prefix.startswith (f'{dirname}/')):
+        return
+    try:
+        entries = list (os.scandir (f'{git_dir}/{dirname}'))
+    except FileNotFoundError:
+        return
+
+    subdirs = []
+    for entry in entries:
+        name = f'{dirname}/{entry.name}'
+        if entry.is_dir ():
+            subdirs.append (name)
+        elif name.startswith (prefix):
+            yield name
+    for subdir in subdirs:
+        yield from _iter_ref_names (subdir, prefix, git_dir)
+
 @contextmanager
 def get_index ():
     index = {}
+    raw = None
     if os.path.isfile (f'{GIT_DIR}/index'):
-        with open (f'{GIT_DIR}/index') as f:
-            index = json.load (f)
+        with open (f'{GIT_DIR}/index', 'rb') as f:
+            raw = f.read ()
+        index = _loads_index (raw)
 
     yield index
 
-    with open (f'{GIT_DIR}/index', 'w') as f:
-        json.dump (index, f)
+    # Read-only users (status, diff, ...) leave the index untouched, so skip the rewrite
+    data = _dumps_index (index)
+    if data == raw:
+        return
+    with open (f'{GIT_DIR}/index', 'wb') as f:
+        f.write (data)
+
+def _loads_index (data):
+    if orjson is not None:
+        return orjson.loads (data)
+    return json.loads (data)
+
+def _dumps_index (index):
+    if orjson is not None:
+        return orjson.dumps (index)
+    return json.dumps (index, separators=(',', ':'), ensure_ascii=False).encode ()
+
+def _object_path (oid, git_dir=None):
+    return f'{git_dir or GIT_DIR}/objects/{oid[:2]}/{oid[2:]}'
+
+def _make_object_dir (oid, git_dir=None):
+    # At most 256 fan-out directories per repository, so remember the ones we created
+    dirname = f'{git_dir or GIT_DIR}/objects/{oid[:2]}'
+    if dirname not in _OBJECT_DIRS:
+        os.makedirs (dirname, exist_ok=True)
+        _OBJECT_DIRS.add (dirname)
+
+def _cache_object (oid, type_, content):
+    _OBJECT_CACHE[oid] = (type_, content)
+    _OBJECT_CACHE.move_to_end (oid)
+    if len (_OBJECT_CACHE) > _OBJECT_CACHE_SIZE:
+        _OBJECT_CACHE.popitem (last=False)
+
+def hash_object (data, type_='blob', base=None):
+    """
+    Store data as an object and return its oid.
 
-def hash_object (data, type_='blob'):
-    obj = type_.encode () + b'\x00' + data
-    oid = hashlib.sha1 (obj).hexdigest ()
-    os.makedirs (f'{GIT_DIR}/objects/{oid[:2]}', exist_ok=True)
-    with open (f'{GIT_DIR}/objects/{oid[:2]}/{oid[2:]}', 'wb') as out:
-        out.write (zlib.compress (obj))
+    If base is the oid of an earlier version of the same blob, the object may
+    be stored as a delta against it. The oid is the same either way.
+    """
+    header = type_.encode () + b'\x00'
+    # Hash header and data separately so unchanged blobs are never copied into one buffer
+    h = hashlib.sha1 (header)
+    h.update (data)
+    oid = h.hexdigest ()
+    _cache_object (oid, type_, data)
+
+    # Objects are content-addressed, so an existing file already holds this data
+    if object_exists (oid):
+        return oid
+
+    delta = base and _encode_delta (base, type_, data)
+    if delta:
+        header, data = b'delta\x00', delta
+
+    _make_object_dir (oid)
+    compressor = zlib.compressobj (_COMPRESSION_LEVEL)
+    with open (_object_path (oid), 'wb') as out:
+        out.write (compressor.compress (header))
+        out.write (compressor.compress (data))
+        out.write (compressor.flush ())
+    _EXISTING_OIDS.add (oid)
     return oid
 
+_STREAM_CHUNK_SIZE = 1 << 16
+
+def hash_object_stream (f, type_='blob', base=None):
+    """Like hash_object, but reads a seekable binary file in chunks to keep memory bounded."""
+    start = f.tell ()
+    f.seek (0, os.SEEK_END)
+    size = f.tell () - start
+    f.seek (start)
+    # Delta candidates are small enough to diff in memory
+    if base is not None and _DELTA_MIN_SIZE <= size <= _DELTA_MAX_SIZE:
+        return hash_object (f.read (), type_, base=base)
+    # A file that fits in one chunk is read once and hashed from memory,
+    # instead of a second time to compress it
+    if size <= _STREAM_CHUNK_SIZE:
+        return hash_object (f.read (), type_)
+
+    header = type_.encode () + b'\x00'
+
+    # First pass computes the oid, so existing objects are never recompressed
+    h = hashlib.sha1 (header)
+    while True:
+        chunk = f.read (_STREAM_CHUNK_SIZE)
+        if not chunk:
+            break
+        h.update (chunk)
+    oid = h.hexdigest ()
 
-def get_object (oid, expected='blob'):
-    with open (f'{GIT_DIR}/objects/{oid[:2]}/{oid[2:]}', 'rb') as f:
-        obj = zlib.decompress (f.read ())
+    if object_exists (oid):
+        return oid
+
+    # Second pass compresses into a temp file that is renamed into place once complete
+    f.seek (start)
+    _make_object_dir (oid)
+    path = _object_path (oid)
+    compressor = zlib.compressobj (_COMPRESSION_LEVEL)
+    with open (f'{path}.tmp', 'wb') as out:
+        out.write (compressor.compress (header))
+        while True:
+            chunk = f.read (_STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            out.write (compressor.compress (chunk))
+        out.write (compressor.flush ())
+    os.replace (f'{path}.tmp', path)
+    _EXISTING_OIDS.add (oid)
+    return oid
 
-    type_, _, content = obj.partition (b'\x00')
-    type_ = type_.decode ()
+
+def get_object (oid, expected='blob', git_dir=None):
+    # Objects are content-addressed, so a cached one is right for any repository
+    cached = _OBJECT_CACHE.get (oid)
+    if cached is not None:
+        _OBJECT_CACHE.move_to_end (oid)
+        type_, content = cached
+    else:
+        type_, content = _read_object_file (oid, git_dir)
+        if type_ == 'delta':
+            type_, content = _resolve_delta (content, git_dir)
+        cache_loaded_object (oid, (type_, content), git_dir)
 
     if expected is not None:
         assert type_ == expected, f'Expected {expected}, got {type_}'
     return content
 
-def object_exists (oid):
-    return os.path.isfile (f'{GIT_DIR}/objects/{oid[:2]}/{oid[2:]}')
+def _read_object_file (oid, git_dir=None):
+    with open (_object_path (oid, git_dir), 'rb') as f:
+        obj = zlib.decompress (f.read ())
+    type_, _, content = obj.partition (b'\x00')
+    return type_.decode (), content
+
+def load_object (oid, git_dir=None):
+    """
+    Read an object without touching any cache, so worker threads can call it.
+    Returns (type, content), or None if the object is missing or is a delta.
+    Hand the result to cache_loaded_object from the main thread.
+    """
+    try:
+        loaded = _read_object_file (oid, git_dir)
+    except (FileNotFoundError, zlib.error):
+        # Missing, or still being copied in - the main thread will read it itself
+        return None
+    return None if loaded[0] == 'delta' else loaded
+
+def cache_loaded_object (oid, loaded, git_dir=None):
+    # Only this repository's objects count as existing here
+    if git_dir is None:
+        _EXISTING_OIDS.add (oid)
+    _cache_object (oid, *loaded)
+
+def object_exists (oid, git_dir=None):
+    if git_dir is not None:
+        # Another repository's store - not covered by the cache
+        return os.path.isfile (_object_path (oid, git_dir))
+    if oid in _EXISTING_OIDS:
+        return True
+    if os.path.isfile (_object_path (oid)):
+        _EXISTING_OIDS.add (oid)
+        return True
+    return False
+
+def objects_exist_batch (oids):
+    """Return the subset of oids present in the object store, probing them concurrently."""
+    oids = list (oids)
+    # Probes already answered by the cache need no worker
+    unknown = [oid for oid in oids if oid not in _EXISTING_OIDS]
+    if len (unknown) > 1:
+        with ThreadPoolExecutor (max_workers=min (_EXISTS_WORKERS, len (unknown))) as executor:
+            list (executor.map (object_exists, unknown))
+    else:
+        for oid in unknown:
+            object_exists (oid)
+    return {oid for oid in oids if oid in _EXISTING_OIDS}
+
+def _link_or_copy (src, dst):
+    # Objects are immutable, so both repositories can share one file
+    try:
+        os.link (src, dst)
+    except FileExistsError:
+        pass
+    except OSError:
+        # Hardlinks fail across filesystems (EXDEV) or where unsupported. Copy the
+        # stored bytes as they are (copyfile can use sendfile), never re-encoding
+        # them - a delta stays a delta since its base is transferred with it
+        shutil.copyfile (src, dst)
 
 def fetch_object_if_missing (oid, remote_git_dir):
     if object_exists (oid):
         return
-    remote_git_dir += '/.gitforge'
-    os.makedirs (f'{GIT_DIR}/objects/{oid[:2]}', exist_ok=True)
-    shutil.copy (f'{remote_git_dir}/objects/{oid[:2]}/{oid[2:]}',
-                 f'{GIT_DIR}/objects/{oid[:2]}/{oid[2:]}')
+    remote_path = _object_path (oid, f'{remote_git_dir}/.gitforge')
+    # A delta can only be read next to its base, so bring the base along
+    delta = _delta_header (remote_path)
+    if delta:
+        fetch_object_if_missing (delta[0], remote_git_dir)
+    _make_object_dir (oid)
+    _link_or_copy (remote_path, _object_path (oid))
+    _EXISTING_OIDS.add (oid)
 
 def push_object (oid, remote_git_dir):
+    delta = _delta_header (_object_path (oid))
+    if delta:
+        push_object (delta[0], remote_git_dir)
     remote_git_dir += '/.gitforge'
-    os.makedirs (f'{remote_git_dir}/objects/{oid[:2]}', exist_ok=True)
-    shutil.copy (f'{GIT_DIR}/objects/{oid[:2]}/{oid[2:]}',
-                 f'{remote_git_dir}/objects/{oid[:2]}/{oid[2:]}')
+    _make_object_dir (oid, remote_git_dir)
+    _link_or_copy (_object_path (oid), _object_path (oid, remote_git_dir))
+
+def _load_config ():
+    global _CONFIG_CACHE
+    if _CONFIG_CACHE is None:
+        config_path = f'{GIT_DIR}/config'
+        _CONFIG_CACHE = {}
+        if os.path.isfile (config_path):
+            with open (config_path) as f:
+                _CONFIG_CACHE = json.load (f)
+    return _CONFIG_CACHE
 
 def get_config ():
-    config_path = f'{GIT_DIR}/config'
-    config = {}
-    if os.path.isfile (config_path):
-        with open (config_path) as f:
-            config = json.load (f)
-    return config
+    # Hand out a copy so callers can't mutate the cached config
+    return copy.deepcopy (_load_config ())
 
 def set_config (key, value):
-    config = get_config ()
+    config = _load_config ()
     keys = key.split ('.')
     current = config
     for k in keys[:-1]:
@@ -163,11 +420,16 @@ def set_config (key, value):
         json.dump (config, f, indent=2)
 
 def get_user_identity ():
-    config = get_config ()
-    user = config.get ('user', {})
-
-    name = user.get ('name') or os.environ.get ('GIT_AUTHOR_NAME', 'Unknown')
-    email = user.get ('email') or os.environ.get ('GIT_AUTHOR_EMAIL', 'unknown@example.com')
+    # GITFORGE_AUTHOR_* override the config for one invocation; GIT_AUTHOR_* only fill gaps
+    env = os.environ
+    # Only read here, so the cached config needs no copy - and none at all if
+    # the environment already names the author
+    if env.get ('GITFORGE_AUTHOR_NAME') and env.get ('GITFORGE_AUTHOR_EMAIL'):
+        user = {}
+    else:
+        user = _load_config ().get ('user', {})
+    name = env.get ('GITFORGE_AUTHOR_NAME') or user.get ('name') or env.get ('GIT_AUTHOR_NAME', 'Unknown')
+    email = env.get ('GITFORGE_AUTHOR_EMAIL') or user.get ('email') or env.get ('GIT_AUTHOR_EMAIL', 'unknown@example.com')
 
     return name, email
 
@@ -208,3 +470,109 @@ def delete_rebase_state():
     if os.path.isfile(state_path):
         os.remove(state_path)
 
+
+
+# ============================================================================
+# DELTA OBJECTS
+# ============================================================================
+#
+# A delta object is stored as b'delta\x00' + b'<base oid> <type> <depth>\n' + ops,
+# where ops is a sequence of
+#   b'C' + offset + length   copy base[offset:offset + length]
+#   b'I' + length + bytes    insert the given bytes
+# with offsets and lengths as big-endian 64-bit integers. Its oid is still
+# the hash of the full content, so deltas are invisible outside this module.
+
+def _encode_delta (base, type_, data):
+    """Return the delta body storing data against blob base, or None if not worthwhile."""
+    if type_ != 'blob' or not _DELTA_MIN_SIZE <= len (data) <= _DELTA_MAX_SIZE:
+        return None
+    if not object_exists (base):
+        return None
+    depth = _delta_depth (base) + 1
+    if depth > _DELTA_MAX_DEPTH:
+        return None
+
+    base_lines = get_object (base).splitlines (keepends=True)
+    data_lines = data.splitlines (keepends=True)
+    base_offsets = list (itertools.accumulate (map (len, base_lines), initial=0))
+    data_offsets = list (itertools.accumulate (map (len, data_lines), initial=0))
+    # First position of every base line. Matching against it visits each data
+    # line once, so the time stays linear however much the two versions differ
+    base_index = {}
+    for i, line in enumerate (base_lines):
+        base_index.setdefault (line, i)
+
+    ops = [f'{base} {type_} {depth}\n'.encode ()]
+    size = len (ops[0])
+    # Give up as soon as the delta can't come in under the ratio
+    budget = len (data) * _DELTA_MAX_RATIO
+    n_base, n_data = len (base_lines), len (data_lines)
+    next_i = j = insert_from = 0
+    while j < n_data:
+        line = data_lines[j]
+        # Look a few lines past the previous copy first, so edits between
+        # repeated lines don't send every match back to the first occurrence
+        for i in range (next_i, min (next_i + _DELTA_LOOKAHEAD, n_base)):
+            if base_lines[i] == line:
+                break
+        else:
+            i = base_index.get (line)
+            if i is None:
+                j += 1
+                continue
+        if insert_from < j:
+            chunk = data[data_offsets[insert_from]:data_offsets[j]]
+            ops.append (b'I' + struct.pack ('>Q', len (chunk)) + chunk)
+            size += 9 + len (chunk)
+        k = 1
+        while j + k < n_data and i + k < n_base and base_lines[i + k] == data_lines[j + k]:
+            k += 1
+        start = base_offsets[i]
+        ops.append (b'C' + struct.pack ('>QQ', start, base_offsets[i + k] - start))
+        size += 17
+        if size >= budget:
+            return None
+        j += k
+        next_i, insert_from = i + k, j
+    if insert_from < n_data:
+        chunk = data[data_offsets[insert_from]:]
+        ops.append (b'I' + struct.pack ('>Q', len (chunk)) + chunk)
+        size += 9 + len (chunk)
+
+    if size >= budget:
+        return None
+    return b''.join (ops)
+
+def _resolve_delta (body, git_dir=None):
+    """Rebuild (type_, content) from a delta body, reading its base from git_dir."""
+    header, _, ops = body.partition (b'\n')
+    base, type_, _ = header.decode ().split (' ')
+    base_content = get_object (base, expected=type_, git_dir=git_dir)
+
+    parts = []
+    pos = 0
+    while pos < len (ops):
+        if ops[pos:pos + 1] == b'C':
+            start, length = struct.unpack_from ('>QQ', ops, pos + 1)
+            parts.append (base_content[start:start + length])
+            pos += 17
+        else:
+            length, = struct.unpack_from ('>Q', ops, pos + 1)
+            parts.append (ops[pos + 9:pos + 9 + length])
+            pos += 9 + length
+    return type_, b''.join (parts)
+
+def _delta_header (path):
+    """Return (base oid, depth) if the object file at path is a delta, else None."""
+    with open (path, 'rb') as f:
+        head = zlib.decompressobj ().decompress (f.read (1024), 256)
+    type_, _, rest = head.partition (b'\x00')
+    if type_ != b'delta':
+        return None
+    base, _, depth = rest.partition (b'\n')[0].decode ().split (' ')
+    return base, int (depth)
+
+def _delta_depth (oid):
+    delta = _delta_header (_object_path (oid))
+    return delta[1] if delta else 0
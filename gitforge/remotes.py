@@ -1,22 +1,53 @@
 import os
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import bloom
 from . import repository
 from . import objects
 
 REMOTE_REFS_BASE = 'refs/heads/'
 LOCAL_REFS_BASE = 'refs/remote'
+_REMOTE_REFS_BASE_LEN = len (REMOTE_REFS_BASE)
+
+def _concurrency (env_var):
+    # Object copies are I/O bound, so use a few workers per CPU by default
+    default = max (8, 3 * (os.cpu_count () or 1))
+    return int (os.environ.get (env_var, default))
+
+def _for_each_concurrently (func, oids, env_var):
+    """
+    Call func on every oid using a thread pool. oids may be a generator: calls start
+    while it is still producing. The first failure cancels pending calls and is re-raised.
+    """
+    with ThreadPoolExecutor (max_workers=_concurrency (env_var)) as executor:
+        futures = [executor.submit (func, oid) for oid in oids]
+        try:
+            for future in as_completed (futures):
+                future.result ()
+        except BaseException:
+            for future in futures:
+                future.cancel ()
+            raise
 
 def fetch (remote_path):
     # Get refs from server
     refs = _get_remote_refs (remote_path, REMOTE_REFS_BASE)
 
-    # Fetch missing objects by iterating and fetching on demand
-    for oid in repository.iter_objects_in_commits (refs.values ()):
-        objects.fetch_object_if_missing (oid, remote_path)
+    # List every object reachable from the server refs by walking the server's own
+    # store, so the copies below don't have to happen in traversal order
+    remote_objects = list (repository.iter_objects_in_commits (
+        refs.values (), git_dir=f'{remote_path}/.gitforge'))
+    missing = [oid for oid in remote_objects if not objects.object_exists (oid)]
+
+    # Fetch missing objects concurrently
+    _for_each_concurrently (lambda oid: objects.fetch_object_if_missing (oid, remote_path),
+                            missing, 'GITFORGE_FETCH_CONCURRENCY')
 
     # Update local refs to match server
     for remote_name, value in refs.items ():
-        refname = os.path.relpath (remote_name, REMOTE_REFS_BASE)
+        # Every name was listed under REMOTE_REFS_BASE, so just drop the prefix
+        refname = remote_name[_REMOTE_REFS_BASE_LEN:]
         objects.update_ref (f'{LOCAL_REFS_BASE}/{refname}',
                          objects.RefValue (symbolic=False, value=value))
 
@@ -28,6 +59,7 @@ def push (remote_path, refname):
     2. If the remote ref does exist, it must point to a commit that is an ancestor of the pushed ref. 
         This ancestry means that the local commit is based on the remote commit, 
         which means that the remote commit not getting overwritten, since it's part of the history of the newly pushed commit.
+    Returns False if the remote ref already matched and there was nothing to push.
     """
     # Get refs data
     remote_refs = _get_remote_refs (remote_path)
@@ -36,26 +68,69 @@ def push (remote_path, refname):
     if not local_ref:
         raise ValueError (f"Local ref '{refname}' does not exist. Cannot push a branch that doesn't exist locally.")
 
+    # Remote is already up to date - skip both history walks
+    if remote_ref == local_ref:
+        return False
+
     # Don't allow force push
     if remote_ref and not repository.is_ancestor_of (local_ref, remote_ref):
         raise ValueError (f"Push rejected: remote ref '{refname}' is not an ancestor of local ref. This would overwrite remote commits.")
 
     # Compute which objects the server doesn't have
-    known_remote_refs = filter (objects.object_exists, remote_refs.values ())
-    remote_objects = set (repository.iter_objects_in_commits (known_remote_refs))
-    local_objects = set (repository.iter_objects_in_commits ({local_ref}))
-    objects_to_push = local_objects - remote_objects
+    known_remote_refs = objects.objects_exist_batch (remote_refs.values ())
+    bloom_path = _bloom_path (known_remote_refs)
+    remote_filter = bloom.BloomFilter.load (bloom_path)
+    if remote_filter is None:
+        remote_objects = set (repository.iter_objects_in_commits (known_remote_refs))
+        # Leave room for the objects this and later pushes add
+        remote_filter = bloom.BloomFilter (2 * len (remote_objects) + 1024)
+        for oid in remote_objects:
+            remote_filter.add (oid)
+        is_missing = lambda oid: oid not in remote_objects
+    else:
+        # A miss means the server's history doesn't have the object; a hit may be
+        # a false positive, so confirm it against the server's store
+        remote_git_dir = f'{remote_path}/.gitforge'
+        is_missing = lambda oid: (oid not in remote_filter
+                                  or not objects.object_exists (oid, remote_git_dir))
+
+    # Push missing objects concurrently. Each one is handed to the workers as soon
+    # as the walk finds it, so uploading overlaps with walking the local history.
+    # The traversal yields each oid once, so no set of local objects is needed.
+    objects_to_push = []
+    def iter_objects_to_push ():
+        for oid in repository.iter_objects_in_commits ({local_ref}):
+            if is_missing (oid):
+                objects_to_push.append (oid)
+                yield oid
+    _for_each_concurrently (lambda oid: objects.push_object (oid, remote_path),
+                            iter_objects_to_push (), 'GITFORGE_PUSH_CONCURRENCY')
 
-    # Push missing objects
+    # Update server ref to our value, only once every object has arrived
+    objects.update_ref (refname, objects.RefValue (symbolic=False, value=local_ref),
+                        git_dir=f'{remote_path}/.gitforge')
+
+    # The server's history is now its old history plus what we pushed, so keep the
+    # filter for the next push against the new tips
     for oid in objects_to_push:
-        objects.push_object (oid, remote_path)
+        remote_filter.add (oid)
+    remote_refs[refname] = local_ref
+    new_bloom_path = _bloom_path (objects.objects_exist_batch (remote_refs.values ()))
+    if not remote_filter.full and new_bloom_path != bloom_path:
+        remote_filter.save (new_bloom_path)
+        # Nothing is left that would look the old tips up
+        if os.path.exists (bloom_path):
+            os.remove (bloom_path)
+    return True
 
-    # Update server ref to our value
-    with objects.change_git_dir (remote_path):
-        objects.update_ref (refname,
-                         objects.RefValue (symbolic=False, value=local_ref))
+def _bloom_path (remote_tips):
+    return f'{objects.GIT_DIR}/bloom/{bloom.key_for (remote_tips)}.bf'
 
 def _get_remote_refs (remote_path, prefix=''):
-    with objects.change_git_dir (remote_path):
-        return {refname: ref.value for refname, ref in objects.iter_refs (prefix)}
+    return dict (_iter_remote_refs (remote_path, prefix))
+
+def _iter_remote_refs (remote_path, prefix=''):
+    """Yield (refname, oid) pairs from the remote without building a dict or caching them."""
+    for refname, ref in objects.iter_refs (prefix, git_dir=f'{remote_path}/.gitforge'):
+        yield refname, ref.value
 
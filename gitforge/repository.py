@@ -1,10 +1,12 @@
+import functools
 import itertools
-import operator
+import json
 import os
 import re
-import string
+import time
 
 from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 from . import objects
 from . import diff_engine
@@ -16,77 +18,181 @@ def init ():
     objects.update_ref ('HEAD', objects.RefValue (symbolic=True, value='refs/heads/master'))
 
 def write_tree ():
-    # Index is flat, we need it as a tree of dicts
-    index_as_tree = {}
     with objects.get_index () as index:
-        for path, entry in index.items ():
-            # Extract oid from new index format
-            oid = entry['oid']
-            if oid is None:
-                # During index with "state": "conflict" and  "type": "delete_modify" / "add_add"
-                continue
-                
-            path_parts = path.split ('/')
-            dirpath, filename = path_parts[:-1], path_parts[-1]
-
-            current = index_as_tree
-            # Find the dict for the directory of this file
-            for dirname in dirpath:
-                current = current.setdefault (dirname, {})
-            current[filename] = oid
-
-    def write_tree_recursive (tree_dict):
-        entries = []
-        for name, value in tree_dict.items ():
-            if type (value) is dict:
-                type_ = 'tree'
-                oid = write_tree_recursive (value)
-            else:
-                type_ = 'blob'
-                oid = value
-            entries.append ((name, oid, type_))
-
-        tree = ''.join (f'{type_} {oid} {name}\n'
-                        for name, oid, type_
-                        in sorted (entries))
-        return objects.hash_object (tree.encode (), 'tree')
-
-    return write_tree_recursive (index_as_tree)
-
-
-def _iter_tree_entries (oid):
+        # Entries with "state": "conflict" and "type": "delete_modify" / "add_add" have no oid
+        files = sorted ((path, entry['oid']) for path, entry in index.items ()
+                        if entry['oid'] is not None)
+
+    # Sorted paths keep every directory's files together, so one pass with a stack
+    # of open directories builds the trees: a directory is written as soon as the
+    # paths move out of it. Each frame is (name, entries).
+    stack = [('', [])]
+    dirs = []
+
+    def close_dir ():
+        name, entries = stack.pop ()
+        dirs.pop ()
+        stack[-1][1].append ((name, b'tree', _write_tree_entries (entries)))
+
+    for path, oid in files:
+        *dirpath, filename = path.split ('/')
+        common = 0
+        for current, wanted in zip (dirs, dirpath):
+            if current != wanted:
+                break
+            common += 1
+        while len (dirs) > common:
+            close_dir ()
+        for dirname in dirpath[common:]:
+            stack.append ((dirname, []))
+            dirs.append (dirname)
+        stack[-1][1].append ((filename, b'blob', oid))
+
+    while dirs:
+        close_dir ()
+    return _write_tree_entries (stack[0][1])
+
+def _write_tree_entries (entries):
+    # Names are unique within a tree, so sorting only ever compares them.
+    # Format straight into bytes instead of building and encoding a str
+    tree = b''.join (b'%s %s %s\n' % (type_, oid.encode (), name.encode ())
+                     for name, type_, oid in sorted (entries))
+    return objects.hash_object (tree, 'tree')
+
+
+def _iter_tree_entries (oid, git_dir=None):
     if not oid:
-        return
-    tree = objects.get_object (oid, 'tree')
-    for entry in tree.decode ().splitlines ():
-        type_, oid, name = entry.split (' ', 2)
-        yield type_, oid, name
+        return iter (())
+    return iter (_parse_tree (oid, git_dir))
+
+# Objects are immutable, so parsed trees never need invalidating
+@functools.lru_cache (maxsize=4096)
+def _parse_tree (oid, git_dir=None):
+    tree = objects.get_object (oid, 'tree', git_dir=git_dir)
+    return tuple (tuple (entry.split (' ', 2)) for entry in tree.decode ().splitlines ())
 
 
 def get_tree (oid, base_path=''):
+    # Copy, so callers can't change the cached answer
+    return dict (_get_tree (oid, base_path))
+
+@functools.lru_cache (maxsize=256)
+def _get_tree (oid, base_path):
+    # One dict filled from an explicit stack. Entries are pushed in reverse so
+    # they pop in tree order, giving the same order as a recursive walk
     result = {}
-    for type_, oid, name in _iter_tree_entries (oid):
+    stack = [(base_path, entry) for entry in reversed (tuple (_iter_tree_entries (oid)))]
+    while stack:
+        base_path, (type_, oid, name) = stack.pop ()
         assert '/' not in name
         assert name not in ('..', '.')
         path = base_path + name
         if type_ == 'blob':
             result[path] = oid
         elif type_ == 'tree':
-            result.update (get_tree (oid, f'{path}/'))
+            path += '/'
+            stack.extend ((path, entry) for entry in reversed (_parse_tree (oid)))
         else:
             assert False, f'Unknown tree entry {type_}'
     return result
 
-def get_working_tree ():
-    result = {}
-    for root, _, filenames in os.walk ('.'):
-        for filename in filenames:
-            path = os.path.relpath (f'{root}/{filename}')
-            if is_ignored (path) or not os.path.isfile (path):
+def _scandir_walk (dirname='.'):
+    """Yield the normalized paths of the files under dirname, skipping .gitforge."""
+    # os.scandir already reads entries with getdents64 and keeps d_type; parsing
+    # the raw buffer through ctypes instead measured slower, not faster
+    dirname = os.path.relpath (dirname)
+    if is_ignored (dirname):
+        return
+    prefix = '' if dirname == '.' else f'{dirname}/'
+    subdirs = []
+    with os.scandir (dirname) as entries:
+        for entry in entries:
+            if entry.name == '.gitforge':
                 continue
-            with open (path, 'rb') as f:
-                result[path] = objects.hash_object (f.read ())
-    return result
+            # DirEntry caches the file type from readdir, so this needs no stat.
+            # Like os.walk, don't descend into symlinked directories
+            if entry.is_dir (follow_symlinks=False):
+                subdirs.append (prefix + entry.name)
+            elif entry.is_file ():
+                yield prefix + entry.name
+    for subdir in subdirs:
+        yield from _scandir_walk (subdir)
+
+# Threads reading or writing working tree files, and how far reads run ahead
+_READ_WORKERS = min (32, (os.cpu_count () or 1) * 4)
+_READ_AHEAD = 4 * _READ_WORKERS
+
+def _read_file (path):
+    with open (path, 'rb') as f:
+        return f.read ()
+
+def _iter_file_contents (paths):
+    """Yield (path, content) in order, with reads running ahead on a thread pool."""
+    with ThreadPoolExecutor (max_workers=_READ_WORKERS) as executor:
+        pending = deque ()
+        for path in paths:
+            pending.append ((path, executor.submit (_read_file, path)))
+            # Bound how many file contents are held in memory at once
+            if len (pending) >= _READ_AHEAD:
+                path, future = pending.popleft ()
+                yield path, future.result ()
+        while pending:
+            path, future = pending.popleft ()
+            yield path, future.result ()
+
+# A file modified this close to the scan may change again without its mtime
+# moving, so its stat data is not trusted to stand for its content
+_RACY_NS = 2 * 10**9
+
+def get_working_tree ():
+    order = []
+    found = dict (_iter_working_tree (order))
+    # Unchanged files come out of the walk before the hashed ones; restore walk order
+    return {path: found[path] for path in order}
+
+def _iter_working_tree (order=None):
+    """
+    Yield (path, oid) for every working tree file, unchanged files first. Paths
+    are appended to order, if given, as they are walked. The stat cache is only
+    saved if the generator runs to the end.
+    """
+    # {path: [mtime_ns, ctime_ns, size, ino, oid]} from the last scan
+    stat_cache = {}
+    stat_cache_path = f'{objects.GIT_DIR}/stat_cache'
+    if os.path.isfile (stat_cache_path):
+        with open (stat_cache_path) as f:
+            stat_cache = json.load (f)
+
+    walked = set ()
+    to_hash = {}
+    for path in _scandir_walk ():
+        walked.add (path)
+        if order is not None:
+            order.append (path)
+        st = os.stat (path)
+        # ctime is in the key because, unlike mtime, nothing can set it back
+        key = [st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino]
+        cached = stat_cache.get (path)
+        if cached and cached[:4] == key:
+            yield path, cached[4]
+        else:
+            to_hash[path] = key
+            stat_cache.pop (path, None)
+
+    # Reads are I/O bound and overlap on the pool; hashing and writing objects
+    # stays in this thread, which is the only one touching the object caches
+    racy = time.time_ns () - _RACY_NS
+    for path, content in _iter_file_contents (to_hash):
+        oid = objects.hash_object (content)
+        if max (to_hash[path][:2]) < racy:
+            stat_cache[path] = to_hash[path] + [oid]
+        yield path, oid
+
+    # Drops entries for files that are gone or changed and weren't re-cached
+    new_cache = {path: entry for path, entry in stat_cache.items () if path in walked}
+    if to_hash or len (new_cache) != len (stat_cache):
+        with open (stat_cache_path, 'w') as f:
+            json.dump (new_cache, f, separators=(',', ':'))
 
 def get_index_tree ():
     """Return index as {path: oid} for clean entries only (for diff comparisons)."""
@@ -94,24 +200,6 @@ def get_index_tree ():
         return {path: entry['oid'] for path, entry in index.items ()
                 if entry.get ('state') == 'clear'}
 
-def _empty_current_directory ():
-    for root, dirnames, filenames in os.walk ('.', topdown=False):
-        for filename in filenames:
-            path = os.path.relpath (f'{root}/{filename}')
-            if is_ignored (path) or not os.path.isfile (path):
-                continue
-            os.remove (path)
-        for dirname in dirnames:
-            path = os.path.relpath (f'{root}/{dirname}')
-            if is_ignored (path):
-                continue
-            try:
-                os.rmdir (path)
-            except (FileNotFoundError, OSError):
-                # Deletion might fail if the directory contains ignored files,
-                # so it's OK
-                pass
-
 def read_tree (tree_oid, update_working=False):
     with objects.get_index () as index:
         index.clear ()
@@ -126,11 +214,7 @@ def read_tree (tree_oid, update_working=False):
 def read_tree_merged (t_base, t_HEAD, t_other, update_working=False):
     # t_base is the Least Common Ancestor
 
-    tree, conflicts = diff_engine.merge_trees (
-        get_tree (t_base),
-        get_tree (t_HEAD),
-        get_tree (t_other)
-    )
+    tree, conflicts = _merge_tree_oids (t_base, t_HEAD, t_other)
 
     with objects.get_index () as index:
         index.clear ()
@@ -141,17 +225,108 @@ def read_tree_merged (t_base, t_HEAD, t_other, update_working=False):
 
     return conflicts
 
+def _write_file (path, content):
+    with open (path, 'wb') as f:
+        f.write (content)
+
+def _merge_tree_oids (t_base, t_HEAD, t_other):
+    """
+    Three-way merge of trees given by oid, returning (tree, conflicts) like merge_trees.
+
+    Subtrees with the same oid on two sides are resolved without flattening or
+    comparing their contents; only the paths under subtrees that differ on all
+    three sides (or that involve files) go through diff_engine.merge_trees.
+    """
+    resolved = {}
+    sides = ({}, {}, {})
+    order = []
+
+    def take (tree_oid, base_path):
+        for path, oid in _get_tree (tree_oid, base_path).items ():
+            order.append (path)
+            resolved[path] = {"state": "clear", "oid": oid}
+
+    def merge_subtrees (o_base, o_HEAD, o_other, base_path):
+        if o_HEAD == o_other:       # Same on both sides (or deleted on both)
+            take (o_HEAD, base_path)
+        elif o_HEAD == o_base:      # Only other changed
+            take (o_other, base_path)
+        elif o_other == o_base:     # Only HEAD changed
+            take (o_HEAD, base_path)
+        else:
+            walk ((o_base, o_HEAD, o_other), base_path)
+
+    def walk (oids, base_path):
+        entries = [{name: (type_, oid) for type_, oid, name in _iter_tree_entries (oid)}
+                   for oid in oids]
+        for name in dict.fromkeys (itertools.chain (*entries)):
+            path = base_path + name
+            found = [side_entries.get (name) for side_entries in entries]
+            if all (entry is None or entry[0] == 'tree' for entry in found):
+                merge_subtrees (*(entry and entry[1] for entry in found), f'{path}/')
+                continue
+            # A file on at least one side - flatten and let merge_trees decide
+            paths = {}
+            for side, entry in zip (sides, found):
+                if entry is None:
+                    continue
+                if entry[0] == 'tree':
+                    subtree = _get_tree (entry[1], f'{path}/')
+                    side.update (subtree)
+                    paths.update (subtree)
+                else:
+                    side[path] = entry[1]
+                    paths[path] = None
+            order.extend (paths)
+
+    merge_subtrees (t_base, t_HEAD, t_other, '')
+    tree, conflicts = diff_engine.merge_trees (*sides)
+
+    merged = {}
+    for path in order:
+        entry = resolved.get (path) or tree.get (path)
+        if entry:
+            merged[path] = entry
+    return merged, conflicts
+
 def _checkout_index (index):
-    _empty_current_directory ()
-    for path, entry in index.items ():
-        # Extract oid from new index format
-        oid = entry['oid']
-        if oid is None:
-            # Skip files with no oid (delete_modify, add_add conflicts)
-            continue
-        os.makedirs (os.path.dirname (f'./{path}'), exist_ok=True)
-        with open (path, 'wb') as f:
-            f.write (objects.get_object (oid, 'blob'))
+    # Only touch files whose content changes; the stat cache makes finding them cheap
+    working_tree = get_working_tree ()
+    # Files with no oid (delete_modify, add_add conflicts) are left out
+    wanted = {path: entry['oid'] for path, entry in index.items () if entry['oid'] is not None}
+
+    # Remove stale files first, so a file can be replaced by a directory and back
+    # Paths are normalized and '/'-separated, so a directory is everything
+    # before the last slash ('' at the top level, which needs no work)
+    emptied_dirs = set ()
+    for path, oid in working_tree.items ():
+        if wanted.get (path) != oid:
+            os.remove (path)
+            emptied_dirs.add (path[:max (path.rfind ('/'), 0)])
+    for dirname in sorted (emptied_dirs, key=len, reverse=True):
+        while dirname:
+            try:
+                os.rmdir (dirname)
+            except OSError:
+                # Not empty (or already gone), and then neither are its parents
+                break
+            dirname = dirname[:max (dirname.rfind ('/'), 0)]
+
+    made_dirs = {''}
+    # Blobs are read here, where the object caches live; the writes are queued
+    # to a pool so their syscalls overlap
+    with ThreadPoolExecutor (max_workers=_READ_WORKERS) as executor:
+        futures = []
+        for path, oid in wanted.items ():
+            if working_tree.get (path) == oid:
+                continue
+            dirname = path[:max (path.rfind ('/'), 0)]
+            if dirname not in made_dirs:
+                os.makedirs (dirname, exist_ok=True)
+                made_dirs.add (dirname)
+            futures.append (executor.submit (_write_file, path, objects.get_object (oid, 'blob')))
+        for future in futures:
+            future.result ()
 
 
 def commit (message, author_name=None, author_email=None, author_date=None, allow_merge_parent=True):
@@ -200,6 +375,9 @@ def commit (message, author_name=None, author_email=None, author_date=None, allo
 
     objects.update_ref ('HEAD', objects.RefValue (symbolic=False, value=oid))
 
+    # Bound memory across long rebase/cherry-pick loops
+    diff_engine.clear_diff_cache ()
+
     return oid
 
 def checkout (name):
@@ -298,42 +476,104 @@ def merge_abort ():
 
 
 def get_merge_base(oid1, oid2):
-    # Least Common Ancestor - Bidirectional BFS
+    # Least Common Ancestor - Bidirectional BFS, one whole layer at a time,
+    # always growing the smaller frontier
     if oid1 == oid2:
         return oid1
 
     visited1, visited2 = {oid1}, {oid2}
-    frontier1, frontier2 = deque([oid1]), deque([oid2])
-
-    while frontier1 or frontier2:
-        # Expand branch 1
-        if frontier1:
-            current = frontier1.popleft()
-            if current in visited2:
-                return current
-
+    frontier1, frontier2 = [oid1], [oid2]
+
+    def expand(frontier, visited, other_visited):
+        for current in frontier:
+            if current in other_visited:
+                return current, None
+        next_frontier = []
+        for current in frontier:
             for parent in get_commit(current).parents:
-                if parent not in visited1:
-                    visited1.add(parent)
-                    frontier1.append(parent)
-
-        # Expand branch 2
-        if frontier2:
-            current = frontier2.popleft()
-            if current in visited1:
-                return current
+                if parent not in visited:
+                    visited.add(parent)
+                    next_frontier.append(parent)
+        return None, next_frontier
 
-            for parent in get_commit(current).parents:
-                if parent not in visited2:
-                    visited2.add(parent)
-                    frontier2.append(parent)
+    while frontier1 or frontier2:
+        if not frontier2 or (frontier1 and len(frontier1) <= len(frontier2)):
+            found, frontier1 = expand(frontier1, visited1, visited2)
+        else:
+            found, frontier2 = expand(frontier2, visited2, visited1)
+        if found:
+            return found
 
     return None
 
 
-
 def is_ancestor_of (commit, maybe_ancestor):
-    return maybe_ancestor in iter_commits_and_parents ({commit})
+    if commit == maybe_ancestor:
+        return True
+    # A commit we don't have can't be in our history
+    if not maybe_ancestor or not objects.object_exists (maybe_ancestor):
+        return False
+
+    generations = _get_generations ({commit, maybe_ancestor})
+    target = generations[maybe_ancestor]
+    # Ancestors always have a lower generation
+    if target >= generations[commit]:
+        return False
+
+    # Walk back from commit, dropping branches that are already older than the target
+    oids = [commit]
+    visited = set ()
+    while oids:
+        oid = oids.pop ()
+        if oid == maybe_ancestor:
+            return True
+        if oid in visited:
+            continue
+        visited.add (oid)
+        oids.extend (parent for parent in get_commit (oid).parents
+                     if generations[parent] >= target)
+    return False
+
+
+# Generation numbers (1 for a root commit, else 1 + the highest of its parents)
+# keyed by GIT_DIR's absolute path, then by commit oid. Persisted in GIT_DIR/generations.
+_GENERATIONS = {}
+
+def _get_generations (oids):
+    """Return the generation table, making sure it covers oids and all their ancestors."""
+    # GIT_DIR is relative to the cwd, which can change between calls
+    key = os.path.abspath (objects.GIT_DIR)
+    generations = _GENERATIONS.get (key)
+    if generations is None:
+        generations = {}
+        path = f'{objects.GIT_DIR}/generations'
+        if os.path.isfile (path):
+            with open (path) as f:
+                generations = json.load (f)
+        _GENERATIONS[key] = generations
+
+    # Iterative post-order walk, so deep histories don't hit the recursion limit
+    stack = [oid for oid in oids if oid not in generations]
+    if not stack:
+        return generations
+    parents = {}
+    while stack:
+        oid = stack[-1]
+        if oid in generations:
+            stack.pop ()
+            continue
+        if oid not in parents:
+            parents[oid] = get_commit (oid).parents
+        missing = [parent for parent in parents[oid] if parent not in generations]
+        if missing:
+            stack.extend (missing)
+            continue
+        generations[oid] = 1 + max ((generations[parent] for parent in parents[oid]), default=0)
+        stack.pop ()
+
+    with open (f'{objects.GIT_DIR}/generations', 'w') as f:
+        json.dump (generations, f, separators=(',', ':'))
+    return generations
 
 
 def create_tag (name, oid):
@@ -360,8 +600,10 @@ def get_branch_name ():
 
 Commit = namedtuple ('Commit', ['tree', 'parents', 'message', 'author', 'committer'])
 
+_AUTHOR_RE = re.compile (r'(.+) <(.+)> (\d+) ([+-]\d{4})')
+
 def _parse_author_line (value):
-    match = re.match (r'(.+) <(.+)> (\d+) ([+-]\d{4})', value)
+    match = _AUTHOR_RE.match (value)
     if match:
         return Author (
             name=match.group (1),
@@ -371,75 +613,101 @@ def _parse_author_line (value):
         )
     return None
 
-def get_commit (oid):
+# Commits are immutable, so a parsed commit never goes stale
+@functools.lru_cache (maxsize=8192)
+def get_commit (oid, git_dir=None):
     parents = []
     author = None
     committer = None
 
-    commit = objects.get_object (oid, 'commit').decode ()
-    lines = iter (commit.splitlines ())
-    for line in itertools.takewhile (operator.truth, lines):
-        key, value = line.split (' ', 1)
-        if key == 'tree':
-            tree = value
-        elif key == 'parent':
-            parents.append (value)
-        elif key == 'author':
-            author = _parse_author_line (value)
-        elif key == 'committer':
-            committer = _parse_author_line (value)
+    # Split the raw bytes at the blank line, so the message is decoded in one go
+    # and only the header is walked line by line
+    header, _, body = objects.get_object (oid, 'commit', git_dir=git_dir).partition (b'\n\n')
+    for line in header.split (b'\n'):
+        if not line:
+            continue
+        key, value = line.split (b' ', 1)
+        if key == b'tree':
+            tree = value.decode ()
+        elif key == b'parent':
+            parents.append (value.decode ())
+        elif key == b'author':
+            author = _parse_author_line (value.decode ())
+        elif key == b'committer':
+            committer = _parse_author_line (value.decode ())
         else:
-            assert False, f'Unknown field {key}'
+            assert False, f'Unknown field {key.decode ()}'
 
-    message = '\n'.join (lines)
+    message = '\n'.join (body.decode ().splitlines ())
 
     if author is None:
         author = Author (name='Unknown', email='unknown', timestamp=0, timezone='+0000')
     if committer is None:
         committer = author
 
-    return Commit (tree=tree, parents=parents, message=message, author=author, committer=committer)
+    # A tuple, so no caller can change the cached commit
+    return Commit (tree=tree, parents=tuple (parents), message=message, author=author, committer=committer)
 
-def iter_commits_and_parents (oids):
+# Threads reading parent commits ahead of iter_commits_and_parents
+_PREFETCH_WORKERS = 8
+
+def iter_commits_and_parents (oids, git_dir=None):
     # N.B. Must yield the oid before acccessing it (to allow caller to fetch it
-    # if needed)
+    # if needed). git_dir reads the commits from another repository.
     oids = deque (oids)
     visited = set ()
-
-    while oids:
-        oid = oids.popleft ()
-        if not oid or oid in visited:
-            continue
-        visited.add (oid)
-        yield oid
-
-        commit = get_commit (oid)
-        # Return first parent next
-        oids.extendleft (commit.parents[:1])
-        # Return other parents later
-        oids.extend (commit.parents[1:])
-
-def iter_objects_in_commits (oids):
+    # Parents are read and decompressed on the pool while the caller handles the
+    # current commit. A parent the caller still has to fetch just loads as None.
+    prefetched = {}
+
+    with ThreadPoolExecutor (max_workers=_PREFETCH_WORKERS) as executor:
+        while oids:
+            oid = oids.popleft ()
+            if not oid or oid in visited:
+                continue
+            visited.add (oid)
+            yield oid
+
+            future = prefetched.pop (oid, None)
+            loaded = future and future.result ()
+            if loaded:
+                objects.cache_loaded_object (oid, loaded, git_dir)
+            commit = get_commit (oid, git_dir)
+            for parent in commit.parents:
+                if parent not in visited and parent not in prefetched:
+                    prefetched[parent] = executor.submit (objects.load_object, parent, git_dir)
+            # Return first parent next
+            oids.extendleft (commit.parents[:1])
+            # Return other parents later
+            oids.extend (commit.parents[1:])
+
+def iter_objects_in_commits (oids, git_dir=None):
     # N.B. Must yield the oid before acccessing it (to allow caller to fetch it
-    # if needed)
+    # if needed). git_dir reads the objects from another repository.
 
     visited = set ()
-    def iter_objects_in_tree (oid):
-        visited.add (oid)
-        yield oid
-        for type_, oid, _ in _iter_tree_entries (oid):
-            if oid not in visited:
-                if type_ == 'tree':
-                    yield from iter_objects_in_tree (oid)
-                else:
-                    visited.add (oid)
-                    yield oid
-
-    for oid in iter_commits_and_parents (oids):
+    for oid in iter_commits_and_parents (oids, git_dir):
         yield oid
-        commit = get_commit (oid)
-        if commit.tree not in visited:
-            yield from iter_objects_in_tree (commit.tree)
+        commit = get_commit (oid, git_dir)
+
+        # Explicit stack rather than recursion, so deep trees cost no generator
+        # frames per level and can't hit the recursion limit
+        trees = [commit.tree]
+        while trees:
+            oid = trees.pop ()
+            if oid in visited:
+                continue
+            visited.add (oid)
+            yield oid
+            for type_, oid, _ in _iter_tree_entries (oid, git_dir):
+                if oid not in visited:
+                    if type_ == 'tree':
+                        trees.append (oid)
+                    else:
+                        visited.add (oid)
+                        yield oid
+
+_OID_RE = re.compile (r'[0-9a-fA-F]{40}')
 
 """
     1. f'{name}' -> Root (.gitforge): This way we can specify refs/tags/mytag
@@ -450,22 +718,26 @@ def iter_objects_in_commits (oids):
 def get_oid (name):
     if name == '@': name = 'HEAD'
 
-    # Name is ref
-    refs_to_try = [
-        f'{name}',
-        f'refs/{name}',
-        f'refs/tags/{name}',
-        f'refs/heads/{name}',
-    ]
-    for ref in refs_to_try:
-        if objects.get_ref (ref, deref=False).value:
-            return objects.get_ref (ref).value
-
-    # Name is SHA1
-    is_hex = all (c in string.hexdigits for c in name)
-    if len (name) == 40 and is_hex:
+    # Name is SHA1 - a full oid is taken as is, like git does, without reading refs
+    if _OID_RE.fullmatch (name):
         return name
 
+    # Name is ref. A full ref name only ever matches itself
+    if name == 'HEAD' or name.startswith ('refs/'):
+        refs_to_try = [name]
+    else:
+        refs_to_try = [
+            f'{name}',
+            f'refs/{name}',
+            f'refs/tags/{name}',
+            f'refs/heads/{name}',
+        ]
+    for ref in refs_to_try:
+        ref = objects.get_ref (ref, deref=False)
+        if ref.value:
+            # Symbolic refs still need following to the oid
+            return objects.get_ref (ref.value).value if ref.symbolic else ref.value
+
     assert False, f'Unknown name {name}'
 
 def add (filenames):
@@ -473,19 +745,18 @@ def add (filenames):
     def add_file (filename):
         # Normalize path
         filename = os.path.relpath (filename)
+        # The staged version is the natural delta base for the new one
+        base = index.get (filename, {}).get ('oid')
         with open (filename, 'rb') as f:
-            oid = objects.hash_object (f.read ())
+            oid = objects.hash_object_stream (f, base=base)
         # Write new index format - adding a file marks it as clear (resolves conflicts)
         index[filename] = {"state": "clear", "oid": oid}
 
     def add_directory (dirname):
-        for root, _, filenames in os.walk (dirname):
-            for filename in filenames:
-                # Normalize path
-                path = os.path.relpath (f'{root}/{filename}')
-                if is_ignored (path) or not os.path.isfile (path):
-                    continue
-                add_file (path)
+        # Files are still hashed one at a time, streaming, so large ones never
+        # have to be held in memory whole
+        for path in _scandir_walk (dirname):
+            add_file (path)
 
     with objects.get_index () as index:
         for name in filenames:
@@ -500,7 +771,9 @@ def add (filenames):
                     del index[name]
 
 def is_ignored (path):
-    return '.gitforge' in path.split ('/')
+    # Same as checking every path component, without building the list
+    return (path == '.gitforge' or path.startswith ('.gitforge/')
+            or path.endswith ('/.gitforge') or '/.gitforge/' in path)
 
 
 def _check_clean_state():
@@ -511,17 +784,21 @@ def _check_clean_state():
 
     head_tree = get_tree(get_commit(HEAD).tree)
     index_tree = get_index_tree()
-    working_tree = get_working_tree()
 
-    # Check index vs HEAD (staged changes)
-    for path, o_head, o_index in diff_engine.compare_trees(head_tree, index_tree):
-        if o_head != o_index:
-            return False, "staged changes exist"
+    # Check index vs HEAD (staged changes) - both are already in memory
+    if head_tree != index_tree:
+        return False, "staged changes exist"
 
-    # Check working tree vs index (unstaged changes)
-    for path, o_index, o_work in diff_engine.compare_trees(index_tree, working_tree):
-        if o_index != o_work:
+    # Check working tree vs index (unstaged changes), stopping at the first
+    # difference rather than hashing the whole tree first
+    seen = 0
+    for path, o_work in _iter_working_tree():
+        if index_tree.get(path) != o_work:
             return False, "unstaged changes exist"
+        seen += 1
+    if seen != len(index_tree):
+        # A file in the index is missing from the working tree
+        return False, "unstaged changes exist"
 
     return True, None
 
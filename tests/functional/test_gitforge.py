@@ -12,19 +12,36 @@ This script tests all gitforge commands including:
 - Utilities: status, reset, config
 
 Usage:
-    python test_gitforge.py
+    python test_gitforge.py                      # test classes in parallel; GITFORGE_TEST_JOBS=N
     python test_gitforge.py TestGitforge.test_init
     python -m pytest test_gitforge.py -v
+    python -m pytest test_gitforge.py -n auto    # parallel, needs pytest-xdist
+    GITFORGE_TEST_SUBPROCESS=1 python -m pytest test_gitforge.py   # one process per command
+    GITFORGE_TEST_SUBPROCESS=persistent python -m pytest test_gitforge.py   # one process per class
 """
 
+import atexit
+import compileall
+import concurrent.futures
+import contextlib
+import difflib
+import functools
+import hashlib
+import io
+import itertools
 import json
+import multiprocessing
 import os
+import re
 import shutil
 import subprocess
 import sys
 import tempfile
+import time
+import traceback
 import unittest
 from pathlib import Path
+from unittest import mock
 
 # Path to the gitforge package
 # Resolve to absolute path to handle different working directories
@@ -44,6 +61,289 @@ if not GITFORGE_RUNNER.exists():
         print(f"Also tried: {alt_runner}")
         print(f"Current file: {Path(__file__).resolve()}")
 
+# Probed once here rather than on every command
+GITFORGE_RUNNER_EXISTS = GITFORGE_RUNNER.exists()
+GITFORGE_CMD_PREFIX = (sys.executable, str(GITFORGE_RUNNER))
+
+# Test repositories are many small files, so keep them in RAM where possible.
+# GITFORGE_TEST_TMP overrides the location; otherwise /dev/shm is used if
+# writable, else the platform's default temp directory.
+TEST_TMP = os.environ.get("GITFORGE_TEST_TMP") or (
+    "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None)
+
+# Set by pytest-xdist; keeps each worker's temp directories apart
+XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+
+# Commands run inside this process by default, which skips an interpreter
+# start-up per command. Set GITFORGE_TEST_SUBPROCESS=1 to run every command
+# through the runner script instead, end to end, or
+# GITFORGE_TEST_SUBPROCESS=persistent to keep one `gitforge --batch` process
+# per test class and feed it the tests' commands one at a time.
+USE_PERSISTENT = os.environ.get("GITFORGE_TEST_SUBPROCESS") == "persistent"
+USE_SUBPROCESS = USE_PERSISTENT or os.environ.get("GITFORGE_TEST_SUBPROCESS") == "1"
+
+# The in-process runner imports gitforge from this checkout
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+# An identity from the developer's shell would override the user.* config the
+# tests set, so drop it here; in-process commands read os.environ directly
+for _name in ("GITFORGE_AUTHOR_NAME", "GITFORGE_AUTHOR_EMAIL",
+              "GIT_AUTHOR_NAME", "GIT_AUTHOR_EMAIL"):
+    os.environ.pop(_name, None)
+
+# Child processes only read bytecode, so many of them starting at once don't
+# all write the same .pyc files. It is compiled once here instead, so they
+# don't each compile from source either.
+SUBPROCESS_ENV = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+if TEST_TMP:
+    # gitforge's own temp files (diff inputs) go there too, whether it runs
+    # in a child process or in this one
+    SUBPROCESS_ENV["TMPDIR"] = TEST_TMP
+    tempfile.tempdir = TEST_TMP
+# Each xdist worker's children get a HOME of their own, so nothing they run
+# can read or write the developer's dotfiles or another worker's
+SUBPROCESS_ENV["HOME"] = tempfile.mkdtemp(prefix=f"gitforge_home_{XDIST_WORKER}_", dir=TEST_TMP)
+atexit.register(shutil.rmtree, SUBPROCESS_ENV["HOME"], True)
+if USE_SUBPROCESS:
+    compileall.compile_dir(str(REPO_ROOT / "gitforge"), quiet=1)
+
+# Repos built once by _clone_built and copied into tests, keyed by what they
+# contain. Created before run_tests forks, so its workers' templates are
+# removed along with it.
+TEMPLATE_ROOT = tempfile.mkdtemp(prefix=f"gitforge_templates_{XDIST_WORKER}_", dir=TEST_TMP)
+atexit.register(shutil.rmtree, TEMPLATE_ROOT, True)
+_TEMPLATES = {}
+
+
+# One conflicted region of a merged file; the base section is only there in
+# diff3-style output
+CONFLICT_RE = re.compile(
+    r"^<<<<<<< ?(?P<ours_label>[^\n]*)\n(?P<ours>.*?)"
+    r"(?:^\|\|\|\|\|\|\|[^\n]*\n(?P<base>.*?))?"
+    r"^=======\n(?P<theirs>.*?)^>>>>>>>[^\n]*$",
+    re.MULTILINE | re.DOTALL)
+
+
+def setUpModule():
+    # Without the runner every subprocess-mode command would fail the same
+    # way; in-process mode imports gitforge from this checkout and needs none
+    if USE_SUBPROCESS and not GITFORGE_RUNNER_EXISTS:
+        raise unittest.SkipTest(f"gitforge runner not found at {GITFORGE_RUNNER}")
+
+
+def _decode_output(data):
+    """Decode captured output the way subprocess.run(text=True) does."""
+    return io.TextIOWrapper(io.BytesIO(data)).read()
+
+
+class Result:
+    """The outcome of one command; output is captured as bytes and decoded on first use."""
+
+    __slots__ = ("args", "returncode", "_out", "_err", "_stdout", "_stderr", "_stdout_lower")
+
+    def __init__(self, args, returncode, out, err):
+        self.args = args
+        self.returncode = returncode
+        self._out = out
+        self._err = err
+        self._stdout = None
+        self._stderr = None
+        self._stdout_lower = None
+
+    @property
+    def stdout(self):
+        if self._stdout is None:
+            self._stdout = _decode_output(self._out)
+        return self._stdout
+
+    @property
+    def stderr(self):
+        if self._stderr is None:
+            self._stderr = _decode_output(self._err)
+        return self._stderr
+
+    @property
+    def oid(self):
+        """The object id the command printed, e.g. commit's, taken from the raw bytes."""
+        return self._out.strip().decode("ascii")
+
+    @property
+    def stdout_lower(self):
+        """stdout lowercased, for case-insensitive checks; computed once."""
+        if self._stdout_lower is None:
+            self._stdout_lower = self.stdout.lower()
+        return self._stdout_lower
+
+
+def _batch_result(command, line):
+    """Turn one line of `gitforge --batch` output back into a Result."""
+    outcome = json.loads(line)
+    return Result(
+        list(command), outcome["returncode"],
+        outcome["stdout"].encode("utf-8", "surrogateescape"),
+        outcome["stderr"].encode("utf-8", "surrogateescape"))
+
+
+class PersistentRunner:
+    """A long-lived `gitforge --batch` process that runs one command per call.
+
+    --batch flushes each result as soon as its command finishes, so writing a
+    line and reading one back works like a REPL, and the interpreter start-up
+    and imports are paid once instead of once per command. Each command names
+    its own working directory, so one process serves every repo a test uses.
+    """
+
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            GITFORGE_CMD_PREFIX + ("--batch",),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=SUBPROCESS_ENV)
+
+    def run(self, working_dir, *args):
+        request = {"argv": args, "cwd": str(working_dir)}
+        self.proc.stdin.write(json.dumps(request).encode() + b"\n")
+        self.proc.stdin.flush()
+        line = self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"gitforge --batch exited with {self.proc.wait()}")
+        return _batch_result(args, line)
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.stdout.close()
+        self.proc.wait()
+
+
+def run_gitforge_subprocess(working_dir, *args, input=None, capture=True, env=None):
+    """Run one gitforge command through the runner script in its own process.
+
+    capture is True for both streams, "stdout" for stdout only, or False for
+    neither. Uncaptured stdout is discarded; uncaptured stderr goes straight
+    to this process's stderr. Either way the pipe is saved and the Result's
+    stream is empty.
+    """
+    proc = subprocess.run(GITFORGE_CMD_PREFIX + args, input=input,
+                          stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+                          stderr=subprocess.PIPE if capture is True else None,
+                          cwd=working_dir, env={**SUBPROCESS_ENV, **env} if env else SUBPROCESS_ENV)
+    return Result(proc.args, proc.returncode, proc.stdout or b"", proc.stderr or b"")
+
+
+def _current_branch(repo_dir):
+    with open(os.path.join(repo_dir, ".gitforge", "HEAD")) as f:
+        head = f.read().strip()
+    if not head.startswith("ref:"):
+        return None
+    return head.partition("refs/heads/")[2]
+
+
+# Fixture contents, encoded once at import rather than on every use
+SPECIAL_CONTENT = "Special: <>&\"'`$@#%^*()[]{}|\\;:,.\nUnicode: 你好世界 🎉\n".encode("utf-8")
+
+
+@functools.lru_cache(maxsize=None)
+def large_content():
+    """Ten thousand numbered lines, built on first use."""
+    return "\n".join(map("Line {}".format, range(10000))).encode()
+
+
+# rm walks and unlinks a tree in C, which beats shutil.rmtree on the many
+# small files a test class leaves behind
+RM = shutil.which("rm") if os.name == "posix" else None
+
+
+# Copy-on-write where the filesystem supports it (btrfs, XFS); a plain copy otherwise
+CP = shutil.which("cp") if sys.platform.startswith("linux") else None
+
+
+def _copy_tree(src, dst):
+    """Copy the contents of directory src into the existing directory dst."""
+    if CP and subprocess.run([CP, "-R", "--reflink=auto", f"{src}/.", dst],
+                             stderr=subprocess.DEVNULL).returncode == 0:
+        return
+    shutil.copytree(src, dst, dirs_exist_ok=True)
+
+
+def _remove_tree(path):
+    """Delete a test directory tree, ignoring errors."""
+    if RM:
+        subprocess.run([RM, "-rf", "--", path], check=False)
+    else:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _write_bytes(path, data):
+    """Write a file with one open/write/close and no text layer."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def run_gitforge_in(working_dir, *args, input=None, capture=True, env=None):
+    """Run one gitforge command in working_dir and return its Result.
+
+    input, if given, is fed to the command's stdin as bytes. env holds extra
+    environment variables for this command only. capture (see
+    run_gitforge_subprocess) only matters in subprocess mode; in-process
+    output is always captured, which costs no pipe, and decoded lazily.
+    """
+    if USE_SUBPROCESS:
+        if not GITFORGE_RUNNER_EXISTS:
+            raise FileNotFoundError(
+                f"gitforge runner not found at: {GITFORGE_RUNNER}\n"
+                f"PROJECT_ROOT: {PROJECT_ROOT}\n"
+                f"Current working directory: {os.getcwd()}\n"
+                f"Test file location: {Path(__file__).resolve()}"
+            )
+        return run_gitforge_subprocess(working_dir, *args, input=input, capture=capture, env=env)
+    return _run_gitforge_here(working_dir, args, input, env)
+
+
+def _run_gitforge_here(working_dir, args, input, env):
+    """Run one gitforge command in this process, capturing its output."""
+    from gitforge import cli
+
+    # Byte-backed streams, since some commands write to sys.stdout.buffer
+    out = io.TextIOWrapper(io.BytesIO(), encoding="utf-8", newline="")
+    err = io.TextIOWrapper(io.BytesIO(), encoding="utf-8", newline="")
+    returncode = 0
+    old_cwd = os.getcwd()
+    old_stdin = sys.stdin
+    if input is not None:
+        sys.stdin = io.TextIOWrapper(io.BytesIO(input), encoding="utf-8")
+    old_env = {name: os.environ.get(name) for name in env or ()}
+    os.environ.update(env or {})
+    os.chdir(working_dir)
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                cli.main(list(args))
+            except SystemExit as e:
+                if e.code is None or isinstance(e.code, int):
+                    returncode = e.code or 0
+                else:
+                    # Like the interpreter: print the message and exit with 1
+                    print(e.code, file=sys.stderr)
+                    returncode = 1
+            except Exception:
+                # An uncaught exception ends a real run with a traceback and status 1
+                traceback.print_exc()
+                returncode = 1
+    finally:
+        os.chdir(old_cwd)
+        sys.stdin = old_stdin
+        for name, value in old_env.items():
+            if value is None:
+                del os.environ[name]
+            else:
+                os.environ[name] = value
+        out.flush()
+        err.flush()
+    return Result(list(args), returncode, out.buffer.getvalue(), err.buffer.getvalue())
+
 
 class GitforgeTestBase(unittest.TestCase):
     """Base class for gitforge tests with common utilities."""
@@ -51,7 +351,9 @@ class GitforgeTestBase(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         """Create a temporary directory for all tests."""
-        cls.test_base_dir = tempfile.mkdtemp(prefix="gitforge_test_")
+        cls.test_base_dir = tempfile.mkdtemp(prefix=f"gitforge_test_{XDIST_WORKER}_", dir=TEST_TMP)
+        # One read of random bytes that create_random_file slices from
+        cls._rand_blob = os.urandom(1 << 20)
         print(f"\n{'='*60}")
         print(f"Test directory: {cls.test_base_dir}")
         print(f"{'='*60}\n")
@@ -59,31 +361,31 @@ class GitforgeTestBase(unittest.TestCase):
     @classmethod
     def tearDownClass(cls):
         """Clean up the temporary directory."""
-        if os.path.exists(cls.test_base_dir):
-            shutil.rmtree(cls.test_base_dir)
+        _remove_tree(cls.test_base_dir)
 
     def setUp(self):
         """Create a fresh test directory for each test."""
+        # Commands run with cwd=self.test_dir, so the process-wide cwd is left
+        # alone and tests can run side by side
         self.test_dir = tempfile.mkdtemp(dir=self.test_base_dir)
-        os.chdir(self.test_dir)
+        # Built once; the file helpers join names onto it
+        self._root = Path(self.test_dir)
 
-    def run_gitforge(self, *args, expect_success=True):
-        """Run a gitforge command and return the result."""
-        if not GITFORGE_RUNNER.exists():
-            raise FileNotFoundError(
-                f"gitforge runner not found at: {GITFORGE_RUNNER}\n"
-                f"PROJECT_ROOT: {PROJECT_ROOT}\n"
-                f"Current working directory: {os.getcwd()}\n"
-                f"Test file location: {Path(__file__).resolve()}"
-            )
-        
-        cmd = [sys.executable, str(GITFORGE_RUNNER)] + list(args)
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=self.test_dir
-        )
+    def run_gitforge(self, *args, expect_success=True, capture=None, author=None):
+        """Run a gitforge command and return the result.
+
+        capture defaults to both streams for commands expected to fail and to
+        stdout only otherwise; pass capture=False when the test only looks at
+        returncode. See run_gitforge_subprocess. author, a (name, email) pair,
+        is the identity for this command only, overriding the repo's config.
+        """
+        if capture is None:
+            capture = True if not expect_success else "stdout"
+        env = self._author_env(author)
+        if USE_PERSISTENT and not env:
+            result = self._persistent_runner().run(self.test_dir, *args)
+        else:
+            result = run_gitforge_in(self.test_dir, *args, capture=capture, env=env)
         
         if expect_success and result.returncode != 0:
             print(f"Command failed: {' '.join(args)}")
@@ -92,29 +394,325 @@ class GitforgeTestBase(unittest.TestCase):
         
         return result
 
+    @staticmethod
+    def _author_env(author):
+        """The environment that makes author, a (name, email) pair, the identity; None for no author."""
+        if not author:
+            return None
+        return {"GITFORGE_AUTHOR_NAME": author[0], "GITFORGE_AUTHOR_EMAIL": author[1]}
+
+    def run_gitforge_batch(self, commands, author=None):
+        """Run a list of commands through one `gitforge --batch` call.
+
+        Returns one Result per command. In subprocess mode this costs a
+        single process start instead of one per command, and in persistent
+        mode none. author applies to every command, as in run_gitforge.
+        A command may also be a {"argv": ..., "cwd": ...} dict, as --batch
+        takes it, to run in another directory.
+        """
+        env = self._author_env(author)
+        requests = [command if isinstance(command, dict) else {"argv": list(command)}
+                    for command in commands]
+        if USE_PERSISTENT and not env:
+            # Already a --batch process, so no second one is needed
+            runner = self._persistent_runner()
+            return [runner.run(request.get("cwd", self.test_dir), *request["argv"])
+                    for request in requests]
+        script = "".join(json.dumps(request) + "\n" for request in requests)
+        result = run_gitforge_in(self.test_dir, "--batch", input=script.encode(), env=env)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        results = [_batch_result(request["argv"], line)
+                   for request, line in zip(requests, result.stdout.splitlines())]
+        self.assertEqual(len(results), len(commands), result.stderr)
+        return results
+
+    def _persistent_runner(self):
+        """The class's PersistentRunner, started on first use and stopped after its last test.
+
+        Sharing it is safe since every command names its own directory and
+        gitforge drops its caches when it switches repository.
+        """
+        cls = type(self)
+        if cls.__dict__.get("_runner") is None:
+            cls._runner = PersistentRunner()
+            cls.addClassCleanup(cls._runner.close)
+        return cls._runner
+
+    def linear_history(self, files_and_messages):
+        """Init a repo and commit each (name, content, message) in turn.
+
+        Commands go through run_gitforge_batch, split only where a file has
+        to be rewritten before an earlier commit of it has run. Returns the
+        commit oids in order.
+        """
+        commands = [["init"]]
+        written = set()
+        oids = []
+
+        def flush():
+            results = self.run_gitforge_batch(commands)
+            oids.extend(r.oid for r, c in zip(results, commands) if c[0] == "commit")
+            commands.clear()
+            written.clear()
+
+        for name, content, message in files_and_messages:
+            if name in written:
+                flush()
+            self.create_file(name, content)
+            written.add(name)
+            commands.extend([["add", name], ["commit", "-m", message]])
+        flush()
+        return oids
+
+    def _new_file_path(self, name):
+        """The path of name in test_dir, creating its parent directories if it has any."""
+        filepath = self._root / name
+        # Most files are top level, where test_dir already exists
+        if filepath.parent != self._root:
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+        return filepath
+
     def create_file(self, name, content):
         """Create a file with the given content."""
-        filepath = Path(self.test_dir) / name
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        filepath.write_text(content)
+        filepath = self._new_file_path(name)
+        _write_bytes(filepath, content.encode())
         return filepath
 
-    def read_file_content(self, name):
-        """Read content of a file."""
-        filepath = Path(self.test_dir) / name
-        return filepath.read_text()
+    def create_file_bytes(self, name, data):
+        """Create a file with the given bytes, skipping the encode in create_file."""
+        filepath = self._new_file_path(name)
+        _write_bytes(filepath, data)
+        return filepath
+
+    def create_files(self, files):
+        """Create several files from a {name: content} mapping."""
+        paths = [self._root / name for name in files]
+        for parent in {path.parent for path in paths} - {self._root}:
+            parent.mkdir(parents=True, exist_ok=True)
+        for path, content in zip(paths, files.values()):
+            _write_bytes(path, content.encode())
+        return paths
+
+    def create_random_file(self, name, size, offset=0):
+        """Create a file of size random bytes, taken from the class's blob at offset."""
+        data = self._rand_blob[offset:offset + size]
+        if len(data) != size:
+            raise ValueError(f"random blob has no {size} bytes at offset {offset}")
+        filepath = self._new_file_path(name)
+        _write_bytes(filepath, data)
+        return filepath
+
+    def seed_config(self, values):
+        """Write {dotted.key: value} settings straight into .gitforge/config.
+
+        The file is gitforge's nested JSON, so this produces the same result as
+        a `gitforge config` call per key in one write. Use it where a test
+        only needs the settings in place, not the config command itself.
+        """
+        config_path = self._root / ".gitforge" / "config"
+        config = json.loads(config_path.read_bytes()) if config_path.exists() else {}
+        for key, value in values.items():
+            *parents, last = key.split(".")
+            current = config
+            for part in parents:
+                current = current.setdefault(part, {})
+            current[last] = value
+        _write_bytes(config_path, json.dumps(config, indent=2).encode())
+
+    def current_branch(self):
+        """The branch HEAD is attached to, read straight from .gitforge/HEAD; None if detached."""
+        return _current_branch(self.test_dir)
+
+    def read_file_content(self, name, msg=None):
+        """Read content of a file, failing the test with msg if it doesn't exist.
+
+        That makes a separate file_exists check before reading unnecessary.
+        """
+        filepath = self._root / name
+        try:
+            return filepath.read_text()
+        except FileNotFoundError:
+            self.fail(msg or f"{name} does not exist")
 
     def file_exists(self, name):
         """Check if file exists."""
-        return (Path(self.test_dir) / name).exists()
+        return (self._root / name).exists()
 
-    def init_repo_with_commit(self, message="Initial commit"):
-        """Initialize repo with a single commit."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "content")
-        self.run_gitforge("add", "file.txt")
-        result = self.run_gitforge("commit", "-m", message)
-        return result.stdout.strip()
+    def dir_listing(self):
+        """Names in the top of the working directory, from one listdir call."""
+        return set(os.listdir(self.test_dir))
+
+    def files_exist(self, *names):
+        """Check several files at once, returning {name: exists}.
+
+        Each distinct parent directory is listed once with os.scandir rather
+        than stat'ing every name.
+        """
+        by_parent = {}
+        for name in names:
+            parent, _, base = name.rpartition("/")
+            by_parent.setdefault(parent, []).append(base)
+        found = set()
+        for parent, bases in by_parent.items():
+            try:
+                with os.scandir(self._root / parent) as entries:
+                    present = {entry.name for entry in entries}
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            found.update(f"{parent}/{base}" if parent else base
+                         for base in bases if base in present)
+        return {name: name in found for name in names}
+
+    def assertAllIn(self, haystack, *needles):
+        """Assert every needle is in haystack, reporting all the missing ones at once."""
+        missing = [needle for needle in needles if needle not in haystack]
+        if missing:
+            self.fail(f"{missing!r} not found in {haystack!r}")
+
+    def assertConflictMarkers(self, content, ours_label=None):
+        """Assert content holds a conflicted region, returning its (ours, theirs) sides."""
+        match = CONFLICT_RE.search(content)
+        if match is None:
+            self.fail(f"no conflict markers in {content!r}")
+        if ours_label is not None:
+            self.assertEqual(match["ours_label"], ours_label)
+        return match["ours"], match["theirs"]
+
+    def assertFileEquals(self, name, expected):
+        """Assert the file's bytes equal expected, comparing digests first.
+
+        Only on a mismatch are the contents diffed, and then just the lines
+        around the first difference.
+        """
+        actual = (self._root / name).read_bytes()
+        if hashlib.blake2b(actual, digest_size=16).digest() == hashlib.blake2b(expected, digest_size=16).digest():
+            return
+        diff = difflib.unified_diff(
+            expected.decode(errors="replace").splitlines(), actual.decode(errors="replace").splitlines(),
+            "expected", name, lineterm="", n=2)
+        self.fail(f"{name} differs from the expected content:\n" + "\n".join(itertools.islice(diff, 40)))
+
+    def init_repo_with_commit(self, message="Initial commit", name="file.txt", content="content",
+                              branches=()):
+        """Initialize repo with a single commit of one file, in one batch call.
+
+        branches are then created at that commit, with master still checked out.
+        """
+        self.create_file(name, content)
+        _, _, result, *_ = self.run_gitforge_batch([
+            ["init"],
+            ["add", name],
+            ["commit", "-m", message],
+            *(["branch", branch] for branch in branches),
+        ])
+        return result.oid
+
+    def stage_and_commit(self, *files, message, author=None):
+        """Add files and commit them in one batch, returning the new commit's oid."""
+        add, commit = self.run_gitforge_batch([["add", *files], ["commit", "-m", message]],
+                                              author=author)
+        for result in (add, commit):
+            self.assertEqual(result.returncode, 0, f"{result.args}: {result.stderr}")
+        return commit.oid
+
+    def commit_files(self, files, message, author=None):
+        """Write a {name: content} mapping, then add and commit it in one batch.
+
+        Returns the new commit's oid.
+        """
+        self.create_files(files)
+        return self.stage_and_commit(*files, message=message, author=author)
+
+    def clone_template(self):
+        """Copy in a repo with the same single commit as init_repo_with_commit.
+
+        The template is built once and copied, which is cheaper than
+        running init, add and commit again for every test. Files are copied,
+        not hardlinked, since gitforge rewrites refs and the index in place.
+        """
+        return self._clone_built("commit", self.init_repo_with_commit)
+
+    def clone_base_commit(self, name, content, message, branches=()):
+        """Copy in a repo whose only commit adds one file, returning that commit.
+
+        Like clone_template, but for the file, content and message a test
+        wants, plus any branches to create at the commit. Each combination is
+        built once.
+        """
+        branches = tuple(branches)
+        return self._clone_built(
+            ("base", name, content, message, branches),
+            lambda: self.init_repo_with_commit(message, name=name, content=content, branches=branches))
+
+    def make_conflict_state(self):
+        """Copy in make_diverged_branches' repo and merge feature into master.
+
+        master stays checked out with the merge conflicted. Returns the
+        feature commit and the merge's result.
+        """
+        feature_commit = self.make_diverged_branches()
+        return feature_commit, self.run_gitforge("merge", feature_commit)
+
+    def make_diverged_branches(self):
+        """Copy in master and feature that each changed file.txt's one line differently.
+
+        The lines are "base content", "master content" and "feature content".
+        master stays checked out and nothing is merged yet. Built once like
+        clone_template's repo. Returns the feature commit.
+        """
+        return self._clone_built("conflict", self._build_diverged_branches)
+
+    def make_add_add_branches(self):
+        """Copy in master and feature that each add newfile.txt with different content.
+
+        master stays checked out and nothing is merged yet. Built once like
+        clone_template's repo. Returns the feature commit.
+        """
+        return self._clone_built("add_add", self._build_add_add_branches)
+
+    def _build_add_add_branches(self):
+        self.init_repo_with_commit("base", name="base.txt", content="base", branches=("feature",))
+        self.commit_files({"newfile.txt": "master added this file\n"}, "add newfile on master")
+        self.run_gitforge("checkout", "feature")
+        feature_commit = self.commit_files({"newfile.txt": "feature added this file\n"},
+                                           "add newfile on feature")
+        self.run_gitforge("checkout", "master")
+        return feature_commit
+
+    def _build_diverged_branches(self):
+        self.create_file("file.txt", "base content\n")
+        self.run_gitforge_batch([
+            ["init"],
+            ["add", "."],
+            ["commit", "-m", "base"],
+            ["branch", "feature"],
+        ])
+        self.commit_files({"file.txt": "master content\n"}, "master")
+        self.run_gitforge("checkout", "feature")
+        feature_commit = self.commit_files({"file.txt": "feature content\n"}, "feature")
+        self.run_gitforge("checkout", "master")
+        return feature_commit
+
+    def _clone_built(self, name, build):
+        """Copy the template keyed by name into test_dir, building it on first use.
+
+        build runs with test_dir pointing at the template and its return value
+        is handed back on every clone. Keys describe the repo they build, so
+        templates are shared by every class in the process.
+        """
+        templates = _TEMPLATES
+        if name not in templates:
+            template_dir = tempfile.mkdtemp(dir=TEMPLATE_ROOT, prefix="template_")
+            test_dir, self.test_dir = self.test_dir, template_dir
+            root, self._root = self._root, Path(template_dir)
+            try:
+                templates[name] = (template_dir, build())
+            finally:
+                self.test_dir = test_dir
+                self._root = root
+        template_dir, value = templates[name]
+        shutil.copytree(template_dir, self.test_dir, dirs_exist_ok=True)
+        return value
 
 
 class TestInit(GitforgeTestBase):
@@ -126,8 +724,10 @@ class TestInit(GitforgeTestBase):
         
         self.assertEqual(result.returncode, 0)
         self.assertIn("Initialized empty gitforge repository", result.stdout)
-        self.assertTrue(os.path.isdir(os.path.join(self.test_dir, ".gitforge")))
-        self.assertTrue(os.path.isdir(os.path.join(self.test_dir, ".gitforge", "objects")))
+        # One listing of .gitforge, which fails if it is missing, checks both
+        with os.scandir(os.path.join(self.test_dir, ".gitforge")) as entries:
+            subdirs = {entry.name for entry in entries if entry.is_dir()}
+        self.assertIn("objects", subdirs)
 
     def test_init_creates_head_ref(self):
         """Test: gitforge init creates HEAD pointing to master"""
@@ -153,31 +753,42 @@ class TestHashObject(GitforgeTestBase):
         result = self.run_gitforge("hash-object", "hello.txt")
         
         self.assertEqual(result.returncode, 0)
-        oid = result.stdout.strip()
+        oid = result.oid
         self.assertEqual(len(oid), 40)
         self.assertTrue(oid.isalnum())
 
+    @staticmethod
+    def blob_oid(data):
+        """The oid gitforge gives a blob: SHA-1 over a "blob\\0" header and the data."""
+        return hashlib.sha1(b"blob\x00" + data).hexdigest()
+
     def test_hash_object_deterministic(self):
         """Test: same content produces same hash"""
         self.run_gitforge("init")
         self.create_file("file1.txt", "Same content")
-        self.create_file("file2.txt", "Same content")
         
-        result1 = self.run_gitforge("hash-object", "file1.txt")
-        result2 = self.run_gitforge("hash-object", "file2.txt")
+        result = self.run_gitforge("hash-object", "file1.txt")
         
-        self.assertEqual(result1.stdout.strip(), result2.stdout.strip())
+        self.assertEqual(result.oid, self.blob_oid(b"Same content"))
 
     def test_hash_object_different_content(self):
         """Test: different content produces different hash"""
         self.run_gitforge("init")
         self.create_file("file1.txt", "Content A")
-        self.create_file("file2.txt", "Content B")
         
-        result1 = self.run_gitforge("hash-object", "file1.txt")
-        result2 = self.run_gitforge("hash-object", "file2.txt")
+        result = self.run_gitforge("hash-object", "file1.txt")
         
-        self.assertNotEqual(result1.stdout.strip(), result2.stdout.strip())
+        self.assertEqual(result.oid, self.blob_oid(b"Content A"))
+        self.assertNotEqual(result.oid, self.blob_oid(b"Content B"))
+
+    def test_hash_object_binary_content(self):
+        """Test: binary content hashes the same as its raw bytes"""
+        self.run_gitforge("init")
+        self.create_random_file("blob.bin", 64 * 1024, offset=4096)
+        
+        result = self.run_gitforge("hash-object", "blob.bin")
+        
+        self.assertEqual(result.oid, self.blob_oid(self._rand_blob[4096:4096 + 64 * 1024]))
 
 
 class TestCatFile(GitforgeTestBase):
@@ -190,7 +801,7 @@ class TestCatFile(GitforgeTestBase):
         self.create_file("hello.txt", content)
         
         hash_result = self.run_gitforge("hash-object", "hello.txt")
-        oid = hash_result.stdout.strip()
+        oid = hash_result.oid
         
         result = self.run_gitforge("cat-file", oid)
         
@@ -234,9 +845,11 @@ class TestAdd(GitforgeTestBase):
     def test_add_directory(self):
         """Test: gitforge add stages directory recursively"""
         self.run_gitforge("init")
-        self.create_file("src/main.py", "print('main')")
-        self.create_file("src/utils.py", "def helper(): pass")
-        self.create_file("src/lib/core.py", "class Core: pass")
+        self.create_files({
+            "src/main.py": "print('main')",
+            "src/utils.py": "def helper(): pass",
+            "src/lib/core.py": "class Core: pass",
+        })
         
         result = self.run_gitforge("add", "src")
         
@@ -247,15 +860,16 @@ class TestAdd(GitforgeTestBase):
     def test_add_dot(self):
         """Test: gitforge add . stages all files"""
         self.run_gitforge("init")
-        self.create_file("file1.txt", "Content 1")
-        self.create_file("dir/file2.txt", "Content 2")
+        self.create_files({
+            "file1.txt": "Content 1",
+            "dir/file2.txt": "Content 2",
+        })
         
         result = self.run_gitforge("add", ".")
         
         self.assertEqual(result.returncode, 0)
         status_result = self.run_gitforge("status")
-        self.assertIn("file1.txt", status_result.stdout)
-        self.assertIn("file2.txt", status_result.stdout)
+        self.assertAllIn(status_result.stdout, "file1.txt", "file2.txt")
 
 
 class TestCommit(GitforgeTestBase):
@@ -270,20 +884,15 @@ class TestCommit(GitforgeTestBase):
         result = self.run_gitforge("commit", "-m", "Initial commit")
         
         self.assertEqual(result.returncode, 0)
-        commit_oid = result.stdout.strip()
+        commit_oid = result.oid
         self.assertEqual(len(commit_oid), 40)
 
     def test_commit_multiple_creates_history(self):
         """Test: multiple commits create parent chain"""
-        self.run_gitforge("init")
-        
-        self.create_file("file1.txt", "Content 1")
-        self.run_gitforge("add", "file1.txt")
-        commit1 = self.run_gitforge("commit", "-m", "First commit").stdout.strip()
-        
-        self.create_file("file2.txt", "Content 2")
-        self.run_gitforge("add", "file2.txt")
-        commit2 = self.run_gitforge("commit", "-m", "Second commit").stdout.strip()
+        commit1, commit2 = self.linear_history([
+            ("file1.txt", "Content 1", "First commit"),
+            ("file2.txt", "Content 2", "Second commit"),
+        ])
         
         self.assertNotEqual(commit1, commit2)
         
@@ -292,28 +901,7 @@ class TestCommit(GitforgeTestBase):
 
     def test_commit_with_conflicts_fails(self):
         """Test: gitforge commit fails when conflicts exist"""
-        # Setup merge conflict scenario
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base content")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        # Modify on master
-        self.create_file("file.txt", "master content")
-        self.run_gitforge("add", ".")
-        master_commit = self.run_gitforge("commit", "-m", "master change").stdout.strip()
-        
-        # Modify on feature
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature content")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature change").stdout.strip()
-        
-        # Merge to create conflict
-        self.run_gitforge("checkout", "master")
-        self.run_gitforge("merge", feature_commit)
+        self.make_conflict_state()
         
         # Commit should fail due to conflict
         result = self.run_gitforge("commit", "-m", "Should fail", expect_success=False)
@@ -325,32 +913,23 @@ class TestLog(GitforgeTestBase):
 
     def test_log_shows_commits(self):
         """Test: gitforge log shows commit history"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Content 1")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "First commit")
-        
-        self.create_file("file2.txt", "Content 2")
-        self.run_gitforge("add", "file2.txt")
-        self.run_gitforge("commit", "-m", "Second commit")
+        self.linear_history([
+            ("file1.txt", "Content 1", "First commit"),
+            ("file2.txt", "Content 2", "Second commit"),
+        ])
         
         result = self.run_gitforge("log")
         
         self.assertEqual(result.returncode, 0)
-        self.assertIn("First commit", result.stdout)
-        self.assertIn("Second commit", result.stdout)
+        self.assertAllIn(result.stdout, "First commit", "Second commit")
         self.assertEqual(result.stdout.count("commit "), 2)
 
     def test_log_with_specific_oid(self):
         """Test: gitforge log from specific OID"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Content 1")
-        self.run_gitforge("add", "file1.txt")
-        commit1 = self.run_gitforge("commit", "-m", "First commit").stdout.strip()
-        
-        self.create_file("file2.txt", "Content 2")
-        self.run_gitforge("add", "file2.txt")
-        self.run_gitforge("commit", "-m", "Second commit")
+        commit1, _ = self.linear_history([
+            ("file1.txt", "Content 1", "First commit"),
+            ("file2.txt", "Content 2", "Second commit"),
+        ])
         
         result = self.run_gitforge("log", commit1)
         
@@ -364,7 +943,7 @@ class TestBranch(GitforgeTestBase):
 
     def test_branch_create(self):
         """Test: gitforge branch creates new branch"""
-        self.init_repo_with_commit()
+        self.clone_template()
         
         result = self.run_gitforge("branch", "feature")
         
@@ -373,18 +952,17 @@ class TestBranch(GitforgeTestBase):
 
     def test_branch_list(self):
         """Test: gitforge branch lists all branches"""
-        self.init_repo_with_commit()
+        self.clone_template()
         self.run_gitforge("branch", "feature")
         
         result = self.run_gitforge("branch")
         
         self.assertEqual(result.returncode, 0)
-        self.assertIn("master", result.stdout)
-        self.assertIn("feature", result.stdout)
+        self.assertAllIn(result.stdout, "master", "feature")
 
     def test_branch_current_marked(self):
         """Test: gitforge branch marks current branch with *"""
-        self.init_repo_with_commit()
+        self.clone_template()
         self.run_gitforge("branch", "feature")
         
         result = self.run_gitforge("branch")
@@ -393,14 +971,10 @@ class TestBranch(GitforgeTestBase):
 
     def test_branch_with_start_point(self):
         """Test: gitforge branch with start point"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Content 1")
-        self.run_gitforge("add", "file1.txt")
-        commit1 = self.run_gitforge("commit", "-m", "First commit").stdout.strip()
-        
-        self.create_file("file2.txt", "Content 2")
-        self.run_gitforge("add", "file2.txt")
-        self.run_gitforge("commit", "-m", "Second commit")
+        commit1, _ = self.linear_history([
+            ("file1.txt", "Content 1", "First commit"),
+            ("file2.txt", "Content 2", "Second commit"),
+        ])
         
         result = self.run_gitforge("branch", "old-feature", commit1)
         self.assertEqual(result.returncode, 0)
@@ -416,14 +990,10 @@ class TestCheckout(GitforgeTestBase):
 
     def test_checkout_commit(self):
         """Test: gitforge checkout to previous commit"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Version 1")
-        self.run_gitforge("add", "file1.txt")
-        commit1 = self.run_gitforge("commit", "-m", "Version 1").stdout.strip()
-        
-        self.create_file("file1.txt", "Version 2")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "Version 2")
+        commit1, _ = self.linear_history([
+            ("file1.txt", "Version 1", "Version 1"),
+            ("file1.txt", "Version 2", "Version 2"),
+        ])
         
         result = self.run_gitforge("checkout", commit1)
         
@@ -433,26 +1003,21 @@ class TestCheckout(GitforgeTestBase):
 
     def test_checkout_branch(self):
         """Test: gitforge checkout branch"""
-        self.init_repo_with_commit()
+        self.clone_template()
         self.run_gitforge("branch", "feature")
         
         result = self.run_gitforge("checkout", "feature")
         
         self.assertEqual(result.returncode, 0)
-        status_result = self.run_gitforge("status")
-        self.assertIn("On branch feature", status_result.stdout)
+        self.assertEqual(self.current_branch(), "feature")
 
     def test_checkout_tag(self):
         """Test: gitforge checkout using tag"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Version 1")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "Version 1")
+        self.clone_base_commit("file1.txt", "Version 1", "Version 1")
         self.run_gitforge("tag", "v1.0")
         
         self.create_file("file1.txt", "Version 2")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "Version 2")
+        self.stage_and_commit("file1.txt", message="Version 2")
         
         result = self.run_gitforge("checkout", "v1.0")
         
@@ -462,41 +1027,22 @@ class TestCheckout(GitforgeTestBase):
 
     def test_checkout_creates_and_removes_files(self):
         """Test: checkout creates and removes files appropriately"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Content 1")
-        self.run_gitforge("add", "file1.txt")
-        commit1 = self.run_gitforge("commit", "-m", "Commit 1").stdout.strip()
+        commit1 = self.clone_base_commit("file1.txt", "Content 1", "Commit 1")
         
         os.remove(os.path.join(self.test_dir, "file1.txt"))
         self.create_file("file2.txt", "Content 2")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "Commit 2")
+        # "." stages the removal of file1.txt too
+        self.stage_and_commit(".", message="Commit 2")
         
         self.run_gitforge("checkout", commit1)
         
-        self.assertTrue(self.file_exists("file1.txt"))
-        self.assertFalse(self.file_exists("file2.txt"))
+        self.assertEqual(self.files_exist("file1.txt", "file2.txt"),
+                         {"file1.txt": True, "file2.txt": False})
 
     def test_checkout_with_conflicts_fails(self):
         """Test: checkout fails when conflicts exist"""
         # Create a merge conflict first
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        self.create_file("file.txt", "master")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
-        
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
-        
-        self.run_gitforge("checkout", "master")
-        self.run_gitforge("merge", feature_commit)
+        self.make_conflict_state()
         
         # Now checkout should fail due to conflicts
         result = self.run_gitforge("checkout", "feature", expect_success=False)
@@ -508,7 +1054,7 @@ class TestTag(GitforgeTestBase):
 
     def test_tag_create(self):
         """Test: gitforge tag creates tag"""
-        self.init_repo_with_commit()
+        self.clone_template()
         
         result = self.run_gitforge("tag", "v1.0")
         
@@ -518,14 +1064,10 @@ class TestTag(GitforgeTestBase):
 
     def test_tag_with_specific_oid(self):
         """Test: gitforge tag with specific OID"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Content 1")
-        self.run_gitforge("add", "file1.txt")
-        commit1 = self.run_gitforge("commit", "-m", "First commit").stdout.strip()
+        commit1 = self.clone_base_commit("file1.txt", "Content 1", "First commit")
         
         self.create_file("file2.txt", "Content 2")
-        self.run_gitforge("add", "file2.txt")
-        self.run_gitforge("commit", "-m", "Second commit")
+        self.stage_and_commit("file2.txt", message="Second commit")
         
         result = self.run_gitforge("tag", "v0.1", commit1)
         self.assertEqual(result.returncode, 0)
@@ -541,7 +1083,7 @@ class TestStatus(GitforgeTestBase):
 
     def test_status_shows_branch(self):
         """Test: gitforge status shows current branch"""
-        self.init_repo_with_commit()
+        self.clone_template()
         
         result = self.run_gitforge("status")
         
@@ -550,28 +1092,26 @@ class TestStatus(GitforgeTestBase):
 
     def test_status_staged_changes(self):
         """Test: gitforge status shows staged changes"""
-        self.init_repo_with_commit()
+        self.clone_template()
         self.create_file("newfile.txt", "New content")
         self.run_gitforge("add", "newfile.txt")
         
         result = self.run_gitforge("status")
         
-        self.assertIn("Changes to be committed", result.stdout)
-        self.assertIn("new file", result.stdout)
+        self.assertAllIn(result.stdout, "Changes to be committed", "new file")
 
     def test_status_unstaged_changes(self):
         """Test: gitforge status shows unstaged changes"""
-        self.init_repo_with_commit()
+        self.clone_template()
         self.create_file("file.txt", "Modified content")
         
         result = self.run_gitforge("status")
         
-        self.assertIn("Changes not staged for commit", result.stdout)
-        self.assertIn("modified", result.stdout)
+        self.assertAllIn(result.stdout, "Changes not staged for commit", "modified")
 
     def test_status_deleted_file(self):
         """Test: gitforge status shows deleted files"""
-        self.init_repo_with_commit()
+        self.clone_template()
         os.remove(os.path.join(self.test_dir, "file.txt"))
         
         result = self.run_gitforge("status")
@@ -580,14 +1120,10 @@ class TestStatus(GitforgeTestBase):
 
     def test_status_detached_head(self):
         """Test: gitforge status shows detached HEAD"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Content 1")
-        self.run_gitforge("add", "file1.txt")
-        commit1 = self.run_gitforge("commit", "-m", "Initial commit").stdout.strip()
+        commit1 = self.clone_base_commit("file1.txt", "Content 1", "Initial commit")
         
         self.create_file("file2.txt", "Content 2")
-        self.run_gitforge("add", "file2.txt")
-        self.run_gitforge("commit", "-m", "Second commit")
+        self.stage_and_commit("file2.txt", message="Second commit")
         
         self.run_gitforge("checkout", commit1)
         
@@ -597,26 +1133,56 @@ class TestStatus(GitforgeTestBase):
 
     def test_status_shows_merge_in_progress(self):
         """Test: gitforge status shows merge in progress"""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
+        self.make_conflict_state()
         
-        self.run_gitforge("branch", "feature")
-        self.create_file("file.txt", "master")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
+        result = self.run_gitforge("status")
+        self.assertIn("Merging with", result.stdout)
+
+    def status_json(self):
+        """Run status --json and return the parsed object."""
+        result = self.run_gitforge("status", "--json")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout)
+
+    def test_status_json_clean_tree(self):
+        """Test: gitforge status --json on a clean tree"""
+        commit = self.clone_template()
+        
+        self.assertEqual(self.status_json(), {
+            "branch": "master",
+            "HEAD": commit,
+            "merge_head": None,
+            "cherry_pick_head": None,
+            "rebase_in_progress": False,
+            "conflicts": [],
+            "staged": [],
+            "unstaged": [],
+        })
+
+    def test_status_json_staged_and_unstaged_changes(self):
+        """Test: gitforge status --json lists staged and unstaged changes apart"""
+        self.clone_template()
+        self.create_file("newfile.txt", "New content")
+        self.run_gitforge("add", "newfile.txt")
+        self.create_file("file.txt", "Modified content")
         
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
+        status = self.status_json()
         
-        self.run_gitforge("checkout", "master")
-        self.run_gitforge("merge", feature_commit)
+        self.assertEqual(status["staged"], [{"path": "newfile.txt", "action": "new file"}])
+        self.assertEqual(status["unstaged"], [{"path": "file.txt", "action": "modified"}])
+        self.assertEqual(status["conflicts"], [])
+
+    def test_status_json_detached_head(self):
+        """Test: gitforge status --json reports a detached HEAD without a branch"""
+        commit1 = self.clone_base_commit("file1.txt", "Content 1", "Initial commit")
+        self.create_file("file2.txt", "Content 2")
+        self.stage_and_commit("file2.txt", message="Second commit")
+        self.run_gitforge("checkout", commit1)
         
-        result = self.run_gitforge("status")
-        self.assertIn("Merging with", result.stdout)
+        status = self.status_json()
+        
+        self.assertIsNone(status["branch"])
+        self.assertEqual(status["HEAD"], commit1)
 
 
 class TestReset(GitforgeTestBase):
@@ -624,14 +1190,10 @@ class TestReset(GitforgeTestBase):
 
     def test_reset_soft(self):
         """Test: gitforge reset --soft only moves HEAD"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Version 1")
-        self.run_gitforge("add", "file1.txt")
-        commit1 = self.run_gitforge("commit", "-m", "Version 1").stdout.strip()
-        
-        self.create_file("file1.txt", "Version 2")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "Version 2")
+        commit1, _ = self.linear_history([
+            ("file1.txt", "Version 1", "Version 1"),
+            ("file1.txt", "Version 2", "Version 2"),
+        ])
         
         result = self.run_gitforge("reset", "--soft", commit1)
         
@@ -641,14 +1203,10 @@ class TestReset(GitforgeTestBase):
 
     def test_reset_mixed(self):
         """Test: gitforge reset --mixed moves HEAD and updates index"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Version 1")
-        self.run_gitforge("add", "file1.txt")
-        commit1 = self.run_gitforge("commit", "-m", "Version 1").stdout.strip()
-        
-        self.create_file("file1.txt", "Version 2")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "Version 2")
+        commit1, _ = self.linear_history([
+            ("file1.txt", "Version 1", "Version 1"),
+            ("file1.txt", "Version 2", "Version 2"),
+        ])
         
         result = self.run_gitforge("reset", "--mixed", commit1)
         
@@ -661,14 +1219,10 @@ class TestReset(GitforgeTestBase):
 
     def test_reset_hard(self):
         """Test: gitforge reset --hard updates HEAD, index, and working dir"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Version 1")
-        self.run_gitforge("add", "file1.txt")
-        commit1 = self.run_gitforge("commit", "-m", "Version 1").stdout.strip()
-        
-        self.create_file("file1.txt", "Version 2")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "Version 2")
+        commit1, _ = self.linear_history([
+            ("file1.txt", "Version 1", "Version 1"),
+            ("file1.txt", "Version 2", "Version 2"),
+        ])
         
         result = self.run_gitforge("reset", "--hard", commit1)
         
@@ -682,17 +1236,12 @@ class TestMerge(GitforgeTestBase):
 
     def test_merge_fast_forward(self):
         """Test: gitforge merge - fast forward"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Base content")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "Base commit")
+        self.clone_base_commit("file1.txt", "Base content", "Base commit", branches=["feature"])
         
-        self.run_gitforge("branch", "feature")
         self.run_gitforge("checkout", "feature")
         
         self.create_file("file2.txt", "Feature content")
-        self.run_gitforge("add", "file2.txt")
-        feature_commit = self.run_gitforge("commit", "-m", "Feature commit").stdout.strip()
+        feature_commit = self.stage_and_commit("file2.txt", message="Feature commit")
         
         self.run_gitforge("checkout", "master")
         result = self.run_gitforge("merge", feature_commit)
@@ -703,77 +1252,35 @@ class TestMerge(GitforgeTestBase):
 
     def test_merge_three_way(self):
         """Test: gitforge merge - three-way merge"""
-        self.run_gitforge("init")
-        self.create_file("base.txt", "Base content")
-        self.run_gitforge("add", "base.txt")
-        self.run_gitforge("commit", "-m", "Base commit")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("base.txt", "Base content", "Base commit", branches=["feature"])
         
         self.create_file("master.txt", "Master content")
-        self.run_gitforge("add", "master.txt")
-        self.run_gitforge("commit", "-m", "Master changes")
+        self.stage_and_commit("master.txt", message="Master changes")
         
         self.run_gitforge("checkout", "feature")
         self.create_file("feature.txt", "Feature content")
-        self.run_gitforge("add", "feature.txt")
-        feature_commit = self.run_gitforge("commit", "-m", "Feature changes").stdout.strip()
+        feature_commit = self.stage_and_commit("feature.txt", message="Feature changes")
         
         self.run_gitforge("checkout", "master")
         result = self.run_gitforge("merge", feature_commit)
         
         self.assertEqual(result.returncode, 0)
-        self.assertTrue(self.file_exists("feature.txt"))
-        self.assertTrue(self.file_exists("master.txt"))
+        self.assertEqual({"feature.txt", "master.txt"} - self.dir_listing(), set())
 
     def test_merge_conflict(self):
         """Test: gitforge merge with conflict"""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        self.create_file("file.txt", "master content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
+        _, result = self.make_conflict_state()
         
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature content\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
-        
-        self.run_gitforge("checkout", "master")
-        result = self.run_gitforge("merge", feature_commit)
-        
-        self.assertIn("conflict", result.stdout.lower())
+        self.assertIn("conflict", result.stdout_lower)
 
     def test_merge_abort(self):
         """Test: gitforge merge --abort"""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        self.create_file("file.txt", "master content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
-        
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature content\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
-        
-        self.run_gitforge("checkout", "master")
-        self.run_gitforge("merge", feature_commit)
+        self.make_conflict_state()
         
         result = self.run_gitforge("merge", "--abort")
         
         self.assertEqual(result.returncode, 0)
-        self.assertIn("aborted", result.stdout.lower())
+        self.assertIn("aborted", result.stdout_lower)
         
         # Verify file is restored
         content = self.read_file_content("file.txt")
@@ -781,30 +1288,23 @@ class TestMerge(GitforgeTestBase):
 
     def test_merge_creates_merge_commit(self):
         """Test: merge creates commit with two parents"""
-        self.run_gitforge("init")
-        self.create_file("base.txt", "Base content")
-        self.run_gitforge("add", "base.txt")
-        self.run_gitforge("commit", "-m", "Base commit")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("base.txt", "Base content", "Base commit", branches=["feature"])
         
         self.create_file("master.txt", "Master content")
-        self.run_gitforge("add", "master.txt")
-        master_commit = self.run_gitforge("commit", "-m", "Master changes").stdout.strip()
+        master_commit = self.stage_and_commit("master.txt", message="Master changes")
         
         self.run_gitforge("checkout", "feature")
         self.create_file("feature.txt", "Feature content")
-        self.run_gitforge("add", "feature.txt")
-        feature_commit = self.run_gitforge("commit", "-m", "Feature changes").stdout.strip()
-        
-        self.run_gitforge("checkout", "master")
-        self.run_gitforge("merge", feature_commit)
+        feature_commit = self.stage_and_commit("feature.txt", message="Feature changes")
         
-        merge_commit = self.run_gitforge("commit", "-m", "Merge feature").stdout.strip()
-        
-        cat_result = self.run_gitforge("cat-file", merge_commit)
-        self.assertIn(f"parent {master_commit}", cat_result.stdout)
-        self.assertIn(f"parent {feature_commit}", cat_result.stdout)
+        *_, commit_result, cat_result = self.run_gitforge_batch([
+            ["checkout", "master"],
+            ["merge", feature_commit],
+            ["commit", "-m", "Merge feature"],
+            ["cat-file", "@"],
+        ])
+        self.assertEqual(commit_result.returncode, 0)
+        self.assertAllIn(cat_result.stdout, f"parent {master_commit}", f"parent {feature_commit}")
 
 
 class TestMergeBase(GitforgeTestBase):
@@ -812,35 +1312,28 @@ class TestMergeBase(GitforgeTestBase):
 
     def test_merge_base(self):
         """Test: gitforge merge-base finds common ancestor"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Base content")
-        self.run_gitforge("add", "file1.txt")
-        base_commit = self.run_gitforge("commit", "-m", "Base commit").stdout.strip()
-        
-        self.run_gitforge("branch", "feature")
+        base_commit = self.clone_base_commit("file1.txt", "Base content", "Base commit", branches=["feature"])
         
         self.create_file("file1.txt", "Master content")
-        self.run_gitforge("add", "file1.txt")
-        master_commit = self.run_gitforge("commit", "-m", "Master commit").stdout.strip()
+        master_commit = self.stage_and_commit("file1.txt", message="Master commit")
         
         self.run_gitforge("checkout", "feature")
         self.create_file("file2.txt", "Feature content")
-        self.run_gitforge("add", "file2.txt")
-        feature_commit = self.run_gitforge("commit", "-m", "Feature commit").stdout.strip()
+        feature_commit = self.stage_and_commit("file2.txt", message="Feature commit")
         
         result = self.run_gitforge("merge-base", master_commit, feature_commit)
         
         self.assertEqual(result.returncode, 0)
-        self.assertEqual(result.stdout.strip(), base_commit)
+        self.assertEqual(result.oid, base_commit)
 
     def test_merge_base_same_commit(self):
         """Test: gitforge merge-base with same commit"""
-        commit = self.init_repo_with_commit()
+        commit = self.clone_template()
         
         result = self.run_gitforge("merge-base", commit, commit)
         
         self.assertEqual(result.returncode, 0)
-        self.assertEqual(result.stdout.strip(), commit)
+        self.assertEqual(result.oid, commit)
 
 
 class TestDiff(GitforgeTestBase):
@@ -848,10 +1341,7 @@ class TestDiff(GitforgeTestBase):
 
     def test_diff_unstaged(self):
         """Test: gitforge diff shows unstaged changes"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Line 1\nLine 2\nLine 3\n")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "Initial commit")
+        self.clone_base_commit("file1.txt", "Line 1\nLine 2\nLine 3\n", "Initial commit")
         
         self.create_file("file1.txt", "Line 1\nLine 2 modified\nLine 3\n")
         
@@ -861,10 +1351,7 @@ class TestDiff(GitforgeTestBase):
 
     def test_diff_cached(self):
         """Test: gitforge diff --cached shows staged changes"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Original content\n")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "Initial commit")
+        self.clone_base_commit("file1.txt", "Original content\n", "Initial commit")
         
         self.create_file("file1.txt", "Modified content\n")
         self.run_gitforge("add", "file1.txt")
@@ -875,22 +1362,17 @@ class TestDiff(GitforgeTestBase):
 
     def test_diff_with_commit(self):
         """Test: gitforge diff with specific commit"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Version 1\n")
-        self.run_gitforge("add", "file1.txt")
-        commit1 = self.run_gitforge("commit", "-m", "Version 1").stdout.strip()
+        commit1 = self.clone_base_commit("file1.txt", "Version 1\n", "Version 1")
         
         self.create_file("file1.txt", "Version 2\n")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "Version 2")
+        self.stage_and_commit("file1.txt", message="Version 2")
         
         self.create_file("file1.txt", "Version 3\n")
         
         result = self.run_gitforge("diff", commit1)
         
         self.assertEqual(result.returncode, 0)
-        self.assertIn("-Version 1", result.stdout)
-        self.assertIn("+Version 3", result.stdout)
+        self.assertAllIn(result.stdout, "-Version 1", "+Version 3")
 
 
 class TestShow(GitforgeTestBase):
@@ -898,23 +1380,16 @@ class TestShow(GitforgeTestBase):
 
     def test_show_commit(self):
         """Test: gitforge show displays commit details"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Content 1")
-        self.run_gitforge("add", "file1.txt")
-        commit_oid = self.run_gitforge("commit", "-m", "Test commit message").stdout.strip()
+        commit_oid = self.clone_base_commit("file1.txt", "Content 1", "Test commit message")
         
         result = self.run_gitforge("show", commit_oid)
         
         self.assertEqual(result.returncode, 0)
-        self.assertIn("Test commit message", result.stdout)
-        self.assertIn("commit", result.stdout)
+        self.assertAllIn(result.stdout, "Test commit message", "commit")
 
     def test_show_default_head(self):
         """Test: gitforge show defaults to HEAD"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Content 1")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "HEAD commit message")
+        self.clone_base_commit("file1.txt", "Content 1", "HEAD commit message")
         
         result = self.run_gitforge("show")
         
@@ -923,20 +1398,15 @@ class TestShow(GitforgeTestBase):
 
     def test_show_includes_diff(self):
         """Test: gitforge show includes diff"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "Initial content\n")
-        self.run_gitforge("add", "file1.txt")
-        self.run_gitforge("commit", "-m", "Initial commit")
+        self.clone_base_commit("file1.txt", "Initial content\n", "Initial commit")
         
         self.create_file("file1.txt", "Modified content\n")
-        self.run_gitforge("add", "file1.txt")
-        commit2 = self.run_gitforge("commit", "-m", "Modify file").stdout.strip()
+        commit2 = self.stage_and_commit("file1.txt", message="Modify file")
         
         result = self.run_gitforge("show", commit2)
         
         self.assertEqual(result.returncode, 0)
-        self.assertIn("-Initial content", result.stdout)
-        self.assertIn("+Modified content", result.stdout)
+        self.assertAllIn(result.stdout, "-Initial content", "+Modified content")
 
 
 class TestConfig(GitforgeTestBase):
@@ -956,7 +1426,7 @@ class TestConfig(GitforgeTestBase):
         """Test: gitforge config with nested keys"""
         self.run_gitforge("init")
         
-        self.run_gitforge("config", "user.email", "test@example.com")
+        self.run_gitforge("config", "user.email", "test@example.com", capture=False)
         result = self.run_gitforge("config", "user.email")
         
         self.assertIn("test@example.com", result.stdout)
@@ -964,8 +1434,7 @@ class TestConfig(GitforgeTestBase):
     def test_config_list_all(self):
         """Test: gitforge config lists all config"""
         self.run_gitforge("init")
-        self.run_gitforge("config", "user.name", "Test User")
-        self.run_gitforge("config", "user.email", "test@example.com")
+        self.seed_config({"user.name": "Test User", "user.email": "test@example.com"})
         
         result = self.run_gitforge("config")
         
@@ -979,17 +1448,11 @@ class TestCherryPick(GitforgeTestBase):
 
     def test_cherry_pick_single_commit(self):
         """Test: gitforge cherry-pick applies single commit"""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
+        self.clone_base_commit("file1.txt", "base", "base", branches=["feature"])
         
-        self.run_gitforge("branch", "feature")
         self.run_gitforge("checkout", "feature")
         
-        self.create_file("feature.txt", "feature content")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature change").stdout.strip()
+        feature_commit = self.commit_files({"feature.txt": "feature content"}, "feature change")
         
         self.run_gitforge("checkout", "master")
         result = self.run_gitforge("cherry-pick", feature_commit)
@@ -999,99 +1462,44 @@ class TestCherryPick(GitforgeTestBase):
 
     def test_cherry_pick_preserves_author(self):
         """Test: cherry-pick preserves original author"""
+        original = ("Original Author", "original@test.com")
         self.run_gitforge("init")
-        self.run_gitforge("config", "user.name", "Original Author")
-        self.run_gitforge("config", "user.email", "original@test.com")
         
-        self.create_file("file1.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
+        self.commit_files({"file1.txt": "base"}, "base", author=original)
         
         self.run_gitforge("branch", "feature")
         self.run_gitforge("checkout", "feature")
         
-        self.create_file("feature.txt", "feature content")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature change").stdout.strip()
-        
-        # Change author
-        self.run_gitforge("config", "user.name", "New Author")
+        feature_commit = self.commit_files({"feature.txt": "feature content"}, "feature change",
+                                           author=original)
         
+        # Cherry-pick as someone else
         self.run_gitforge("checkout", "master")
-        self.run_gitforge("cherry-pick", feature_commit)
+        self.run_gitforge("cherry-pick", feature_commit, author=("New Author", "new@test.com"))
         
         show_result = self.run_gitforge("show")
         self.assertIn("Original Author", show_result.stdout)
 
     def test_cherry_pick_conflict(self):
         """Test: cherry-pick with conflict"""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        self.create_file("file.txt", "master content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
-        
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature content\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
-        
-        self.run_gitforge("checkout", "master")
+        feature_commit = self.make_diverged_branches()
         result = self.run_gitforge("cherry-pick", feature_commit)
         
         self.assertIn("CONFLICT", result.stdout)
 
     def test_cherry_pick_abort(self):
         """Test: gitforge cherry-pick --abort"""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        self.create_file("file.txt", "master content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
-        
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature content\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
-        
-        self.run_gitforge("checkout", "master")
+        feature_commit = self.make_diverged_branches()
         self.run_gitforge("cherry-pick", feature_commit)
         
-        result = self.run_gitforge("cherry-pick", "--abort")
-        
-        self.assertEqual(result.returncode, 0)
-        content = self.read_file_content("file.txt")
-        self.assertEqual(content, "master content\n")
-
-    def test_cherry_pick_continue(self):
-        """Test: gitforge cherry-pick --continue after resolving conflict"""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        self.create_file("file.txt", "master content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
-        
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature content\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
+        result = self.run_gitforge("cherry-pick", "--abort")
         
-        self.run_gitforge("checkout", "master")
+        self.assertEqual(result.returncode, 0)
+        self.assertFileEquals("file.txt", b"master content\n")
+
+    def test_cherry_pick_continue(self):
+        """Test: gitforge cherry-pick --continue after resolving conflict"""
+        feature_commit = self.make_diverged_branches()
         self.run_gitforge("cherry-pick", feature_commit)
         
         # Resolve conflict
@@ -1104,30 +1512,21 @@ class TestCherryPick(GitforgeTestBase):
 
     def test_cherry_pick_rejects_merge_commit(self):
         """Test: cherry-pick rejects merge commits"""
-        self.run_gitforge("init")
-        self.create_file("base.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("base.txt", "base", "base", branches=["feature"])
         
-        self.create_file("master.txt", "master")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
+        self.commit_files({"master.txt": "master"}, "master")
         
         self.run_gitforge("checkout", "feature")
-        self.create_file("feature.txt", "feature")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
+        feature_commit = self.commit_files({"feature.txt": "feature"}, "feature")
         
         self.run_gitforge("checkout", "master")
         self.run_gitforge("merge", feature_commit)
-        merge_commit = self.run_gitforge("commit", "-m", "merge").stdout.strip()
+        merge_commit = self.run_gitforge("commit", "-m", "merge").oid
         
         self.run_gitforge("checkout", "feature")
         result = self.run_gitforge("cherry-pick", merge_commit)
         
-        self.assertIn("merge commit", result.stdout.lower())
+        self.assertIn("merge commit", result.stdout_lower)
 
 
 class TestReadWriteTree(GitforgeTestBase):
@@ -1143,22 +1542,22 @@ class TestReadWriteTree(GitforgeTestBase):
         result = self.run_gitforge("write-tree")
         
         self.assertEqual(result.returncode, 0)
-        tree_oid = result.stdout.strip()
+        tree_oid = result.oid
         self.assertEqual(len(tree_oid), 40)
 
     def test_read_tree(self):
         """Test: gitforge read-tree updates index from tree"""
         self.run_gitforge("init")
         self.create_file("file1.txt", "Content 1")
-        self.run_gitforge("add", "file1.txt")
+        self.run_gitforge("add", "file1.txt", capture=False)
         
         tree_result = self.run_gitforge("write-tree")
-        tree_oid = tree_result.stdout.strip()
+        tree_oid = tree_result.oid
         
         self.create_file("other.txt", "Other content")
-        self.run_gitforge("add", "other.txt")
+        self.run_gitforge("add", "other.txt", capture=False)
         
-        result = self.run_gitforge("read-tree", tree_oid)
+        result = self.run_gitforge("read-tree", tree_oid, capture=False)
         
         self.assertEqual(result.returncode, 0)
 
@@ -1168,43 +1567,46 @@ class TestRemoteOperations(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        cls.test_base_dir = tempfile.mkdtemp(prefix="gitforge_remote_test_")
+        cls.test_base_dir = tempfile.mkdtemp(prefix=f"gitforge_remote_test_{XDIST_WORKER}_", dir=TEST_TMP)
+        # Built once and copied into each test: an empty repository, and a
+        # remote with one commit
+        cls._seed_empty = tempfile.mkdtemp(dir=cls.test_base_dir, prefix="seed_empty_")
+        run_gitforge_in(cls._seed_empty, "init", capture=False)
+        cls._seed_remote = tempfile.mkdtemp(dir=cls.test_base_dir, prefix="seed_remote_")
+        run_gitforge_in(cls._seed_remote, "init", capture=False)
+        _write_bytes(os.path.join(cls._seed_remote, "remote.txt"), b"Remote content")
+        run_gitforge_in(cls._seed_remote, "add", "remote.txt", capture=False)
+        run_gitforge_in(cls._seed_remote, "commit", "-m", "Remote commit", capture=False)
 
     @classmethod
     def tearDownClass(cls):
-        if os.path.exists(cls.test_base_dir):
-            shutil.rmtree(cls.test_base_dir)
+        _remove_tree(cls.test_base_dir)
 
     def setUp(self):
+        """Give each test an initialized local and remote repository."""
         self.local_dir = tempfile.mkdtemp(dir=self.test_base_dir, prefix="local_")
         self.remote_dir = tempfile.mkdtemp(dir=self.test_base_dir, prefix="remote_")
+        _copy_tree(self._seed_empty, self.local_dir)
+        _copy_tree(self._seed_empty, self.remote_dir)
 
-    def run_gitforge(self, working_dir, *args, expect_success=True):
-        cmd = [sys.executable, str(GITFORGE_RUNNER)] + list(args)
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=working_dir
-        )
-        return result
+    def seed_remote_commit(self):
+        """Replace the empty remote with one holding a commit of remote.txt."""
+        _copy_tree(self._seed_remote, self.remote_dir)
+
+    def run_gitforge(self, working_dir, *args, expect_success=True, capture=True):
+        return run_gitforge_in(working_dir, *args, capture=capture)
 
     def create_file(self, base_dir, name, content):
         filepath = Path(base_dir) / name
         filepath.parent.mkdir(parents=True, exist_ok=True)
-        filepath.write_text(content)
+        _write_bytes(filepath, content.encode())
         return filepath
 
     def test_fetch(self):
         """Test: gitforge fetch"""
-        self.run_gitforge(self.remote_dir, "init")
-        self.create_file(self.remote_dir, "file1.txt", "Remote content")
-        self.run_gitforge(self.remote_dir, "add", "file1.txt")
-        self.run_gitforge(self.remote_dir, "commit", "-m", "Remote commit")
-        
-        self.run_gitforge(self.local_dir, "init")
+        self.seed_remote_commit()
         
-        result = self.run_gitforge(self.local_dir, "fetch", self.remote_dir)
+        result = self.run_gitforge(self.local_dir, "fetch", self.remote_dir, capture=False)
         
         self.assertEqual(result.returncode, 0)
         refs_path = os.path.join(self.local_dir, ".gitforge", "refs", "remote")
@@ -1212,12 +1614,9 @@ class TestRemoteOperations(unittest.TestCase):
 
     def test_push(self):
         """Test: gitforge push"""
-        self.run_gitforge(self.remote_dir, "init")
-        
-        self.run_gitforge(self.local_dir, "init")
         self.create_file(self.local_dir, "file1.txt", "Local content")
         self.run_gitforge(self.local_dir, "add", "file1.txt")
-        local_commit = self.run_gitforge(self.local_dir, "commit", "-m", "Local commit").stdout.strip()
+        local_commit = self.run_gitforge(self.local_dir, "commit", "-m", "Local commit").oid
         
         result = self.run_gitforge(self.local_dir, "push", self.remote_dir, "master")
         
@@ -1229,14 +1628,22 @@ class TestRemoteOperations(unittest.TestCase):
             remote_ref = f.read().strip()
         self.assertEqual(remote_ref, local_commit)
 
+    def test_push_up_to_date(self):
+        """Test: gitforge push when the remote already has the commit"""
+        self.create_file(self.local_dir, "file1.txt", "Local content")
+        self.run_gitforge(self.local_dir, "add", "file1.txt")
+        self.run_gitforge(self.local_dir, "commit", "-m", "Local commit")
+        self.run_gitforge(self.local_dir, "push", self.remote_dir, "master")
+
+        result = self.run_gitforge(self.local_dir, "push", self.remote_dir, "master")
+
+        self.assertEqual(result.returncode, 0)
+        self.assertIn("Everything up-to-date", result.stdout)
+
     def test_push_rejects_non_ancestor(self):
         """Test: gitforge push rejects non-fast-forward"""
-        self.run_gitforge(self.remote_dir, "init")
-        self.create_file(self.remote_dir, "remote.txt", "Remote content")
-        self.run_gitforge(self.remote_dir, "add", "remote.txt")
-        self.run_gitforge(self.remote_dir, "commit", "-m", "Remote commit")
+        self.seed_remote_commit()
         
-        self.run_gitforge(self.local_dir, "init")
         self.create_file(self.local_dir, "local.txt", "Local content")
         self.run_gitforge(self.local_dir, "add", "local.txt")
         self.run_gitforge(self.local_dir, "commit", "-m", "Local commit")
@@ -1245,6 +1652,79 @@ class TestRemoteOperations(unittest.TestCase):
         
         self.assertNotEqual(result.returncode, 0)
 
+    def test_push_large_file_revisions(self):
+        """Test: pushed revisions of a large file can be checked out on the remote"""
+        lines = [f"Line {i}\n" for i in range(10000)]
+        self.create_file(self.local_dir, "large.txt", "".join(lines))
+        self.run_gitforge(self.local_dir, "add", "large.txt")
+        self.run_gitforge(self.local_dir, "commit", "-m", "First")
+        lines[5000] = "Changed\n"
+        self.create_file(self.local_dir, "large.txt", "".join(lines))
+        self.run_gitforge(self.local_dir, "add", "large.txt")
+        self.run_gitforge(self.local_dir, "commit", "-m", "Second")
+        
+        result = self.run_gitforge(self.local_dir, "push", self.remote_dir, "master")
+        self.assertEqual(result.returncode, 0)
+        
+        result = self.run_gitforge(self.remote_dir, "checkout", "master")
+        self.assertEqual(result.returncode, 0)
+        content = (Path(self.remote_dir) / "large.txt").read_text()
+        self.assertEqual(content, "".join(lines))
+
+    def test_fetch_large_file_revisions(self):
+        """Test: revisions stored as deltas on the remote can be fetched and checked out"""
+        lines = [f"Line {i}\n" for i in range(10000)]
+        self.create_file(self.remote_dir, "large.txt", "".join(lines))
+        self.run_gitforge(self.remote_dir, "add", "large.txt")
+        self.run_gitforge(self.remote_dir, "commit", "-m", "First")
+        lines[5000] = "Changed\n"
+        self.create_file(self.remote_dir, "large.txt", "".join(lines))
+        self.run_gitforge(self.remote_dir, "add", "large.txt")
+        self.run_gitforge(self.remote_dir, "commit", "-m", "Second")
+        
+        result = self.run_gitforge(self.local_dir, "fetch", self.remote_dir)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        
+        result = self.run_gitforge(self.local_dir, "checkout", "remote/master")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        content = (Path(self.local_dir) / "large.txt").read_text()
+        self.assertEqual(content, "".join(lines))
+
+    def test_push_repeatedly(self):
+        """Test: successive pushes send only new commits and keep the remote complete"""
+        for i in range(3):
+            self.create_file(self.local_dir, f"file{i}.txt", f"Content {i}")
+            self.run_gitforge(self.local_dir, "add", f"file{i}.txt")
+            local_commit = self.run_gitforge(self.local_dir, "commit", "-m", f"Commit {i}").oid
+            result = self.run_gitforge(self.local_dir, "push", self.remote_dir, "master")
+            self.assertEqual(result.returncode, 0)
+
+        remote_ref_path = os.path.join(self.remote_dir, ".gitforge", "refs", "heads", "master")
+        with open(remote_ref_path) as f:
+            self.assertEqual(f.read().strip(), local_commit)
+        result = self.run_gitforge(self.remote_dir, "checkout", "master")
+        self.assertEqual(result.returncode, 0)
+        for i in range(3):
+            content = (Path(self.remote_dir) / f"file{i}.txt").read_text()
+            self.assertEqual(content, f"Content {i}")
+
+    def test_push_after_truncated_bloom_filter(self):
+        """Test: a push still works when the saved filter of remote objects was cut short"""
+        bloom_dir = os.path.join(self.local_dir, ".gitforge", "bloom")
+        for i, size in enumerate((0, 10, None)):
+            self.create_file(self.local_dir, f"file{i}.txt", f"Content {i}")
+            self.run_gitforge(self.local_dir, "add", f"file{i}.txt")
+            local_commit = self.run_gitforge(self.local_dir, "commit", "-m", f"Commit {i}").oid
+            result = self.run_gitforge(self.local_dir, "push", self.remote_dir, "master")
+            self.assertEqual(result.returncode, 0, result.stderr)
+            if size is not None:
+                for name in os.listdir(bloom_dir):
+                    os.truncate(os.path.join(bloom_dir, name), size)
+
+        remote_ref_path = os.path.join(self.remote_dir, ".gitforge", "refs", "heads", "master")
+        with open(remote_ref_path) as f:
+            self.assertEqual(f.read().strip(), local_commit)
+
 
 class TestEdgeCases(GitforgeTestBase):
     """Tests for edge cases and error handling."""
@@ -1258,7 +1738,7 @@ class TestEdgeCases(GitforgeTestBase):
 
     def test_checkout_nonexistent_ref(self):
         """Test: gitforge checkout with nonexistent ref"""
-        self.init_repo_with_commit()
+        self.clone_template()
         
         result = self.run_gitforge("checkout", "nonexistent-branch", expect_success=False)
         
@@ -1268,33 +1748,101 @@ class TestEdgeCases(GitforgeTestBase):
         """Test: gitforge branch without any commits"""
         self.run_gitforge("init")
         
-        result = self.run_gitforge("branch", "new-branch", expect_success=False)
+        result = self.run_gitforge("branch", "new-branch", expect_success=False, capture=False)
         # Should fail because there's no commit
 
     def test_large_file_content(self):
         """Test: handling large file content"""
         self.run_gitforge("init")
         
-        content = "\n".join([f"Line {i}" for i in range(10000)])
-        self.create_file("large.txt", content)
+        content = large_content()
+        self.create_file_bytes("large.txt", content)
         
         self.run_gitforge("add", "large.txt")
         result = self.run_gitforge("commit", "-m", "Large file")
         
         self.assertEqual(result.returncode, 0)
         
-        commit = result.stdout.strip()
+        commit = result.oid
+        self.run_gitforge("checkout", commit)
+        
+        self.assertFileEquals("large.txt", content)
+
+    def test_large_file_revisions_roundtrip(self):
+        """Test: every revision of a slightly modified large file can be restored"""
+        self.run_gitforge("init")
+        
+        lines = [f"Line {i}\n" for i in range(10000)]
+        revisions = []
+        for i in range(3):
+            lines[i * 100] = f"Changed in revision {i}\n"
+            content = "".join(lines)
+            self.create_file("large.txt", content)
+            commit = self.stage_and_commit("large.txt", message=f"Revision {i}")
+            revisions.append((commit, content))
+        
+        for commit, content in revisions:
+            self.run_gitforge("checkout", commit)
+            self.assertEqual(self.read_file_content("large.txt"), content)
+
+    def test_add_large_modified_file_is_fast(self):
+        """Test: adding a large file with scattered edits stays fast"""
+        self.run_gitforge("init")
+        
+        lines = [f"Unique line number {i:08d}\n" for i in range(130000)]
+        self.create_file("large.txt", "".join(lines))
+        self.stage_and_commit("large.txt", message="Base")
+        for i in range(0, len(lines), 50):
+            lines[i] = f"Edited line number {i:08d}\n"
+        content = "".join(lines)
+        self.create_file("large.txt", content)
+        
+        start = time.perf_counter()
+        self.run_gitforge("add", "large.txt")
+        self.assertLess(time.perf_counter() - start, 10)
+        commit = self.run_gitforge("commit", "-m", "Edited").oid
+        
+        self.run_gitforge("checkout", "HEAD~1")
         self.run_gitforge("checkout", commit)
+        self.assertEqual(self.read_file_content("large.txt"), content)
+
+    def test_fetch_sees_new_remote_commit_in_same_process(self):
+        """Test: a second fetch from one process picks up a commit made since the first"""
+        remote = tempfile.mkdtemp(dir=self.test_base_dir, prefix="remote_")
+        run_gitforge_in(remote, "init", capture=False)
+        _write_bytes(os.path.join(remote, "remote.txt"), b"First")
+        run_gitforge_in(remote, "add", "remote.txt", capture=False)
+        run_gitforge_in(remote, "commit", "-m", "First", capture=False)
+        self.run_gitforge("init")
+        
+        _, second, fetch = self.run_gitforge_batch([
+            ["fetch", remote],
+            {"argv": ["commit", "-m", "Second"], "cwd": remote},
+            ["fetch", remote],
+        ])
+        
+        self.assertEqual(fetch.returncode, 0, fetch.stderr)
+        self.assertEqual(self.read_file_content(".gitforge/refs/remote/master").strip(), second.oid)
+
+    def test_fast_path_arguments_match_parser(self):
+        """Test: commands parsed without argparse get the same arguments as through it"""
+        from gitforge import cli, objects
+        self.clone_template()
+        old_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        self.addCleanup(os.chdir, old_cwd)
         
-        retrieved = self.read_file_content("large.txt")
-        self.assertEqual(retrieved, content)
+        with objects.change_git_dir("."):
+            for command in ("init", "status", "k", "write-tree", "log", "show"):
+                with self.subTest(command=command):
+                    self.assertEqual(vars(cli._parse_fast_args([command])),
+                                     vars(cli.parse_args([command])))
 
     def test_special_characters_in_content(self):
         """Test: handling special characters"""
         self.run_gitforge("init")
         
-        content = "Special: <>&\"'`$@#%^*()[]{}|\\;:,.\nUnicode: 你好世界 🎉\n"
-        self.create_file("special.txt", content)
+        self.create_file_bytes("special.txt", SPECIAL_CONTENT)
         
         self.run_gitforge("add", "special.txt")
         result = self.run_gitforge("commit", "-m", "Special chars")
@@ -1303,7 +1851,7 @@ class TestEdgeCases(GitforgeTestBase):
 
     def test_multiple_branches_workflow(self):
         """Test: working with multiple branches"""
-        self.init_repo_with_commit()
+        self.clone_template()
         
         self.run_gitforge("branch", "feature-a")
         self.run_gitforge("branch", "feature-b")
@@ -1311,22 +1859,123 @@ class TestEdgeCases(GitforgeTestBase):
         
         self.run_gitforge("checkout", "feature-a")
         self.create_file("a.txt", "Feature A")
-        self.run_gitforge("add", "a.txt")
-        self.run_gitforge("commit", "-m", "Feature A")
+        self.stage_and_commit("a.txt", message="Feature A")
         
         self.run_gitforge("checkout", "feature-b")
         self.create_file("b.txt", "Feature B")
-        self.run_gitforge("add", "b.txt")
-        self.run_gitforge("commit", "-m", "Feature B")
+        self.stage_and_commit("b.txt", message="Feature B")
         
         self.run_gitforge("checkout", "feature-c")
-        self.assertFalse(self.file_exists("a.txt"))
-        self.assertFalse(self.file_exists("b.txt"))
+        listing = self.dir_listing()
+        self.assertNotIn("a.txt", listing)
+        self.assertNotIn("b.txt", listing)
         
         result = self.run_gitforge("branch")
-        self.assertIn("feature-a", result.stdout)
-        self.assertIn("feature-b", result.stdout)
-        self.assertIn("feature-c", result.stdout)
+        self.assertAllIn(result.stdout, "feature-a", "feature-b", "feature-c")
+
+
+class TestDeltaObjects(unittest.TestCase):
+    """Tests for blobs stored as deltas against an earlier version."""
+
+    def setUp(self):
+        from gitforge import objects
+        self.objects = objects
+        repo = tempfile.mkdtemp(prefix=f"gitforge_delta_test_{XDIST_WORKER}_", dir=TEST_TMP)
+        self.addCleanup(_remove_tree, repo)
+        change = objects.change_git_dir(repo)
+        change.__enter__()
+        self.addCleanup(change.__exit__, None, None, None)
+        objects.init()
+
+    def store(self, data, base=None):
+        """Store data, optionally against base, and return (oid, delta depth)."""
+        oid = self.objects.hash_object(data, base=base)
+        return oid, self.objects._delta_depth(oid)
+
+    def reread(self, oid):
+        """Read oid back from disk rather than from the object cache."""
+        self.objects._clear_caches()
+        return self.objects.get_object(oid)
+
+    def assertDeltaRoundtrip(self, base_content, data):
+        """Encode data against base_content with no size limits and decode it again."""
+        base, _ = self.store(base_content)
+        with mock.patch.object(self.objects, "_DELTA_MIN_SIZE", 0), \
+                mock.patch.object(self.objects, "_DELTA_MAX_RATIO", float("inf")):
+            body = self.objects._encode_delta(base, "blob", data)
+        self.assertIsNotNone(body)
+        self.assertEqual(self.objects._resolve_delta(body), ("blob", data))
+
+    def test_roundtrip_empty_base(self):
+        """Test: a delta against an empty blob decodes"""
+        self.assertDeltaRoundtrip(b"", b"first\nsecond\n")
+
+    def test_roundtrip_empty_target(self):
+        """Test: a delta down to empty content decodes"""
+        self.assertDeltaRoundtrip(b"first\nsecond\n", b"")
+
+    def test_roundtrip_no_trailing_newline(self):
+        """Test: content without a final newline decodes exactly"""
+        self.assertDeltaRoundtrip(b"a\nb\nc\n", b"a\nb\nc")
+        self.assertDeltaRoundtrip(b"a\nb\nc", b"a\nB\nc")
+
+    def test_roundtrip_binary_without_newlines(self):
+        """Test: binary content with no line breaks decodes"""
+        chunk = bytes(b for b in range(256) if b not in b"\r\n")
+        self.assertDeltaRoundtrip(chunk * 100, chunk * 50 + b"\x00" + chunk * 50)
+
+    def test_small_change_stored_as_delta(self):
+        """Test: a small edit to a large blob is stored as a delta"""
+        content = large_content()
+        base, _ = self.store(content)
+        oid, depth = self.store(content.replace(b"Line 5000\n", b"Edited\n"), base=base)
+        self.assertEqual(depth, 1)
+        self.assertEqual(self.reread(oid), content.replace(b"Line 5000\n", b"Edited\n"))
+
+    def test_delta_over_budget_stored_whole(self):
+        """Test: a delta that isn't under 60% of the blob falls back to a full object"""
+        content = large_content()
+        base, _ = self.store(content)
+        rewritten = content.replace(b"Line", b"Row")
+        self.assertIsNone(self.objects._encode_delta(base, "blob", rewritten))
+        oid, depth = self.store(rewritten, base=base)
+        self.assertEqual(depth, 0)
+        self.assertEqual(self.reread(oid), rewritten)
+
+    def test_binary_change_stored_whole(self):
+        """Test: an edit to binary content with no line breaks isn't stored as a delta"""
+        chunk = bytes(b for b in range(256) if b not in b"\r\n")
+        base, _ = self.store(chunk * 100)
+        oid, depth = self.store(chunk * 50 + b"\x00" + chunk * 50, base=base)
+        self.assertEqual(depth, 0)
+        self.assertEqual(self.reread(oid), chunk * 50 + b"\x00" + chunk * 50)
+
+    def test_delta_chain_limited_to_max_depth(self):
+        """Test: the revision after a chain of ten deltas is stored whole"""
+        lines = large_content().split(b"\n")
+        revisions = []
+        base = None
+        for i in range(self.objects._DELTA_MAX_DEPTH + 2):
+            lines[i * 100] = b"Revision %d" % i
+            content = b"\n".join(lines)
+            base, depth = self.store(content, base=base)
+            revisions.append((base, depth, content))
+
+        depths = [depth for _, depth, _ in revisions]
+        self.assertEqual(depths, list(range(self.objects._DELTA_MAX_DEPTH + 1)) + [0])
+        for oid, _, content in revisions:
+            self.assertEqual(self.reread(oid), content)
+
+    def test_get_object_with_missing_base_fails(self):
+        """Test: reading a delta whose base is gone raises instead of returning partial content"""
+        content = large_content()
+        base, _ = self.store(content)
+        oid, depth = self.store(content + b"\nOne more line", base=base)
+        self.assertEqual(depth, 1)
+        os.remove(self.objects._object_path(base))
+        self.objects._clear_caches()
+        with self.assertRaises(FileNotFoundError):
+            self.objects.get_object(oid)
 
 
 class TestCompleteWorkflow(unittest.TestCase):
@@ -1334,18 +1983,16 @@ class TestCompleteWorkflow(unittest.TestCase):
 
     def test_complete_workflow(self):
         """Test a complete git-like workflow."""
-        test_dir = tempfile.mkdtemp(prefix="gitforge_workflow_")
-        os.chdir(test_dir)
+        test_dir = tempfile.mkdtemp(prefix="gitforge_workflow_", dir=TEST_TMP)
         
         try:
             def run_gitforge(*args):
-                cmd = [sys.executable, str(GITFORGE_RUNNER)] + list(args)
-                return subprocess.run(cmd, capture_output=True, text=True, cwd=test_dir)
+                return run_gitforge_in(test_dir, *args)
             
             def create_file(name, content):
                 filepath = Path(test_dir) / name
                 filepath.parent.mkdir(parents=True, exist_ok=True)
-                filepath.write_text(content)
+                _write_bytes(filepath, content.encode())
             
             # 1. Init
             result = run_gitforge("init")
@@ -1357,7 +2004,7 @@ class TestCompleteWorkflow(unittest.TestCase):
             run_gitforge("add", ".")
             
             # 3. Initial commit
-            commit1 = run_gitforge("commit", "-m", "Initial commit").stdout.strip()
+            commit1 = run_gitforge("commit", "-m", "Initial commit").oid
             self.assertEqual(len(commit1), 40)
             
             # 4. Tag
@@ -1370,7 +2017,7 @@ class TestCompleteWorkflow(unittest.TestCase):
             # 6. Feature changes
             create_file("src/feature.py", "def feature(): pass")
             run_gitforge("add", ".")
-            commit2 = run_gitforge("commit", "-m", "Add feature").stdout.strip()
+            commit2 = run_gitforge("commit", "-m", "Add feature").oid
             
             # 7. Back to master
             run_gitforge("checkout", "master")
@@ -1388,9 +2035,8 @@ class TestCompleteWorkflow(unittest.TestCase):
             log_result = run_gitforge("log")
             self.assertIn("Merge feature", log_result.stdout)
             
-            # 11. Status
-            status_result = run_gitforge("status")
-            self.assertIn("On branch", status_result.stdout)
+            # 11. Still on a branch after the merge
+            self.assertEqual(_current_branch(test_dir), "master")
             
             # 12. Reset
             run_gitforge("reset", "--hard", commit1)
@@ -1398,8 +2044,7 @@ class TestCompleteWorkflow(unittest.TestCase):
             self.assertIn("Initial commit", log_result.stdout)
             
         finally:
-            os.chdir("/")
-            shutil.rmtree(test_dir)
+            _remove_tree(test_dir)
 
 
 class TestMergeEdgeCases(GitforgeTestBase):
@@ -1416,32 +2061,20 @@ class TestMergeEdgeCases(GitforgeTestBase):
         """
         # Create first repo with a commit
         self.run_gitforge("init")
-        self.create_file("file1.txt", "content from first history")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "first history commit")
+        self.commit_files({"file1.txt": "content from first history"}, "first history commit")
         
         # Create a separate repo with independent history
-        import tempfile
         other_repo = tempfile.mkdtemp(dir=self.test_base_dir)
         
         # Initialize other repo with different content
-        other_result = subprocess.run(
-            [sys.executable, str(GITFORGE_RUNNER), "init"],
-            cwd=other_repo, capture_output=True, text=True
-        )
+        other_result = run_gitforge_subprocess(other_repo, "init")
         self.assertEqual(other_result.returncode, 0)
         
         # Create a file and commit in other repo
-        (Path(other_repo) / "other.txt").write_text("other content")
-        subprocess.run(
-            [sys.executable, str(GITFORGE_RUNNER), "add", "other.txt"],
-            cwd=other_repo, capture_output=True
-        )
-        other_commit_result = subprocess.run(
-            [sys.executable, str(GITFORGE_RUNNER), "commit", "-m", "other commit"],
-            cwd=other_repo, capture_output=True, text=True
-        )
-        other_commit = other_commit_result.stdout.strip()
+        _write_bytes(os.path.join(other_repo, "other.txt"), b"other content")
+        run_gitforge_subprocess(other_repo, "add", "other.txt")
+        other_commit_result = run_gitforge_subprocess(other_repo, "commit", "-m", "other commit")
+        other_commit = other_commit_result.oid
         
         # Fetch from other repo to get the objects
         self.run_gitforge("fetch", other_repo)
@@ -1462,14 +2095,9 @@ class TestMergeEdgeCases(GitforgeTestBase):
 
     def test_merge_already_up_to_date(self):
         """Test: merge when already merged (other is ancestor of HEAD)."""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "base")
-        self.run_gitforge("add", ".")
-        base_commit = self.run_gitforge("commit", "-m", "base").stdout.strip()
+        base_commit = self.clone_base_commit("file1.txt", "base", "base")
         
-        self.create_file("file2.txt", "new file")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "add file2")
+        self.commit_files({"file2.txt": "new file"}, "add file2")
         
         # Try to merge the ancestor commit - should be fast-forward or no-op
         result = self.run_gitforge("merge", base_commit)
@@ -1477,7 +2105,7 @@ class TestMergeEdgeCases(GitforgeTestBase):
 
     def test_merge_same_commit(self):
         """Test: merge HEAD with itself."""
-        commit = self.init_repo_with_commit()
+        commit = self.clone_template()
         
         result = self.run_gitforge("merge", commit)
         self.assertEqual(result.returncode, 0)
@@ -1485,23 +2113,67 @@ class TestMergeEdgeCases(GitforgeTestBase):
 
     def test_merge_preserves_branch_attachment(self):
         """Test: after merge, HEAD remains attached to branch."""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
+        self.clone_base_commit("file1.txt", "base", "base", branches=["feature"])
         
-        self.run_gitforge("branch", "feature")
         self.run_gitforge("checkout", "feature")
-        self.create_file("feature.txt", "feature content")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
+        feature_commit = self.commit_files({"feature.txt": "feature content"}, "feature")
         
         self.run_gitforge("checkout", "master")
         self.run_gitforge("merge", feature_commit)
         
         # Check HEAD is still on master branch
-        status_result = self.run_gitforge("status")
-        self.assertIn("On branch master", status_result.stdout)
+        self.assertEqual(self.current_branch(), "master")
+
+
+class TestMerge3(unittest.TestCase):
+    """Tests for the in-process three-way merge against `diff3 -m`."""
+
+    # (base, HEAD, other), each merged the same way by merge3 and diff3
+    CASES = [
+        (b"b\nb\n", b"a\nb\n", b"b\nb\ny\n"),
+        (b"e\nc\nc\nc\n", b"e\nc\nc\n", b"a\nc\nc\n"),
+        (b"a\nb\nc\n", b"a\nb\nc\nx\n", b"a\nb\nc\ny\n"),
+        (b"a\nb\nc\n", b"a\nb\nc\nx\n", b"z\na\nb\nc\n"),
+        (b"a\nb\nc\nc\nc\n", b"a\nb\nb\nc\nc\nc\n", b"a\na\nb\nc\nc\n"),
+        (b"c\nb\nc\nb\na\n", b"a\nb\nc\nb\nc\na\n", b"c\na\nb\nc\nb\na\n"),
+        (b"x\nx\nx\nx\n", b"x\nx\nx\n", b"x\nx\nx\nx\nx\n"),
+        (b"a\nb\nc\nd\n", b"a\nB\nc\nd\n", b"a\nb\nc\nD\n"),
+        (b"a\nb\nc\n", b"a\nB\nc\n", b"a\nC\nc\n"),
+        (b"", b"one\n", b"two\n"),
+        (b"a\nb\n", b"", b"a\nb\nc\n"),
+        (b"a\nb", b"a\nb\nc", b"z\na\nb"),
+    ]
+
+    def merge3(self, base, HEAD, other):
+        from gitforge import diff_engine
+        return diff_engine.merge3(base, HEAD, other)
+
+    def test_repeated_lines_merge_cleanly(self):
+        """Test: syncing on repeated lines doesn't invent a conflict"""
+        self.assertEqual(self.merge3(b"b\nb\n", b"a\nb\n", b"b\nb\ny\n"), (b"a\nb\ny\n", False))
+
+    def test_repeated_lines_keep_both_changes(self):
+        """Test: a deletion among repeated lines isn't lost by a clean merge"""
+        self.assertEqual(self.merge3(b"e\nc\nc\nc\n", b"e\nc\nc\n", b"a\nc\nc\n"), (b"a\nc\n", False))
+
+    def test_insertions_at_end_conflict(self):
+        """Test: different lines appended on both sides conflict"""
+        merged, has_conflict = self.merge3(b"a\n", b"a\nx\n", b"a\ny\n")
+        self.assertTrue(has_conflict)
+        self.assertEqual(merged, b"a\n<<<<<<< HEAD\nx\n||||||| BASE\n=======\ny\n>>>>>>> MERGE_HEAD\n")
+
+    def test_identical_changes_apply_cleanly(self):
+        """Test: a change made the same way on both sides isn't a conflict"""
+        self.assertEqual(self.merge3(b"a\nx\nb\n", b"a\ny\nb\n", b"a\ny\nb\n"), (b"a\ny\nb\n", False))
+
+    @unittest.skipUnless(shutil.which("diff3"), "diff3 not installed")
+    def test_matches_diff3(self):
+        """Test: merge3 gives diff3's merged content and conflict status"""
+        from gitforge import diff_engine
+        for base, HEAD, other in self.CASES:
+            with self.subTest(base=base, HEAD=HEAD, other=other):
+                self.assertEqual(self.merge3(base, HEAD, other),
+                                 diff_engine._merge_contents_external(base, HEAD, other))
 
 
 class TestConflictScenarios(GitforgeTestBase):
@@ -1509,34 +2181,14 @@ class TestConflictScenarios(GitforgeTestBase):
 
     def test_content_conflict_has_markers(self):
         """Test: content conflicts write file with conflict markers."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "line1\nbase content\nline3\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        # Modify on master
-        self.create_file("file.txt", "line1\nmaster content\nline3\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master change")
-        
-        # Modify on feature (different change)
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "line1\nfeature content\nline3\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature change").stdout.strip()
-        
-        # Merge
-        self.run_gitforge("checkout", "master")
-        result = self.run_gitforge("merge", feature_commit)
+        # master and feature change file.txt differently, then feature is merged
+        _, result = self.make_conflict_state()
         
-        self.assertIn("conflict", result.stdout.lower())
+        self.assertIn("conflict", result.stdout_lower)
         
         # Check file has conflict markers
         content = self.read_file_content("file.txt")
-        self.assertIn("<<<<<<<", content)
-        self.assertIn(">>>>>>>", content)
+        self.assertConflictMarkers(content)
 
     def test_add_add_conflict(self):
         """Test: add/add conflict when both sides add same file with different content.
@@ -1544,72 +2196,44 @@ class TestConflictScenarios(GitforgeTestBase):
         Both sides added the same file with different content - should create a conflict
         file with markers so the user can resolve it.
         """
-        self.run_gitforge("init")
-        self.create_file("base.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        # Add new file on master
-        self.create_file("newfile.txt", "master version of new file\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "add newfile on master")
-        
-        # Add same file on feature with different content
-        self.run_gitforge("checkout", "feature")
-        self.create_file("newfile.txt", "feature version of new file\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "add newfile on feature").stdout.strip()
+        # Both branches add newfile.txt with different content
+        feature_commit = self.make_add_add_branches()
         
         # Merge
-        self.run_gitforge("checkout", "master")
         result = self.run_gitforge("merge", feature_commit)
         
         # Should report conflict
-        self.assertIn("conflict", result.stdout.lower())
+        self.assertIn("conflict", result.stdout_lower)
         
         # Check status shows conflict with correct type
         status = self.run_gitforge("status")
         self.assertIn("newfile.txt", status.stdout)
-        self.assertIn("both added", status.stdout.lower())
+        self.assertIn("both added", status.stdout_lower)
         
         # File SHOULD exist in working directory with conflict markers
-        self.assertTrue(
-            self.file_exists("newfile.txt"),
+        content = self.read_file_content(
+            "newfile.txt",
             "add/add conflict: file should exist in working dir with conflict markers"
         )
-        
-        # Verify conflict markers are present
-        content = self.read_file_content("newfile.txt")
-        self.assertIn("<<<<<<<", content)
-        self.assertIn(">>>>>>>", content)
+        self.assertConflictMarkers(content)
 
     def test_add_add_same_content_no_conflict(self):
         """Test: add/add with identical content should NOT conflict."""
-        self.run_gitforge("init")
-        self.create_file("base.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("base.txt", "base", "base", branches=["feature"])
         
         # Add new file on master
-        self.create_file("newfile.txt", "identical content")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "add newfile on master")
+        self.commit_files({"newfile.txt": "identical content"}, "add newfile on master")
         
         # Add same file on feature with SAME content
         self.run_gitforge("checkout", "feature")
-        self.create_file("newfile.txt", "identical content")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "add newfile on feature").stdout.strip()
+        feature_commit = self.commit_files({"newfile.txt": "identical content"},
+                                           "add newfile on feature")
         
         # Merge - should NOT conflict
         self.run_gitforge("checkout", "master")
         result = self.run_gitforge("merge", feature_commit)
         
-        self.assertNotIn("conflict", result.stdout.lower())
+        self.assertNotIn("conflict", result.stdout_lower)
         self.assertTrue(self.file_exists("newfile.txt"))
 
     def test_delete_modify_conflict(self):
@@ -1617,145 +2241,92 @@ class TestConflictScenarios(GitforgeTestBase):
         
         This tests the standard content_conflict scenario.
         """
-        self.run_gitforge("init")
-        self.create_file("file.txt", "original content\n")
-        self.create_file("keep.txt", "keep this file")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        # Modify file on master
-        self.create_file("file.txt", "modified on master\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "modify on master")
-        
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "different modification on feature\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "modify differently on feature").stdout.strip()
-        
-        # Merge
-        self.run_gitforge("checkout", "master")
-        result = self.run_gitforge("merge", feature_commit)
+        # master and feature modify file.txt differently, then feature is merged
+        _, result = self.make_conflict_state()
         
         # Should report conflict (content conflict since both modified)
-        self.assertIn("conflict", result.stdout.lower())
+        self.assertIn("conflict", result.stdout_lower)
         
         # Check status shows conflict with correct type
         status = self.run_gitforge("status")
         self.assertIn("file.txt", status.stdout)
-        self.assertIn("both modified", status.stdout.lower())
+        self.assertIn("both modified", status.stdout_lower)
         
         # File should exist with conflict markers
-        self.assertTrue(self.file_exists("file.txt"))
         content = self.read_file_content("file.txt")
-        self.assertIn("<<<<<<<", content)
-        self.assertIn(">>>>>>>", content)
+        self.assertConflictMarkers(content)
 
     def test_one_side_modifies_other_unchanged(self):
         """Test: one side modifies, other doesn't change - should NOT conflict."""
         self.run_gitforge("init")
-        self.create_file("file.txt", "original content")
-        self.create_file("other.txt", "other file")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
+        self.commit_files({"file.txt": "original content",
+                           "other.txt": "other file"}, "base")
         
         self.run_gitforge("branch", "feature")
         
         # Modify file on master
-        self.create_file("file.txt", "modified on master")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "modify file")
+        self.commit_files({"file.txt": "modified on master"}, "modify file")
         
         # Make unrelated change on feature (don't touch file.txt)
         self.run_gitforge("checkout", "feature")
-        self.create_file("other.txt", "modified other file")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "modify other").stdout.strip()
+        feature_commit = self.commit_files({"other.txt": "modified other file"}, "modify other")
         
         # Merge - should accept master's change without conflict
         self.run_gitforge("checkout", "master")
         result = self.run_gitforge("merge", feature_commit)
         
-        self.assertNotIn("conflict", result.stdout.lower())
+        self.assertNotIn("conflict", result.stdout_lower)
         # Master's modification should be preserved
         content = self.read_file_content("file.txt")
         self.assertEqual(content, "modified on master")
 
     def test_one_side_adds_new_file(self):
         """Test: one side adds new file, other doesn't - should NOT conflict."""
-        self.run_gitforge("init")
-        self.create_file("base.txt", "base content")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("base.txt", "base content", "base", branches=["feature"])
         
         # Add new file on master
-        self.create_file("master_new.txt", "new file from master")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "add new on master")
+        self.commit_files({"master_new.txt": "new file from master"}, "add new on master")
         
         # Add different new file on feature
         self.run_gitforge("checkout", "feature")
-        self.create_file("feature_new.txt", "new file from feature")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "add new on feature").stdout.strip()
+        feature_commit = self.commit_files({"feature_new.txt": "new file from feature"},
+                                           "add new on feature")
         
         # Merge - both new files should exist
         self.run_gitforge("checkout", "master")
         result = self.run_gitforge("merge", feature_commit)
         
-        self.assertNotIn("conflict", result.stdout.lower())
-        self.assertTrue(self.file_exists("master_new.txt"))
-        self.assertTrue(self.file_exists("feature_new.txt"))
+        self.assertNotIn("conflict", result.stdout_lower)
+        self.assertEqual({"master_new.txt", "feature_new.txt"} - self.dir_listing(), set())
 
     def test_both_modify_same_way(self):
         """Test: both sides make identical modifications - should NOT conflict."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "original")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("file.txt", "original", "base", branches=["feature"])
         
         # Same modification on master
-        self.create_file("file.txt", "modified identically")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "modify on master")
+        self.commit_files({"file.txt": "modified identically"}, "modify on master")
         
         # Same modification on feature
         self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "modified identically")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "modify on feature").stdout.strip()
+        feature_commit = self.commit_files({"file.txt": "modified identically"},
+                                           "modify on feature")
         
         # Merge
         self.run_gitforge("checkout", "master")
         result = self.run_gitforge("merge", feature_commit)
         
-        self.assertNotIn("conflict", result.stdout.lower())
+        self.assertNotIn("conflict", result.stdout_lower)
         content = self.read_file_content("file.txt")
         self.assertEqual(content, "modified identically")
 
     def test_resolve_conflict_with_add(self):
         """Test: resolving conflict by editing file and running add."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("file.txt", "base\n", "base", branches=["feature"])
         
-        self.create_file("file.txt", "master\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
+        self.commit_files({"file.txt": "master\n"}, "master")
         
         self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
+        feature_commit = self.commit_files({"file.txt": "feature\n"}, "feature")
         
         self.run_gitforge("checkout", "master")
         self.run_gitforge("merge", feature_commit)
@@ -1779,40 +2350,21 @@ class TestConflictFileVisibility(GitforgeTestBase):
 
     def test_add_add_conflict_file_visible_during_merge(self):
         """Test: add/add conflict writes file with conflict markers during merge."""
-        self.run_gitforge("init")
-        self.create_file("base.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        # Add new file on master
-        self.create_file("newfile.txt", "master added this file\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "add newfile on master")
-        
-        # Add same file on feature with different content
-        self.run_gitforge("checkout", "feature")
-        self.create_file("newfile.txt", "feature added this file\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "add newfile on feature").stdout.strip()
+        # Both branches add newfile.txt with different content
+        feature_commit = self.make_add_add_branches()
         
         # Merge
-        self.run_gitforge("checkout", "master")
         result = self.run_gitforge("merge", feature_commit)
         
-        self.assertIn("conflict", result.stdout.lower())
+        self.assertIn("conflict", result.stdout_lower)
         
         # Critical: file must exist so user can resolve it
-        self.assertTrue(self.file_exists("newfile.txt"))
         content = self.read_file_content("newfile.txt")
-        self.assertIn("<<<<<<<", content)
-        self.assertIn("HEAD", content)
-        self.assertIn(">>>>>>>", content)
+        self.assertConflictMarkers(content, ours_label="HEAD")
         
         # Status should show "both added" type
         status = self.run_gitforge("status")
-        self.assertIn("both added", status.stdout.lower())
+        self.assertIn("both added", status.stdout_lower)
 
     def test_add_add_conflict_file_visible_during_rebase(self):
         """Test: add/add conflict writes file with conflict markers during rebase.
@@ -1820,23 +2372,9 @@ class TestConflictFileVisibility(GitforgeTestBase):
         This is the original reported issue - during rebase with add_add conflict,
         the file was not present in the working directory.
         """
-        self.run_gitforge("init")
-        self.create_file("base.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        # Add new file on master
-        self.create_file("newfile.txt", "master added this file\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "add newfile on master")
-        
-        # Add same file on feature with different content
+        # Both branches add newfile.txt with different content
+        self.make_add_add_branches()
         self.run_gitforge("checkout", "feature")
-        self.create_file("newfile.txt", "feature added this file\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "add newfile on feature")
         
         # Rebase feature onto master - this should conflict
         result = self.run_gitforge("rebase", "master")
@@ -1844,13 +2382,11 @@ class TestConflictFileVisibility(GitforgeTestBase):
         self.assertIn("CONFLICT", result.stdout)
         
         # Critical: file must exist so user can resolve it
-        self.assertTrue(
-            self.file_exists("newfile.txt"),
+        content = self.read_file_content(
+            "newfile.txt",
             "add/add conflict during rebase: file MUST exist in working directory"
         )
-        content = self.read_file_content("newfile.txt")
-        self.assertIn("<<<<<<<", content)
-        self.assertIn(">>>>>>>", content)
+        self.assertConflictMarkers(content)
         
         # Resolve and continue
         self.create_file("newfile.txt", "resolved content\n")
@@ -1860,101 +2396,66 @@ class TestConflictFileVisibility(GitforgeTestBase):
 
     def test_add_add_conflict_resolution_workflow(self):
         """Test: complete workflow for resolving add/add conflict."""
-        self.run_gitforge("init")
-        self.create_file("base.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        self.create_file("shared.txt", "master version\nline 2\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master adds shared.txt")
-        
-        self.run_gitforge("checkout", "feature")
-        self.create_file("shared.txt", "feature version\nline 2\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature adds shared.txt").stdout.strip()
-        
-        self.run_gitforge("checkout", "master")
+        feature_commit = self.make_add_add_branches()
         self.run_gitforge("merge", feature_commit)
         
         # User resolves the conflict
-        self.create_file("shared.txt", "merged version\nline 2\n")
-        self.run_gitforge("add", "shared.txt")
+        self.create_file("newfile.txt", "merged version\nline 2\n")
+        self.run_gitforge("add", "newfile.txt")
         
         # Commit should succeed
         result = self.run_gitforge("commit", "-m", "resolve add/add conflict")
         self.assertEqual(result.returncode, 0)
         
         # Verify the resolved content
-        content = self.read_file_content("shared.txt")
+        content = self.read_file_content("newfile.txt")
         self.assertEqual(content, "merged version\nline 2\n")
 
     def test_content_conflict_file_visible(self):
         """Test: content conflict writes file with conflict markers."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "line1\nbase content\nline3\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("file.txt", "line1\nbase content\nline3\n", "base", branches=["feature"])
         
-        self.create_file("file.txt", "line1\nmaster content\nline3\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master change")
+        self.commit_files({"file.txt": "line1\nmaster content\nline3\n"}, "master change")
         
         self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "line1\nfeature content\nline3\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature change").stdout.strip()
+        feature_commit = self.commit_files({"file.txt": "line1\nfeature content\nline3\n"},
+                                           "feature change")
         
         self.run_gitforge("checkout", "master")
         self.run_gitforge("merge", feature_commit)
         
         # File must exist with conflict markers
-        self.assertTrue(self.file_exists("file.txt"))
         content = self.read_file_content("file.txt")
-        self.assertIn("<<<<<<<", content)
-        self.assertIn("master content", content)
-        self.assertIn("feature content", content)
-        self.assertIn(">>>>>>>", content)
+        ours, theirs = self.assertConflictMarkers(content)
+        self.assertEqual(ours, "master content\n")
+        self.assertEqual(theirs, "feature content\n")
 
     def test_conflict_types_displayed_correctly(self):
         """Test: status shows correct conflict type labels."""
-        self.run_gitforge("init")
-        self.create_file("existing.txt", "base content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("existing.txt", "base content\n", "base", branches=["feature"])
         
         # Create two types of conflicts:
         # 1. content conflict on existing.txt
         # 2. add/add conflict on newfile.txt
-        self.create_file("existing.txt", "master modified\n")
-        self.create_file("newfile.txt", "master added\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master changes")
+        self.commit_files({"existing.txt": "master modified\n",
+                           "newfile.txt": "master added\n"}, "master changes")
         
         self.run_gitforge("checkout", "feature")
-        self.create_file("existing.txt", "feature modified\n")
-        self.create_file("newfile.txt", "feature added\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature changes").stdout.strip()
+        feature_commit = self.commit_files({"existing.txt": "feature modified\n",
+                                            "newfile.txt": "feature added\n"}, "feature changes")
         
         self.run_gitforge("checkout", "master")
         self.run_gitforge("merge", feature_commit)
         
-        status = self.run_gitforge("status")
+        status = json.loads(self.run_gitforge("status", "--json").stdout)
         
-        # Both conflict types should be shown with correct labels
-        self.assertIn("both modified", status.stdout.lower())
-        self.assertIn("both added", status.stdout.lower())
+        # Both conflict types should be reported
+        types = {conflict["path"]: conflict["type"] for conflict in status["conflicts"]}
+        self.assertEqual(types, {"existing.txt": "content_conflict", "newfile.txt": "add_add"})
+        self.assertEqual(status["branch"], "master")
         
         # Both files should exist
-        self.assertTrue(self.file_exists("existing.txt"))
-        self.assertTrue(self.file_exists("newfile.txt"))
+        self.assertEqual({"existing.txt", "newfile.txt"} - self.dir_listing(), set())
 
 
 class TestRebaseScenarios(GitforgeTestBase):
@@ -1962,23 +2463,14 @@ class TestRebaseScenarios(GitforgeTestBase):
 
     def test_rebase_basic(self):
         """Test: basic rebase workflow."""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("file1.txt", "base", "base", branches=["feature"])
         
         # Add commit on master
-        self.create_file("master.txt", "master content")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master commit")
+        self.commit_files({"master.txt": "master content"}, "master commit")
         
         # Add commit on feature
         self.run_gitforge("checkout", "feature")
-        self.create_file("feature.txt", "feature content")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "feature commit")
+        self.commit_files({"feature.txt": "feature content"}, "feature commit")
         
         # Rebase feature onto master
         result = self.run_gitforge("rebase", "master")
@@ -1987,38 +2479,28 @@ class TestRebaseScenarios(GitforgeTestBase):
         self.assertIn("Rebase complete", result.stdout)
         
         # Both files should exist
-        self.assertTrue(self.file_exists("master.txt"))
-        self.assertTrue(self.file_exists("feature.txt"))
+        self.assertEqual({"master.txt", "feature.txt"} - self.dir_listing(), set())
 
     def test_rebase_preserves_author(self):
         """Test: rebase preserves original author information."""
+        original = ("Original Author", "original@test.com")
+        rebaser = ("Rebaser", "rebaser@test.com")
         self.run_gitforge("init")
-        self.run_gitforge("config", "user.name", "Original Author")
-        self.run_gitforge("config", "user.email", "original@test.com")
         
-        self.create_file("file1.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
+        self.commit_files({"file1.txt": "base"}, "base", author=original)
         
         self.run_gitforge("branch", "feature")
         self.run_gitforge("checkout", "feature")
         
-        self.create_file("feature.txt", "feature")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "feature commit")
-        
-        # Change author
-        self.run_gitforge("config", "user.name", "Rebaser")
+        self.commit_files({"feature.txt": "feature"}, "feature commit", author=original)
         
         # Add commit on master so rebase has something to do
         self.run_gitforge("checkout", "master")
-        self.create_file("master.txt", "master")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master commit")
+        self.commit_files({"master.txt": "master"}, "master commit", author=rebaser)
         
-        # Rebase
+        # Rebase as someone else
         self.run_gitforge("checkout", "feature")
-        self.run_gitforge("rebase", "master")
+        self.run_gitforge("rebase", "master", author=rebaser)
         
         # Check author is preserved
         show_result = self.run_gitforge("show")
@@ -2026,23 +2508,14 @@ class TestRebaseScenarios(GitforgeTestBase):
 
     def test_rebase_with_conflict(self):
         """Test: rebase stops on conflict and can be continued."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("file.txt", "base\n", "base", branches=["feature"])
         
         # Conflicting change on master
-        self.create_file("file.txt", "master content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master change")
+        self.commit_files({"file.txt": "master content\n"}, "master change")
         
         # Conflicting change on feature
         self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature content\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "feature change")
+        self.commit_files({"file.txt": "feature content\n"}, "feature change")
         
         # Rebase - should conflict
         result = self.run_gitforge("rebase", "master")
@@ -2058,21 +2531,12 @@ class TestRebaseScenarios(GitforgeTestBase):
 
     def test_rebase_abort(self):
         """Test: rebase --abort restores original state."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("file.txt", "base\n", "base", branches=["feature"])
         
-        self.create_file("file.txt", "master\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
+        self.commit_files({"file.txt": "master\n"}, "master")
         
         self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature\n")
-        self.run_gitforge("add", ".")
-        original_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
+        original_commit = self.commit_files({"file.txt": "feature\n"}, "feature")
         
         # Start rebase (will conflict)
         self.run_gitforge("rebase", "master")
@@ -2080,7 +2544,7 @@ class TestRebaseScenarios(GitforgeTestBase):
         # Abort
         result = self.run_gitforge("rebase", "--abort")
         self.assertEqual(result.returncode, 0)
-        self.assertIn("aborted", result.stdout.lower())
+        self.assertIn("aborted", result.stdout_lower)
         
         # File should be restored
         content = self.read_file_content("file.txt")
@@ -2088,52 +2552,29 @@ class TestRebaseScenarios(GitforgeTestBase):
 
     def test_rebase_already_up_to_date(self):
         """Test: rebase when already based on upstream."""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
+        self.clone_base_commit("file1.txt", "base", "base", branches=["feature"])
         
-        self.run_gitforge("branch", "feature")
         self.run_gitforge("checkout", "feature")
         
-        self.create_file("feature.txt", "feature")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "feature")
+        self.commit_files({"feature.txt": "feature"}, "feature")
         
         # Rebase onto master (which is already base)
         result = self.run_gitforge("rebase", "master")
         
         self.assertEqual(result.returncode, 0)
-        self.assertIn("up to date", result.stdout.lower())
+        self.assertIn("up to date", result.stdout_lower)
 
     def test_rebase_multiple_commits(self):
         """Test: rebase replays multiple commits in order."""
-        self.run_gitforge("init")
-        self.create_file("base.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("base.txt", "base", "base", branches=["feature"])
         
         # Master commit
-        self.create_file("master.txt", "master")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
+        self.commit_files({"master.txt": "master"}, "master")
         
         # Multiple feature commits
         self.run_gitforge("checkout", "feature")
-        
-        self.create_file("f1.txt", "feature 1")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "feature 1")
-        
-        self.create_file("f2.txt", "feature 2")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "feature 2")
-        
-        self.create_file("f3.txt", "feature 3")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "feature 3")
+        for i in (1, 2, 3):
+            self.commit_files({f"f{i}.txt": f"feature {i}"}, f"feature {i}")
         
         # Rebase
         result = self.run_gitforge("rebase", "master")
@@ -2142,101 +2583,62 @@ class TestRebaseScenarios(GitforgeTestBase):
         self.assertIn("3 commit(s)", result.stdout)
         
         # All files should exist
-        self.assertTrue(self.file_exists("master.txt"))
-        self.assertTrue(self.file_exists("f1.txt"))
-        self.assertTrue(self.file_exists("f2.txt"))
-        self.assertTrue(self.file_exists("f3.txt"))
+        self.assertEqual({"master.txt", "f1.txt", "f2.txt", "f3.txt"} - self.dir_listing(), set())
 
     def test_rebase_rejects_merge_commits(self):
         """Test: rebase fails if branch contains merge commits."""
-        self.run_gitforge("init")
-        self.create_file("base.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        self.run_gitforge("branch", "side")
+        self.clone_base_commit("base.txt", "base", "base", branches=["feature", "side"])
         
-        # Commit on feature
-        self.run_gitforge("checkout", "feature")
-        self.create_file("feature.txt", "feature")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "feature")
+        # Commit on master, which the clone has checked out
+        self.commit_files({"master.txt": "master"}, "master")
         
         # Commit on side
         self.run_gitforge("checkout", "side")
-        self.create_file("side.txt", "side")
-        self.run_gitforge("add", ".")
-        side_commit = self.run_gitforge("commit", "-m", "side").stdout.strip()
+        side_commit = self.commit_files({"side.txt": "side"}, "side")
         
-        # Merge side into feature (creates merge commit)
+        # Commit on feature
         self.run_gitforge("checkout", "feature")
+        self.commit_files({"feature.txt": "feature"}, "feature")
+        
+        # Merge side into feature (creates merge commit)
         self.run_gitforge("merge", side_commit)
         self.run_gitforge("commit", "-m", "merge side into feature")
         
-        # Commit on master
-        self.run_gitforge("checkout", "master")
-        self.create_file("master.txt", "master")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
-        
         # Try to rebase feature onto master - should fail
-        self.run_gitforge("checkout", "feature")
         result = self.run_gitforge("rebase", "master")
         
-        self.assertIn("merge commit", result.stdout.lower())
+        self.assertIn("merge commit", result.stdout_lower)
 
     def test_rebase_empty_commit_skipped(self):
         """Test: rebase skips commits that become empty."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "content")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
+        self.clone_base_commit("file.txt", "content", "base", branches=["feature"])
         
-        self.run_gitforge("branch", "feature")
+        # On master, which the clone has checked out, modify file
+        self.commit_files({"file.txt": "modified"}, "modification on master")
         
-        # On feature, modify file
+        # On feature, make same modification
         self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "modified")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "modify on feature")
-        
-        # On master, make same modification
-        self.run_gitforge("checkout", "master")
-        self.create_file("file.txt", "modified")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "same modification on master")
+        self.commit_files({"file.txt": "modified"}, "same modification on feature")
         
         # Rebase feature onto master - commit should be empty
-        self.run_gitforge("checkout", "feature")
         result = self.run_gitforge("rebase", "master")
         
         self.assertEqual(result.returncode, 0)
-        self.assertIn("empty", result.stdout.lower())
+        self.assertIn("empty", result.stdout_lower)
 
     def test_rebase_preserves_branch_attachment(self):
         """Test: after rebase, HEAD remains attached to branch."""
-        self.run_gitforge("init")
-        self.create_file("file1.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("file1.txt", "base", "base", branches=["feature"])
         
-        self.create_file("master.txt", "master")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
+        self.commit_files({"master.txt": "master"}, "master")
         
         self.run_gitforge("checkout", "feature")
-        self.create_file("feature.txt", "feature")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "feature")
+        self.commit_files({"feature.txt": "feature"}, "feature")
         
         self.run_gitforge("rebase", "master")
         
         # Check still on feature branch
-        status = self.run_gitforge("status")
-        self.assertIn("On branch feature", status.stdout)
+        self.assertEqual(self.current_branch(), "feature")
 
 
 class TestCherryPickScenarios(GitforgeTestBase):
@@ -2244,72 +2646,41 @@ class TestCherryPickScenarios(GitforgeTestBase):
 
     def test_cherry_pick_empty_becomes_skip(self):
         """Test: cherry-pick skips commit that would be empty."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "content")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("file.txt", "content", "base", branches=["feature"])
         
         # On feature, modify file
         self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "modified")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "modify on feature").stdout.strip()
+        feature_commit = self.commit_files({"file.txt": "modified"}, "modify on feature")
         
         # On master, make same modification
         self.run_gitforge("checkout", "master")
-        self.create_file("file.txt", "modified")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "same modification on master")
+        self.commit_files({"file.txt": "modified"}, "same modification on master")
         
         # Cherry-pick feature commit - should be empty
         result = self.run_gitforge("cherry-pick", feature_commit)
         
         self.assertEqual(result.returncode, 0)
-        self.assertIn("empty", result.stdout.lower())
+        self.assertIn("empty", result.stdout_lower)
 
     def test_cherry_pick_rejects_root_commit(self):
         """Test: cherry-pick rejects root commits (no parent)."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "content")
-        self.run_gitforge("add", ".")
-        root_commit = self.run_gitforge("commit", "-m", "root").stdout.strip()
+        root_commit = self.clone_base_commit("file.txt", "content", "root")
         
-        self.create_file("file2.txt", "more content")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "second")
+        self.commit_files({"file2.txt": "more content"}, "second")
         
         # Try to cherry-pick root - should fail
         result = self.run_gitforge("cherry-pick", root_commit)
         
-        self.assertIn("root commit", result.stdout.lower())
+        self.assertIn("root commit", result.stdout_lower)
 
     def test_cherry_pick_rejects_during_merge(self):
         """Test: cherry-pick fails if merge is in progress."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        self.create_file("file.txt", "master\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
-        
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
+        feature_commit = self.make_diverged_branches()
         
         # Start conflicting merge
-        self.run_gitforge("checkout", "master")
         self.run_gitforge("branch", "other")
         self.run_gitforge("checkout", "other")
-        self.create_file("other.txt", "other")
-        self.run_gitforge("add", ".")
-        other_commit = self.run_gitforge("commit", "-m", "other").stdout.strip()
+        other_commit = self.commit_files({"other.txt": "other"}, "other")
         
         self.run_gitforge("checkout", "master")
         self.run_gitforge("merge", feature_commit)  # Creates conflict
@@ -2317,31 +2688,15 @@ class TestCherryPickScenarios(GitforgeTestBase):
         # Try cherry-pick - should fail
         result = self.run_gitforge("cherry-pick", other_commit)
         
-        self.assertIn("merge is in progress", result.stdout.lower())
+        self.assertIn("merge is in progress", result.stdout_lower)
 
     def test_cherry_pick_rejects_during_rebase(self):
         """Test: cherry-pick fails if rebase is in progress."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
+        self.make_diverged_branches()
         
-        self.run_gitforge("branch", "feature")
         self.run_gitforge("branch", "other")
-        
-        self.create_file("file.txt", "master\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
-        
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "feature")
-        
         self.run_gitforge("checkout", "other")
-        self.create_file("other.txt", "other")
-        self.run_gitforge("add", ".")
-        other_commit = self.run_gitforge("commit", "-m", "other").stdout.strip()
+        other_commit = self.commit_files({"other.txt": "other"}, "other")
         
         # Start conflicting rebase
         self.run_gitforge("checkout", "feature")
@@ -2350,20 +2705,14 @@ class TestCherryPickScenarios(GitforgeTestBase):
         # Try cherry-pick - should fail
         result = self.run_gitforge("cherry-pick", other_commit)
         
-        self.assertIn("rebase is in progress", result.stdout.lower())
+        self.assertIn("rebase is in progress", result.stdout_lower)
 
     def test_cherry_pick_with_dirty_working_tree(self):
         """Test: cherry-pick fails with uncommitted changes."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
+        self.clone_base_commit("file.txt", "base", "base", branches=["feature"])
         
-        self.run_gitforge("branch", "feature")
         self.run_gitforge("checkout", "feature")
-        self.create_file("feature.txt", "feature")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
+        feature_commit = self.commit_files({"feature.txt": "feature"}, "feature")
         
         self.run_gitforge("checkout", "master")
         
@@ -2373,7 +2722,7 @@ class TestCherryPickScenarios(GitforgeTestBase):
         # Try cherry-pick - should fail
         result = self.run_gitforge("cherry-pick", feature_commit)
         
-        self.assertIn("changes exist", result.stdout.lower())
+        self.assertIn("changes exist", result.stdout_lower)
 
 
 class TestBranchPreservation(GitforgeTestBase):
@@ -2381,94 +2730,61 @@ class TestBranchPreservation(GitforgeTestBase):
 
     def test_reset_preserves_branch_attachment(self):
         """Test: reset keeps HEAD attached to branch."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "v1")
-        self.run_gitforge("add", ".")
-        commit1 = self.run_gitforge("commit", "-m", "v1").stdout.strip()
+        commit1 = self.clone_base_commit("file.txt", "v1", "v1")
         
-        self.create_file("file.txt", "v2")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "v2")
+        self.commit_files({"file.txt": "v2"}, "v2")
         
         # Reset to earlier commit
         self.run_gitforge("reset", "--hard", commit1)
         
         # Should still be on master
-        status = self.run_gitforge("status")
-        self.assertIn("On branch master", status.stdout)
+        self.assertEqual(self.current_branch(), "master")
 
     def test_fast_forward_merge_preserves_branch(self):
         """Test: fast-forward merge keeps HEAD attached to branch."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
+        self.clone_base_commit("file.txt", "base", "base", branches=["feature"])
         
-        self.run_gitforge("branch", "feature")
         self.run_gitforge("checkout", "feature")
         
-        self.create_file("feature.txt", "feature")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
+        feature_commit = self.commit_files({"feature.txt": "feature"}, "feature")
         
         self.run_gitforge("checkout", "master")
         self.run_gitforge("merge", feature_commit)
         
         # Should still be on master
-        status = self.run_gitforge("status")
-        self.assertIn("On branch master", status.stdout)
+        self.assertEqual(self.current_branch(), "master")
 
     def test_merge_abort_preserves_branch(self):
         """Test: merge --abort keeps HEAD attached to branch."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("file.txt", "base\n", "base", branches=["feature"])
         
-        self.create_file("file.txt", "master\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
+        self.commit_files({"file.txt": "master\n"}, "master")
         
         self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
+        feature_commit = self.commit_files({"file.txt": "feature\n"}, "feature")
         
         self.run_gitforge("checkout", "master")
         self.run_gitforge("merge", feature_commit)
         self.run_gitforge("merge", "--abort")
         
         # Should still be on master
-        status = self.run_gitforge("status")
-        self.assertIn("On branch master", status.stdout)
+        self.assertEqual(self.current_branch(), "master")
 
     def test_cherry_pick_abort_preserves_branch(self):
         """Test: cherry-pick --abort keeps HEAD attached to branch."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
+        self.clone_base_commit("file.txt", "base\n", "base", branches=["feature"])
         
-        self.create_file("file.txt", "master\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
+        self.commit_files({"file.txt": "master\n"}, "master")
         
         self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
+        feature_commit = self.commit_files({"file.txt": "feature\n"}, "feature")
         
         self.run_gitforge("checkout", "master")
         self.run_gitforge("cherry-pick", feature_commit)
         self.run_gitforge("cherry-pick", "--abort")
         
         # Should still be on master
-        status = self.run_gitforge("status")
-        self.assertIn("On branch master", status.stdout)
+        self.assertEqual(self.current_branch(), "master")
 
 
 class TestStatusDisplay(GitforgeTestBase):
@@ -2476,23 +2792,10 @@ class TestStatusDisplay(GitforgeTestBase):
 
     def test_status_shows_rebase_in_progress(self):
         """Test: status shows rebase in progress."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        self.create_file("file.txt", "master\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
-        
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "feature")
+        self.make_diverged_branches()
         
         # Start conflicting rebase
+        self.run_gitforge("checkout", "feature")
         self.run_gitforge("rebase", "master")
         
         status = self.run_gitforge("status")
@@ -2500,23 +2803,8 @@ class TestStatusDisplay(GitforgeTestBase):
 
     def test_status_shows_cherry_pick_in_progress(self):
         """Test: status shows cherry-pick in progress."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        self.create_file("file.txt", "master\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
-        
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
+        feature_commit = self.make_diverged_branches()
         
-        self.run_gitforge("checkout", "master")
         self.run_gitforge("cherry-pick", feature_commit)
         
         status = self.run_gitforge("status")
@@ -2524,28 +2812,19 @@ class TestStatusDisplay(GitforgeTestBase):
 
     def test_status_shows_conflicted_files(self):
         """Test: status shows conflicted files."""
-        self.run_gitforge("init")
-        self.create_file("file.txt", "base\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "base")
-        
-        self.run_gitforge("branch", "feature")
-        
-        self.create_file("file.txt", "master\n")
-        self.run_gitforge("add", ".")
-        self.run_gitforge("commit", "-m", "master")
-        
-        self.run_gitforge("checkout", "feature")
-        self.create_file("file.txt", "feature\n")
-        self.run_gitforge("add", ".")
-        feature_commit = self.run_gitforge("commit", "-m", "feature").stdout.strip()
-        
-        self.run_gitforge("checkout", "master")
-        self.run_gitforge("merge", feature_commit)
+        self.make_conflict_state()
         
         status = self.run_gitforge("status")
-        self.assertIn("Unmerged paths", status.stdout)
-        self.assertIn("file.txt", status.stdout)
+        self.assertAllIn(status.stdout, "Unmerged paths", "file.txt")
+
+
+def _run_test_class(test_class):
+    """Run one test class, returning its report and its run/failure/error/skip counts."""
+    stream = io.StringIO()
+    suite = unittest.TestLoader().loadTestsFromTestCase(test_class)
+    result = unittest.TextTestRunner(stream=stream, verbosity=2).run(suite)
+    return (stream.getvalue(), result.testsRun, len(result.failures), len(result.errors),
+            len(result.skipped))
 
 
 def run_tests():
@@ -2556,9 +2835,6 @@ def run_tests():
     print(f"Testing gitforge from: {GITFORGE_RUNNER}")
     print("="*60)
     
-    loader = unittest.TestLoader()
-    suite = unittest.TestSuite()
-    
     # Add all test classes
     test_classes = [
         TestInit,
@@ -2592,27 +2868,42 @@ def run_tests():
         TestStatusDisplay,
     ]
     
-    for test_class in test_classes:
-        suite.addTests(loader.loadTestsFromTestCase(test_class))
+    # Test classes are independent, so spread them over forked workers. Not
+    # threads: the in-process runner changes directory and gitforge keeps its
+    # repository in module globals.
+    jobs = int(os.environ.get("GITFORGE_TEST_JOBS", os.cpu_count() or 1))
+    if jobs > 1 and "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        with concurrent.futures.ProcessPoolExecutor(jobs, mp_context=context) as executor:
+            outcomes = list(executor.map(_run_test_class, test_classes))
+    else:
+        outcomes = [_run_test_class(test_class) for test_class in test_classes]
     
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
+    tests_run = failures = errors = skipped = 0
+    for output, run, failed, errored, skips in outcomes:
+        sys.stderr.write(output)
+        tests_run += run
+        failures += failed
+        errors += errored
+        skipped += skips
     
     print("\n" + "="*60)
     print("TEST SUMMARY")
     print("="*60)
-    print(f"Tests run: {result.testsRun}")
-    print(f"Failures: {len(result.failures)}")
-    print(f"Errors: {len(result.errors)}")
+    print(f"Tests run: {tests_run}")
+    print(f"Failures: {failures}")
+    print(f"Errors: {errors}")
+    if skipped:
+        print(f"Skipped: {skipped}")
     
-    if result.wasSuccessful():
+    if not failures and not errors:
         print("\n✓ ALL TESTS PASSED!")
     else:
         print("\n✗ SOME TESTS FAILED")
     
     print("="*60)
     
-    return 0 if result.wasSuccessful() else 1
+    return 0 if not failures and not errors else 1
 
 
 if __name__ == "__main__":